@@ -1,17 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
 
-from .routers import videos
+from .routers import videos, jobs
 from .services.model_client import ModelServiceClient
+from .services.http_clients import http_clients
+from .services.replica_pool import replica_pools
 from .schemas.video_schema import HealthCheck
+from .utils.file_utils import media_workers
+from .utils.metrics import MetricsMiddleware, register_state_collector, render_metrics
+from .utils.timing import ServerTimingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: owns shared resources that need cleanup"""
+    app.state.http_clients = http_clients
+    # Eject/readmit model replicas based on periodic health probes
+    replica_pools.start()
+    yield
+    await replica_pools.aclose()
+    # Cancel unfinished batch jobs
+    await jobs.job_scheduler.shutdown()
+    # Close pooled model backend connections
+    await http_clients.aclose()
+    # Stop ffprobe/ffmpeg worker processes
+    media_workers.shutdown()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Video Caption Service API",
     description="Backend API for video captioning using OmniVinci",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -21,14 +45,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Library-Version", "Server-Timing"],  # Readable by the frontend
 )
+# Per-stage Server-Timing header and slow request log
+app.add_middleware(ServerTimingMiddleware)
+# Per-route request latency histograms (outermost, so CORS and routing time are included)
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(videos.router)
+app.include_router(jobs.router)
 
 # Model service client
 model_client = ModelServiceClient()
 
+# Limits, queue depths, replica health and cache counters are read at scrape time
+register_state_collector(videos.caption_service)
+
 
 @app.get("/")
 async def root():
@@ -40,14 +73,20 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (API, model, media, cache and caption I/O)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health", response_model=HealthCheck)
 async def health_check():
     """Health check endpoint"""
     # Check model service health (using default model)
     try:
-        from .services.model_client import VLLMClient
         default_model = os.getenv("DEFAULT_MODEL", "qwen2vl")
-        client = VLLMClient(model_key=default_model)
+        client = videos.caption_service.get_model_client(default_model)
         model_service_health = await client.health_check()
         model_service_healthy = model_service_health.get("status") == "healthy"
         model_url = client.vllm_url
@@ -59,7 +98,8 @@ async def health_check():
         status="healthy" if model_service_healthy else "degraded",
         backend_healthy=True,
         model_service_healthy=model_service_healthy,
-        model_service_url=model_url
+        model_service_url=model_url,
+        circuit_breakers=replica_pools.breaker_states()
     )
 
 
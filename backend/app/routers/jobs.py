@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List
+
+from ..schemas.job_schema import JobCreateRequest, JobCreateResponse, JobStatus
+from ..services.job_service import JobScheduler
+from ..services.model_client import AVAILABLE_MODELS
+from ..utils.file_utils import get_video_files
+from .videos import caption_service, VIDEOS_DIR, MAX_VIDEO_SIZE_MB, MAX_VIDEO_DURATION_SEC
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Shared scheduler (uses the same CaptionService as the videos router)
+job_scheduler = JobScheduler(
+    caption_service=caption_service,
+    max_size_mb=MAX_VIDEO_SIZE_MB,
+    max_duration_sec=MAX_VIDEO_DURATION_SEC
+)
+
+
+@router.post("", response_model=JobCreateResponse, status_code=202)
+async def create_job(request: JobCreateRequest):
+    """
+    Submit a batch captioning job (videos × models)
+    
+    Returns immediately with a job id; poll GET /api/jobs/{job_id} for progress.
+    """
+    unknown = [m for m in request.models if m not in AVAILABLE_MODELS]
+    if unknown or not request.models:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model(s): {unknown}. Available: {list(AVAILABLE_MODELS.keys())}"
+        )
+    
+    if request.all_uncaptioned:
+        # Only the video × model pairs that have no caption yet
+        pairs = [
+            (video_path.name, model_key)
+            for video_path in get_video_files(VIDEOS_DIR)
+            for model_key in request.models
+            if not caption_service.caption_exists(video_path.name, model_key)
+        ]
+    elif request.videos:
+        pairs = [(video, model_key) for video in request.videos for model_key in request.models]
+    else:
+        raise HTTPException(status_code=400, detail="Provide 'videos' or set 'all_uncaptioned'")
+    
+    job = job_scheduler.submit(pairs, prompt=request.prompt, regenerate=request.regenerate)
+    
+    return JobCreateResponse(job_id=job.job_id, state=job.state, total=len(job.items))
+
+
+@router.get("", response_model=List[JobStatus])
+async def list_jobs():
+    """List known jobs (without per-item details)"""
+    return [JobStatus(**job.to_dict(include_items=False)) for job in job_scheduler.jobs.values()]
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    include_items: bool = Query(True, description="Include per-item state, timings and errors")
+):
+    """Get job progress with per-item state, timings and errors"""
+    job = job_scheduler.get(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatus(**job.to_dict(include_items=include_items))
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a running job"""
+    if job_scheduler.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not job_scheduler.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    
+    return {"message": "Job cancelled", "job_id": job_id}
@@ -1,20 +1,38 @@
-from fastapi import APIRouter, HTTPException, Query, Body
-from fastapi.responses import FileResponse
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Optional, Union
+import json
 import os
 from pathlib import Path
 
-from ..schemas.video_schema import VideoInfo, CaptionResponse, CaptionGenerateRequest
+from ..schemas.video_schema import VideoInfo, VideoPage, VideoDelta, CaptionResponse, CaptionGenerateRequest, MultiPromptRequest
 from ..services.caption_service import CaptionService
-from ..services.model_client import get_available_models
+from ..services.model_client import get_available_models, AVAILABLE_MODELS
+from ..services.segment_service import SEGMENT_SECONDS
+from ..services.resilience import ModelServiceError
+from ..services.concurrency_limiter import concurrency_limiters
+from ..services.video_library import (
+    VideoLibrary,
+    InvalidCursor,
+    InvalidVersion,
+    project_record,
+    SORT_FIELDS,
+    LISTING_FIELDS,
+    DEFAULT_LISTING_FIELDS
+)
+from ..utils.timing import span
+from ..utils.http_cache import make_etag, cache_headers, etag_matches, not_modified
 from ..utils.file_utils import (
-    get_video_files,
-    get_video_duration,
-    validate_video_constraints,
+    get_video_duration_async,
+    validate_video_constraints_async,
     extract_model_from_caption_filename,
     check_audio_exists,
     get_audio_filename,
-    extract_audio_to_wav
+    extract_audio_async,
+    AUDIO_PROFILES,
+    DEFAULT_AUDIO_PROFILE,
+    MediaJobTimeout,
+    MediaCommandError
 )
 
 router = APIRouter(prefix="/api/videos", tags=["videos"])
@@ -26,6 +44,9 @@ MODEL_NAME = os.getenv("MODEL_NAME", "qwen3-omni")
 REMOTE_VIDEO_URL = os.getenv("REMOTE_VIDEO_URL", "http://localhost:8080")
 MAX_VIDEO_SIZE_MB = int(os.getenv("MAX_VIDEO_SIZE_MB", "100"))
 MAX_VIDEO_DURATION_SEC = int(os.getenv("MAX_VIDEO_DURATION_SEC", "300"))
+# Segmented captioning sends the model one window at a time, so it accepts much longer videos
+MAX_SEGMENTED_SIZE_MB = int(os.getenv("MAX_SEGMENTED_SIZE_MB", "4096"))
+MAX_SEGMENTED_DURATION_SEC = int(os.getenv("MAX_SEGMENTED_DURATION_SEC", "7200"))
 
 # Initialize caption service
 caption_service = CaptionService(
@@ -34,6 +55,18 @@ caption_service = CaptionService(
     model_name=MODEL_NAME
 )
 
+# In-memory index of the videos directory (shares the caption index for caption status)
+video_library = VideoLibrary(VIDEOS_DIR, caption_service.caption_index)
+
+
+def model_inputs_error(model: str, error: Exception) -> HTTPException:
+    """400 for a failed ensure_model_inputs (only the captioner needs extracted audio)"""
+    if model == "qwen3omni_captioner":
+        detail = f"Qwen3-Omni-Captioner requires audio. Failed to extract audio: {str(error)}"
+    else:
+        detail = f"Failed to prepare inputs for {model}: {str(error)}"
+    return HTTPException(status_code=400, detail=detail)
+
 
 @router.get("/available-models")
 async def list_available_models():
@@ -46,59 +79,153 @@ async def list_available_models():
     }
 
 
-@router.get("", response_model=List[VideoInfo])
-async def list_videos():
+@router.get("/generation-stats")
+async def get_generation_stats():
+    """
+    Caption generation counters, including how many requests were coalesced
+    onto an identical in-flight generation
+    """
+    return {
+        "single_flight": caption_service.inflight.stats(),
+        "result_cache": caption_service.result_cache.stats(),
+        # Adaptive concurrency limit, in-flight and queue depth per model
+        "concurrency": concurrency_limiters.stats()
+    }
+
+
+@router.get("", response_model=Union[List[VideoInfo], VideoDelta])
+async def list_videos(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(
+        None,
+        description="Library version from X-Library-Version; returns only videos changed since then"
+    )
+):
     """
     List all videos in the videos directory with their caption status
+    
+    Responses carry an ETag and X-Library-Version; If-None-Match is answered
+    with 304 while nothing changed. With ?since=<version> only videos whose
+    metadata or captions changed (plus removed filenames) are returned.
     """
-    video_files = get_video_files(VIDEOS_DIR)
-    videos_info = []
+    version, last_modified = await video_library.version()
+    headers = cache_headers(make_etag(version, since or ""), last_modified)
+    headers["X-Library-Version"] = version
     
-    for video_path in video_files:
-        filename = video_path.name
-        
-        # Get file info
-        file_size = video_path.stat().st_size
-        duration = get_video_duration(str(video_path))
-        created_at = video_path.stat().st_mtime
-        
-        # Check for captions from all models
-        all_captions = caption_service.load_all_captions(filename)
-        has_caption = len(all_captions) > 0
-        
-        # Get comma-separated list of models that have captions
-        model_used = ','.join([c['model_key'] for c in all_captions]) if all_captions else None
-        
-        # Use first caption's text for preview
-        caption_text = all_captions[0]['caption'] if all_captions else None
-        
-        # Check for audio file
-        has_audio = check_audio_exists(filename, VIDEOS_DIR)
-        audio_filename = None
-        audio_size = None
-        
-        if has_audio:
-            audio_filename = get_audio_filename(filename)
-            audio_path = Path(VIDEOS_DIR) / audio_filename
-            if audio_path.exists():
-                audio_size = audio_path.stat().st_size
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+    
+    fields = DEFAULT_LISTING_FIELDS + ("caption_text",)
+    
+    if since is not None:
+        try:
+            delta = await video_library.changes_since(since)
+        except InvalidVersion as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        video_info = VideoInfo(
-            filename=filename,
-            size=file_size,
-            duration=duration,
+        if delta is not None:
+            changed, removed = delta
+            return VideoDelta(
+                version=version,
+                full=False,
+                changed=[VideoInfo(**project_record(r, caption_service.caption_index, fields=fields)) for r in changed],
+                removed=removed
+            )
+    
+    # Served from the video library index (no directory walk or per-file stat per request)
+    records = await video_library.records(sort="mtime", descending=True)
+    videos_info = [
+        VideoInfo(**project_record(record, caption_service.caption_index, fields=fields))
+        for record in records
+    ]
+    
+    if since is not None:
+        # Version from before a restart: the client has to replace its whole list
+        return VideoDelta(version=version, full=True, changed=videos_info, removed=[])
+    return videos_info
+
+
+@router.get("/page", response_model=VideoPage)
+async def list_videos_page(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: str = Query("mtime", description=f"Sort field ({', '.join(SORT_FIELDS)})"),
+    order: str = Query("desc", description="asc or desc"),
+    has_caption: Optional[bool] = Query(None, description="Only videos with/without any caption"),
+    model: Optional[str] = Query(None, description="Only videos captioned by this model"),
+    has_audio: Optional[bool] = Query(None, description="Only videos with/without an extracted WAV"),
+    min_duration: Optional[float] = Query(None, ge=0, description="Minimum duration in seconds"),
+    max_duration: Optional[float] = Query(None, ge=0, description="Maximum duration in seconds"),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated VideoInfo fields to return (caption_text is only included when requested)"
+    ),
+    preview_chars: Optional[int] = Query(None, ge=0, description="Truncate caption_text to this many characters")
+):
+    """
+    Paginated, filterable video listing with field projection
+    
+    Uses cursor (keyset) pagination: pass the returned next_cursor with the same
+    sort and order to fetch the next page.
+    """
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort '{sort}'. Use one of {list(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Use 'asc' or 'desc'")
+    if model is not None and model not in AVAILABLE_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model '{model}'. Available: {list(AVAILABLE_MODELS.keys())}"
+        )
+    
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = [f for f in selected if f not in LISTING_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field(s): {unknown}. Available: {list(LISTING_FIELDS)}"
+            )
+    else:
+        selected = DEFAULT_LISTING_FIELDS
+    
+    version, last_modified = await video_library.version()
+    headers = cache_headers(make_etag(version, str(request.query_params)), last_modified)
+    headers["X-Library-Version"] = version
+    
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+    
+    try:
+        records, next_cursor, total = await video_library.query(
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
             has_caption=has_caption,
-            caption_text=caption_text,
-            model_used=model_used,
-            created_at=created_at,
+            model=model,
             has_audio=has_audio,
-            audio_filename=audio_filename,
-            audio_size=audio_size
+            min_duration=min_duration,
+            max_duration=max_duration
         )
-        
-        videos_info.append(video_info)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return videos_info
+    return VideoPage(
+        items=[
+            project_record(record, caption_service.caption_index, fields=selected, preview_chars=preview_chars)
+            for record in records
+        ],
+        total=total,
+        next_cursor=next_cursor,
+        sort=sort,
+        order=order
+    )
 
 
 @router.get("/{filename}")
@@ -110,9 +237,10 @@ async def get_video_info(filename: str):
         raise HTTPException(status_code=404, detail="Video not found")
     
     # Get file info
-    file_size = video_path.stat().st_size
-    duration = get_video_duration(str(video_path))
-    created_at = video_path.stat().st_mtime
+    stat = video_path.stat()
+    file_size = stat.st_size
+    duration = await get_video_duration_async(str(video_path), stat=stat)
+    created_at = stat.st_mtime
     
     # Check caption
     caption_data = caption_service.load_caption(filename)
@@ -168,28 +296,23 @@ async def generate_caption(
         raise HTTPException(status_code=404, detail="Video not found")
     
     # Validate video constraints
-    is_valid, error_msg = validate_video_constraints(
-        str(video_path),
-        max_size_mb=MAX_VIDEO_SIZE_MB,
-        max_duration_sec=MAX_VIDEO_DURATION_SEC
-    )
+    with span("validate"):
+        is_valid, error_msg = await validate_video_constraints_async(
+            str(video_path),
+            max_size_mb=MAX_VIDEO_SIZE_MB,
+            max_duration_sec=MAX_VIDEO_DURATION_SEC
+        )
     
     if not is_valid:
         raise HTTPException(status_code=413, detail=error_msg)
     
-    # Qwen3-Omni-Captioner requires audio file
-    if model == "qwen3omni_captioner":
-        if not check_audio_exists(filename, VIDEOS_DIR):
-            # Try to auto-extract audio
-            try:
-                audio_filename = get_audio_filename(filename)
-                audio_path = Path(VIDEOS_DIR) / audio_filename
-                extract_audio_to_wav(str(video_path), str(audio_path))
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Qwen3-Omni-Captioner requires audio. Failed to extract audio: {str(e)}"
-                )
+    # Derived model inputs (captioner audio, audio profile renditions) are extracted if missing
+    try:
+        await caption_service.ensure_model_inputs(filename, model)
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Audio extraction timed out: {str(e)}")
+    except Exception as e:
+        raise model_inputs_error(model, e)
     
     # Generate caption with selected model
     try:
@@ -205,6 +328,10 @@ async def generate_caption(
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
+    except ModelServiceError as e:
+        # Typed model backend failure (timeout 504, unavailable/open circuit 503, rejected request 502)
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    
     except Exception as e:
         error_detail = str(e)
         
@@ -219,9 +346,354 @@ async def generate_caption(
         raise HTTPException(status_code=status_code, detail=error_detail)
 
 
+@router.api_route("/{filename}/caption/stream", methods=["GET", "POST"])
+async def stream_caption(
+    filename: str,
+    request: Optional[CaptionGenerateRequest] = Body(None),
+    model: str = Query("qwen2vl", description="Model to use (qwen2vl, omnivinci, qwen3omni, or qwen3omni_captioner)"),
+    prompt: Optional[str] = Query(None, description="Prompt for GET requests (EventSource cannot send a body)"),
+    regenerate: bool = Query(False, description="Regenerate even if caption exists")
+):
+    """
+    Generate a caption and stream tokens as Server-Sent Events
+    
+    Emits 'token' events ({"text": ...}) while the model generates, then a single
+    'done' event with the saved caption record (including time-to-first-token and
+    tokens/second), or an 'error' event if generation fails mid-stream.
+    """
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    # Validate video exists
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    # Validate video constraints
+    with span("validate"):
+        is_valid, error_msg = await validate_video_constraints_async(
+            str(video_path),
+            max_size_mb=MAX_VIDEO_SIZE_MB,
+            max_duration_sec=MAX_VIDEO_DURATION_SEC
+        )
+    
+    if not is_valid:
+        raise HTTPException(status_code=413, detail=error_msg)
+    
+    # Derived model inputs (captioner audio, audio profile renditions) are extracted if missing
+    try:
+        await caption_service.ensure_model_inputs(filename, model)
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Audio extraction timed out: {str(e)}")
+    except Exception as e:
+        raise model_inputs_error(model, e)
+    
+    if request is not None and request.prompt:
+        prompt = request.prompt
+    
+    async def event_stream():
+        try:
+            async for event in caption_service.stream_caption(
+                video_filename=filename,
+                prompt=prompt,
+                model_key=model,
+                regenerate=regenerate
+            ):
+                if event["type"] == "token":
+                    yield f"event: token\ndata: {json.dumps({'text': event['text']}, ensure_ascii=False)}\n\n"
+                else:
+                    yield f"event: done\ndata: {json.dumps(event['caption_data'], ensure_ascii=False, default=str)}\n\n"
+        except ModelServiceError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e), 'status': e.status_code, 'retry_after': getattr(e, 'retry_after', None)})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
+
+
+@router.post("/{filename}/caption/segmented", response_model=CaptionResponse)
+async def generate_segmented_caption(
+    filename: str,
+    request: CaptionGenerateRequest,
+    model: str = Query("qwen2vl", description="Model used for the segments"),
+    segment_seconds: int = Query(SEGMENT_SECONDS, ge=10, le=600, description="Target segment length in seconds"),
+    regenerate: bool = Query(False, description="Regenerate even if a segmented caption exists")
+):
+    """
+    Caption a long video by captioning fixed-length segments and merging them
+    
+    The video is split at keyframes without re-encoding, each segment is
+    captioned concurrently, and text-only requests merge the segment
+    captions (in rounds, so every request fits the model's context). The response includes each segment's time range and caption.
+    
+    Args:
+        filename: Video filename
+        request: Request body containing optional prompt
+        model: Model to use for the segments
+        segment_seconds: Target segment length in seconds
+        regenerate: If True, regenerate caption even if it exists
+    """
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    if model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {model}")
+    
+    with span("validate"):
+        is_valid, error_msg = await validate_video_constraints_async(
+            str(video_path),
+            max_size_mb=MAX_SEGMENTED_SIZE_MB,
+            max_duration_sec=MAX_SEGMENTED_DURATION_SEC
+        )
+    
+    if not is_valid:
+        raise HTTPException(status_code=413, detail=error_msg)
+    
+    try:
+        await caption_service.ensure_model_inputs(filename, model)
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Audio extraction timed out: {str(e)}")
+    except Exception as e:
+        raise model_inputs_error(model, e)
+    
+    try:
+        caption_data = await caption_service.generate_segmented_caption(
+            video_filename=filename,
+            prompt=request.prompt,
+            model_key=model,
+            segment_seconds=segment_seconds,
+            regenerate=regenerate
+        )
+        
+        return CaptionResponse(**caption_data)
+    
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    except ModelServiceError as e:
+        # Typed model backend failure (timeout 504, unavailable/open circuit 503, rejected request 502)
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Segment split timed out: {str(e)}")
+    
+    except MediaCommandError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to split video: {str(e)}")
+    
+    except Exception as e:
+        error_detail = str(e)
+        
+        if "timed out" in error_detail.lower():
+            status_code = 504
+        elif "service" in error_detail.lower():
+            status_code = 503
+        else:
+            status_code = 500
+        
+        raise HTTPException(status_code=status_code, detail=error_detail)
+
+
+@router.post("/{filename}/caption/multi", response_model=List[CaptionResponse])
+async def generate_answers(
+    filename: str,
+    request: MultiPromptRequest,
+    model: str = Query("omnivinci", description="Model to use (OmniVinci answers all prompts in one pass)"),
+    regenerate: bool = Query(False, description="Regenerate even if an answer is cached")
+):
+    """
+    Answer several prompts about a video (e.g. description, audio events, on-screen text)
+    
+    The video is sent to the model once for all prompts. Each answer is
+    stored as its own record (see GET /{filename}/answers); the video's main
+    caption is left unchanged.
+    
+    Args:
+        filename: Video filename
+        request: Request body containing the prompts
+        model: Model to use for generation
+        regenerate: If True, bypass cached answers
+    """
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    if model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {model}")
+    
+    with span("validate"):
+        is_valid, error_msg = await validate_video_constraints_async(
+            str(video_path),
+            max_size_mb=MAX_VIDEO_SIZE_MB,
+            max_duration_sec=MAX_VIDEO_DURATION_SEC
+        )
+    
+    if not is_valid:
+        raise HTTPException(status_code=413, detail=error_msg)
+    
+    try:
+        await caption_service.ensure_model_inputs(filename, model)
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Audio extraction timed out: {str(e)}")
+    except Exception as e:
+        raise model_inputs_error(model, e)
+    
+    try:
+        answers = await caption_service.generate_answers(
+            video_filename=filename,
+            prompts=request.prompts,
+            model_key=model,
+            regenerate=regenerate
+        )
+        
+        return [CaptionResponse(**answer) for answer in answers]
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    except ModelServiceError as e:
+        # Typed model backend failure (timeout 504, unavailable/open circuit 503, rejected request 502)
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    
+    except Exception as e:
+        error_detail = str(e)
+        
+        if "timed out" in error_detail.lower():
+            status_code = 504
+        elif "service" in error_detail.lower():
+            status_code = 503
+        else:
+            status_code = 500
+        
+        raise HTTPException(status_code=status_code, detail=error_detail)
+
+
+@router.get("/{filename}/answers", response_model=List[CaptionResponse])
+async def get_answers(
+    filename: str,
+    model: Optional[str] = Query(None, description="Only answers from this model")
+):
+    """Get the stored answers to prompts about a video, oldest first"""
+    return [CaptionResponse(**answer) for answer in caption_service.load_answers(filename, model)]
+
+
+@router.post("/{filename}/proxy")
+async def create_proxies(
+    filename: str,
+    model: Optional[str] = Query(None, description="Model whose proxy to build (default: every model with a proxy profile)")
+):
+    """
+    Build model-ready proxy renditions ahead of time
+    
+    Returns each proxy's path, size and the transfer/decode savings against the source.
+    """
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    if model is not None and model not in AVAILABLE_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model '{model}'. Available: {list(AVAILABLE_MODELS.keys())}"
+        )
+    
+    content_hash = await caption_service.get_content_hash(filename)
+    model_keys = [model] if model else list(AVAILABLE_MODELS.keys())
+    
+    proxies = {}
+    for model_key in model_keys:
+        profile = caption_service.proxies.profile_for(model_key)
+        if profile is None:
+            continue
+        try:
+            proxies[model_key] = await caption_service.proxies.ensure(filename, content_hash, profile)
+        except MediaJobTimeout as e:
+            raise HTTPException(status_code=504, detail=f"Proxy transcode timed out: {str(e)}")
+        except MediaCommandError as e:
+            # ffmpeg rejected the source video: retrying won't help
+            raise HTTPException(status_code=422, detail=f"Failed to build {profile.name} proxy: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to build {profile.name} proxy: {str(e)}")
+    
+    if model and not proxies:
+        raise HTTPException(status_code=400, detail=f"No proxy profile configured for {model}")
+    
+    return {"filename": filename, "content_hash": content_hash, "proxies": proxies}
+
+
+@router.get("/{filename}/proxy")
+async def get_proxies(filename: str):
+    """Proxy renditions already built for a video (None for models whose proxy is not built yet)"""
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    content_hash = await caption_service.get_content_hash(filename)
+    proxies = {}
+    for model_key in AVAILABLE_MODELS:
+        profile = caption_service.proxies.profile_for(model_key)
+        if profile is not None:
+            proxies[model_key] = caption_service.proxies.get_report(content_hash, profile)
+    
+    return {"filename": filename, "content_hash": content_hash, "proxies": proxies}
+
+
+@router.post("/{filename}/frames")
+async def extract_frames(
+    filename: str,
+    model: str = Query("qwen2vl", description="Model in frames request mode whose frame set to extract")
+):
+    """
+    Extract a model's frame set ahead of time (models in "frames" request mode)
+    
+    Returns the manifest with frame paths, timestamps, total size and extraction time.
+    """
+    video_path = Path(VIDEOS_DIR) / filename
+    
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    if model not in AVAILABLE_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model '{model}'. Available: {list(AVAILABLE_MODELS.keys())}"
+        )
+    
+    profile = caption_service.frames.profile_for(model)
+    if profile is None:
+        raise HTTPException(status_code=400, detail=f"{model} is not configured for frames request mode")
+    
+    content_hash = await caption_service.get_content_hash(filename)
+    try:
+        return await caption_service.frames.ensure(filename, content_hash, profile)
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Frame extraction timed out: {str(e)}")
+    except MediaCommandError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to extract frames: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to extract frames: {str(e)}")
+
+
 @router.get("/{filename}/all-captions")
-async def get_all_captions(filename: str):
-    """Get all captions from all models for a video"""
+async def get_all_captions(filename: str, request: Request, response: Response):
+    """Get all captions from all models for a video (supports If-None-Match)"""
+    fingerprint = caption_service.caption_index.fingerprint(filename)
+    if fingerprint is not None:
+        headers = cache_headers(*fingerprint)
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        response.headers.update(headers)
+    
     all_captions = caption_service.load_all_captions(filename)
     
     return {
@@ -232,8 +704,15 @@ async def get_all_captions(filename: str):
 
 
 @router.get("/{filename}/caption", response_model=CaptionResponse)
-async def get_caption(filename: str):
-    """Get existing caption for a video (returns first available)"""
+async def get_caption(filename: str, request: Request, response: Response):
+    """Get existing caption for a video (returns first available; supports If-None-Match)"""
+    fingerprint = caption_service.caption_index.fingerprint(filename, caption_service.model_name)
+    if fingerprint is not None:
+        headers = cache_headers(*fingerprint)
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        response.headers.update(headers)
+    
     caption_data = caption_service.load_caption(filename)
     
     if not caption_data:
@@ -272,36 +751,46 @@ async def delete_caption(filename: str):
 
 
 @router.post("/{filename}/audio")
-async def generate_audio(filename: str):
+async def generate_audio(
+    filename: str,
+    profile: str = Query(DEFAULT_AUDIO_PROFILE, description=f"Audio profile ({', '.join(AUDIO_PROFILES)})")
+):
     """
-    Extract audio from video and save as WAV file
+    Extract audio from video and save it next to the video
     
     Args:
         filename: Video filename
+        profile: Audio profile (default: 44.1 kHz stereo WAV)
     
     Returns:
         Audio file information
     """
     video_path = Path(VIDEOS_DIR) / filename
     
+    if profile not in AUDIO_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown audio profile '{profile}'. Available: {list(AUDIO_PROFILES.keys())}"
+        )
+    
     # Validate video exists
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video not found")
     
     # Check if audio already exists
-    if check_audio_exists(filename, VIDEOS_DIR):
+    if check_audio_exists(filename, VIDEOS_DIR, profile):
         raise HTTPException(
             status_code=409,
             detail="Audio file already exists. Delete it first to regenerate."
         )
     
     # Generate audio filename
-    audio_filename = get_audio_filename(filename)
+    audio_filename = get_audio_filename(filename, profile)
     audio_path = Path(VIDEOS_DIR) / audio_filename
     
     try:
-        # Extract audio to WAV
-        output_path = extract_audio_to_wav(str(video_path), str(audio_path))
+        # Extract audio with the requested profile
+        output_path = await extract_audio_async(str(video_path), str(audio_path), profile)
         
         # Get audio file size
         audio_file = Path(output_path)
@@ -311,6 +800,7 @@ async def generate_audio(filename: str):
             "success": True,
             "video_filename": filename,
             "audio_filename": audio_filename,
+            "profile": profile,
             "audio_path": output_path,
             "file_size_bytes": audio_size,
             "file_size_mb": round(audio_size / (1024 * 1024), 2)
@@ -325,31 +815,43 @@ async def generate_audio(filename: str):
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
+    except MediaJobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Audio extraction timed out: {str(e)}")
+    
     except Exception as e:
         error_detail = str(e)
         raise HTTPException(status_code=500, detail=f"Failed to extract audio: {error_detail}")
 
 
 @router.get("/{filename}/audio")
-async def get_audio(filename: str):
-    """Download audio file (WAV) for a video"""
+async def get_audio(
+    filename: str,
+    profile: str = Query(DEFAULT_AUDIO_PROFILE, description=f"Audio profile ({', '.join(AUDIO_PROFILES)})")
+):
+    """Download audio file for a video (WAV by default)"""
     video_path = Path(VIDEOS_DIR) / filename
     
+    if profile not in AUDIO_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown audio profile '{profile}'. Available: {list(AUDIO_PROFILES.keys())}"
+        )
+    
     # Validate video exists
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video not found")
     
     # Check if audio exists
-    if not check_audio_exists(filename, VIDEOS_DIR):
+    if not check_audio_exists(filename, VIDEOS_DIR, profile):
         raise HTTPException(status_code=404, detail="Audio file not found. Generate it first.")
     
     # Get audio file path
-    audio_filename = get_audio_filename(filename)
+    audio_filename = get_audio_filename(filename, profile)
     audio_path = Path(VIDEOS_DIR) / audio_filename
     
     return FileResponse(
         str(audio_path),
-        media_type="audio/wav",
+        media_type=AUDIO_PROFILES[profile]["media_type"],
         filename=audio_filename
     )
 
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from datetime import datetime
+
+
+class JobCreateRequest(BaseModel):
+    """Batch captioning job request (videos × models)"""
+    videos: Optional[List[str]] = None  # Video filenames; ignored when all_uncaptioned is set
+    models: List[str] = Field(default_factory=lambda: ["qwen2vl"])
+    all_uncaptioned: bool = False  # Caption every video that has no caption for a given model
+    prompt: Optional[str] = None
+    regenerate: bool = False  # Same semantics as POST /api/videos/{filename}/caption
+
+
+class JobItemStatus(BaseModel):
+    """State of one video × model item in a job"""
+    video: str
+    model: str
+    state: str  # queued, running, completed, failed, cancelled
+    cached: bool = False  # Existing caption returned without calling the model
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wait_seconds: Optional[float] = None  # Time spent waiting for a model slot
+    run_seconds: Optional[float] = None
+    processing_time_seconds: Optional[float] = None  # As reported by the caption record
+    error: Optional[str] = None
+
+
+class JobStatus(BaseModel):
+    """Batch captioning job status"""
+    job_id: str
+    state: str  # queued, running, completed, completed_with_errors, cancelled
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    total: int
+    counts: Dict[str, int]
+    items: Optional[List[JobItemStatus]] = None
+
+
+class JobCreateResponse(BaseModel):
+    """Response returned immediately after a job is submitted"""
+    job_id: str
+    state: str
+    total: int
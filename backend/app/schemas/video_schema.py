@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -17,6 +17,23 @@ class VideoInfo(BaseModel):
     audio_size: Optional[int] = None  # Audio file size in bytes
 
 
+class VideoPage(BaseModel):
+    """One page of the video listing"""
+    items: List[Dict[str, Any]]  # VideoInfo fields, restricted to the requested projection
+    total: int  # Videos matching the filters (all pages)
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+    sort: str
+    order: str
+
+
+class VideoDelta(BaseModel):
+    """Videos changed since a previous library version (GET /api/videos?since=)"""
+    version: str  # Pass as ?since= on the next poll
+    full: bool = False  # True when 'changed' is the complete list (version was from before a restart)
+    changed: List[VideoInfo]
+    removed: List[str]  # Filenames no longer in the library
+
+
 class CaptionResponse(BaseModel):
     """Caption response schema"""
     filename: str
@@ -26,6 +43,11 @@ class CaptionResponse(BaseModel):
     processing_time_seconds: float
     model_name: str
     model_version: str = "nvidia/omnivinci"
+    time_to_first_token_seconds: Optional[float] = None  # Set for streamed generations
+    tokens_per_second: Optional[float] = None  # Decode rate for streamed generations
+    mode: Optional[str] = None  # "segmented" for map-reduced long-video captions
+    segment_seconds: Optional[int] = None
+    segments: Optional[List[Dict[str, Any]]] = None  # Per-segment {index, start, end, caption}
 
 
 class CaptionGenerateRequest(BaseModel):
@@ -33,12 +55,19 @@ class CaptionGenerateRequest(BaseModel):
     prompt: Optional[str] = None
 
 
+class MultiPromptRequest(BaseModel):
+    """Several prompts answered about one video in one model pass"""
+    prompts: List[str] = Field(..., min_length=1)
+
+
 class HealthCheck(BaseModel):
     """Health check response"""
     status: str
     backend_healthy: bool
     model_service_healthy: bool
     model_service_url: str
+    # Circuit breaker state per model replica: {model_key: {url: "closed" | "open" | "half_open"}}
+    circuit_breakers: Dict[str, Dict[str, str]] = Field(default_factory=dict)
 
 
 
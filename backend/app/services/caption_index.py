@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..utils.file_utils import extract_model_from_caption_filename
+from ..utils.metrics import CAPTION_IO_SECONDS
+
+
+# How often the captions directory mtime is checked for external changes
+CAPTION_INDEX_REFRESH_SEC = float(os.getenv("CAPTION_INDEX_REFRESH_SEC", "2"))
+# Full rescan even without a directory mtime change (catches in-place rewrites)
+CAPTION_INDEX_RESCAN_SEC = float(os.getenv("CAPTION_INDEX_RESCAN_SEC", "60"))
+# Number of parsed caption documents kept in memory
+CAPTION_CACHE_SIZE = int(os.getenv("CAPTION_CACHE_SIZE", "256"))
+# Length of the caption preview served by the video listing
+CAPTION_PREVIEW_CHARS = int(os.getenv("CAPTION_PREVIEW_CHARS", "500"))
+
+
+@dataclass
+class CaptionEntry:
+    """A caption file known to the index"""
+    path: Path
+    mtime_ns: int
+    size: int
+    preview: Optional[str] = None  # Filled lazily on first load
+
+
+class CaptionIndex:
+    """
+    In-memory index of caption files in CAPTIONS_DIR
+    
+    Built from a single directory scan and kept fresh by polling the directory
+    mtime (creates, deletes and renames from outside the process, e.g. the
+    sync script) plus in-process updates from save/delete. Parsed documents
+    are held in a bounded LRU and invalidated by file mtime.
+    """
+    
+    def __init__(
+        self,
+        captions_dir: str,
+        known_models: List[str],
+        refresh_interval: float = CAPTION_INDEX_REFRESH_SEC,
+        cache_size: int = CAPTION_CACHE_SIZE
+    ):
+        self.captions_dir = Path(captions_dir)
+        self.known_models = list(known_models)
+        self.refresh_interval = refresh_interval
+        self.cache_size = cache_size
+        
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, CaptionEntry]] = {}
+        self._docs: "OrderedDict[Path, tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self.doc_hits = 0
+        self.doc_misses = 0
+        self._dir_mtime_ns: Optional[int] = None
+        self._last_check = 0.0
+        self._last_scan = 0.0
+        
+        # Change tracking for conditional GETs and delta polling
+        self.generation = 0
+        self.last_modified = time.time()
+        self._video_generation: Dict[str, int] = {}
+    
+    def _parse_filename(self, name: str) -> Optional[tuple[str, str]]:
+        """Split '{video}_{model}.json' into (video, model)"""
+        model_key = extract_model_from_caption_filename(name, known_models=self.known_models)
+        if not model_key or model_key not in self.known_models:
+            return None
+        return name[:-len(f"_{model_key}.json")], model_key
+    
+    def _scan(self) -> None:
+        """Rebuild the index from one pass over the captions directory"""
+        entries: Dict[str, Dict[str, CaptionEntry]] = {}
+        try:
+            dir_mtime_ns = os.stat(self.captions_dir).st_mtime_ns
+            with os.scandir(self.captions_dir) as it:
+                for dir_entry in it:
+                    if not dir_entry.name.endswith(".json") or not dir_entry.is_file():
+                        continue
+                    parsed = self._parse_filename(dir_entry.name)
+                    if parsed is None:
+                        continue
+                    video_filename, model_key = parsed
+                    stat = dir_entry.stat()
+                    
+                    # Keep previews for files that haven't changed
+                    previous = self._entries.get(video_filename, {}).get(model_key)
+                    preview = previous.preview if previous and previous.mtime_ns == stat.st_mtime_ns else None
+                    
+                    entries.setdefault(video_filename, {})[model_key] = CaptionEntry(
+                        path=Path(dir_entry.path),
+                        mtime_ns=stat.st_mtime_ns,
+                        size=stat.st_size,
+                        preview=preview
+                    )
+        except FileNotFoundError:
+            dir_mtime_ns = None
+        
+        # Record which videos gained, lost or rewrote a caption since the last scan
+        for video_filename in set(self._entries) | set(entries):
+            before = {m: (e.mtime_ns, e.size) for m, e in self._entries.get(video_filename, {}).items()}
+            after = {m: (e.mtime_ns, e.size) for m, e in entries.get(video_filename, {}).items()}
+            if before != after:
+                self._mark_changed(video_filename)
+        
+        self._entries = entries
+        self._dir_mtime_ns = dir_mtime_ns
+        self._last_scan = time.monotonic()
+    
+    def refresh(self, force: bool = False) -> None:
+        """Rescan if the captions directory changed since the last check"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._dir_mtime_ns is not None and now - self._last_check < self.refresh_interval:
+                return
+            self._last_check = now
+            
+            try:
+                dir_mtime_ns = os.stat(self.captions_dir).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = None
+            
+            if (
+                force
+                or dir_mtime_ns != self._dir_mtime_ns
+                or now - self._last_scan >= CAPTION_INDEX_RESCAN_SEC
+            ):
+                self._scan()
+    
+    def models_for(self, video_filename: str) -> List[str]:
+        """Model keys with a caption for this video, in AVAILABLE_MODELS order"""
+        self.refresh()
+        with self._lock:
+            by_model = self._entries.get(video_filename, {})
+            return [m for m in self.known_models if m in by_model]
+    
+    def has_caption(self, video_filename: str, model_key: str) -> bool:
+        self.refresh()
+        with self._lock:
+            return model_key in self._entries.get(video_filename, {})
+    
+    def load(self, video_filename: str, model_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a parsed caption document, served from the LRU when the file is unchanged
+        
+        Returns:
+            The cached caption dictionary (callers must copy before mutating) or None
+        """
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(video_filename, {}).get(model_key)
+            if entry is None:
+                return None
+            
+            cached = self._docs.get(entry.path)
+            if cached is not None and cached[0] == entry.mtime_ns:
+                self._docs.move_to_end(entry.path)
+                self.doc_hits += 1
+                return cached[1]
+            self.doc_misses += 1
+        
+        try:
+            stat = entry.path.stat()
+            with CAPTION_IO_SECONDS.labels("read").time(), open(entry.path, 'r', encoding='utf-8') as f:
+                doc = json.load(f)
+        except FileNotFoundError:
+            self.record_deleted(video_filename, model_key)
+            return None
+        except Exception as e:
+            print(f"Error loading caption for {model_key}: {str(e)}")
+            return None
+        
+        with self._lock:
+            entry.mtime_ns = stat.st_mtime_ns
+            entry.size = stat.st_size
+            entry.preview = self._make_preview(doc)
+            self._remember(entry.path, stat.st_mtime_ns, doc)
+        return doc
+    
+    def preview(self, video_filename: str) -> Optional[str]:
+        """Preview text of the first available caption (reads the file only once)"""
+        models = self.models_for(video_filename)
+        if not models:
+            return None
+        with self._lock:
+            entry = self._entries.get(video_filename, {}).get(models[0])
+            if entry is not None and entry.preview is not None:
+                return entry.preview
+        doc = self.load(video_filename, models[0])
+        return self._make_preview(doc) if doc else None
+    
+    def record_saved(self, video_filename: str, model_key: str, path: Path, doc: Dict[str, Any]) -> None:
+        """Update the index after this process wrote a caption file"""
+        stat = path.stat()
+        with self._lock:
+            self._entries.setdefault(video_filename, {})[model_key] = CaptionEntry(
+                path=path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                preview=self._make_preview(doc)
+            )
+            self._remember(path, stat.st_mtime_ns, doc)
+            self._mark_changed(video_filename)
+            self._sync_dir_mtime()
+    
+    def record_deleted(self, video_filename: str, model_key: str) -> None:
+        """Update the index after a caption file was removed"""
+        with self._lock:
+            by_model = self._entries.get(video_filename)
+            if by_model and model_key in by_model:
+                entry = by_model.pop(model_key)
+                self._docs.pop(entry.path, None)
+                if not by_model:
+                    del self._entries[video_filename]
+                self._mark_changed(video_filename)
+            self._sync_dir_mtime()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Caption document cache counters"""
+        total = self.doc_hits + self.doc_misses
+        return {
+            "doc_hits": self.doc_hits,
+            "doc_misses": self.doc_misses,
+            "hit_ratio": round(self.doc_hits / total, 4) if total else 0.0
+        }
+    
+    def changed_since(self, generation: int) -> List[str]:
+        """Videos whose captions changed after the given generation"""
+        self.refresh()
+        with self._lock:
+            return [v for v, g in self._video_generation.items() if g > generation]
+    
+    def fingerprint(self, video_filename: str, model_key: Optional[str] = None) -> Optional[tuple[str, float]]:
+        """
+        Cheap validator for a video's caption files (no file reads)
+        
+        Args:
+            video_filename: Video filename
+            model_key: Only this model's caption; all models when None
+        
+        Returns:
+            Tuple of (entity tag, last modified timestamp) or None if there is no caption
+        """
+        self.refresh()
+        with self._lock:
+            by_model = self._entries.get(video_filename, {})
+            entries = [
+                (m, by_model[m]) for m in self.known_models
+                if m in by_model and (model_key is None or m == model_key)
+            ]
+            if not entries:
+                return None
+            parts = [f"{m}:{e.mtime_ns}:{e.size}" for m, e in entries]
+            last_modified = max(e.mtime_ns for _, e in entries) / 1e9
+        digest = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+        return f'"{digest}"', last_modified
+    
+    def _mark_changed(self, video_filename: str) -> None:
+        self.generation += 1
+        self._video_generation[video_filename] = self.generation
+        self.last_modified = time.time()
+    
+    def _sync_dir_mtime(self) -> None:
+        # Our own write changed the directory mtime; don't treat it as an external change
+        try:
+            self._dir_mtime_ns = os.stat(self.captions_dir).st_mtime_ns
+        except FileNotFoundError:
+            pass
+    
+    def _remember(self, path: Path, mtime_ns: int, doc: Dict[str, Any]) -> None:
+        self._docs[path] = (mtime_ns, doc)
+        self._docs.move_to_end(path)
+        while len(self._docs) > self.cache_size:
+            self._docs.popitem(last=False)
+    
+    @staticmethod
+    def _make_preview(doc: Dict[str, Any]) -> Optional[str]:
+        caption = doc.get("caption")
+        if caption is None:
+            return None
+        if len(caption) <= CAPTION_PREVIEW_CHARS:
+            return caption
+        return caption[:CAPTION_PREVIEW_CHARS].rstrip() + "…"
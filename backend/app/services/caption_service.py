@@ -1,9 +1,41 @@
+import asyncio
+import glob
+import hashlib
 import json
 import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
-from .model_client import ModelServiceClient
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple, Union
+from .model_client import ModelServiceClient, VLLMClient, AVAILABLE_MODELS, model_capacity
+from .caption_index import CaptionIndex
+from .single_flight import SingleFlight
+from .result_cache import ResultCache, make_request_key
+from .proxy_service import ProxyService, ProxyProfile
+from .frame_service import FrameService, FrameProfile
+from .segment_service import SegmentService, SEGMENT_SECONDS
+from ..utils.metrics import CAPTION_IO_SECONDS
+from ..utils.timing import span
+from ..utils.file_utils import (
+    check_audio_exists,
+    get_audio_filename,
+    extract_audio_async,
+    DEFAULT_AUDIO_PROFILE,
+    AUDIO_PROFILES,
+    compute_file_hash_async
+)
+
+
+# Model that merges segment captions (empty: the captioning model itself when it accepts text)
+SEGMENT_SUMMARY_MODEL = os.getenv("SEGMENT_SUMMARY_MODEL", "")
+# Segments captioned at once per request (0: the model's capacity across its replicas)
+SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", "0"))
+# Segment captions are merged in rounds: at most this many captions per merge request...
+SEGMENT_MERGE_FANIN = max(2, int(os.getenv("SEGMENT_MERGE_FANIN", "8")))
+# ...and at most this many characters of captions (about 4 per token), so merges fit the context
+SEGMENT_MERGE_MAX_CHARS = int(os.getenv("SEGMENT_MERGE_MAX_CHARS", "24000"))
+# Output budget of intermediate merges (the final merge uses the model's max_tokens)
+SEGMENT_MERGE_MAX_TOKENS = int(os.getenv("SEGMENT_MERGE_MAX_TOKENS", "1024"))
 
 
 class CaptionService:
@@ -20,34 +52,219 @@ class CaptionService:
         self.model_name = model_name
         self.model_client = ModelServiceClient()
         
+        # One long-lived client per model (they share the pooled HTTP connections)
+        self._model_clients: Dict[str, VLLMClient] = {}
+        
+        # Identical concurrent generation requests share one upstream call
+        self.inflight = SingleFlight()
+        
+        # Model outputs keyed by video content hash + model + prompt + sampling params
+        self.result_cache = ResultCache()
+        
+        # Per-model proxy renditions sent to the models instead of the original files
+        self.proxies = ProxyService(str(self.videos_dir))
+        # Frames extracted by the backend for models in "frames" request mode
+        self.frames = FrameService(str(self.videos_dir))
+        # Fixed-window splits of long videos for segmented captioning
+        self.segments = SegmentService(str(self.videos_dir))
+        
+        # Answers to multi-prompt requests, one record per (video, model, prompt);
+        # hidden so the caption index and listings only see the main caption files
+        self.answers_dir = self.captions_dir / ".answers"
+        
         # Ensure directories exist
         self.captions_dir.mkdir(parents=True, exist_ok=True)
+        self.answers_dir.mkdir(exist_ok=True)
+        
+        # In-memory index of caption files (one directory scan, then change detection)
+        self.caption_index = CaptionIndex(str(self.captions_dir), list(AVAILABLE_MODELS.keys()))
     
-    def get_caption_path(self, video_filename: str) -> Path:
+    def get_model_client(self, model_key: str) -> VLLMClient:
+        """Get the shared client for a model, creating it on first use"""
+        client = self._model_clients.get(model_key)
+        if client is None:
+            client = VLLMClient(model_key=model_key, videos_dir=str(self.videos_dir))
+            self._model_clients[model_key] = client
+        return client
+    
+    async def ensure_model_inputs(self, video_filename: str, model_key: str) -> None:
         """
-        Get the caption file path for a video
-        Format: {video_filename}_{model_name}.json
+        Prepare derived inputs a model needs before generation
+        
+        Qwen3-Omni-Captioner is audio-only, so its audio is auto-extracted if missing.
+        Other models with an audio profile get that compact rendition once the video's
+        audio has been extracted (the original WAV marks that the audio should be sent).
+        
+        Raises:
+            ValueError: If the video has no audio track
+            MediaJobTimeout: If extraction timed out
         """
-        return self.captions_dir / f"{video_filename}_{self.model_name}.json"
-    
-    def caption_exists(self, video_filename: str) -> bool:
-        """Check if caption exists for a video"""
-        caption_path = self.get_caption_path(video_filename)
-        return caption_path.exists()
+        profile = AVAILABLE_MODELS.get(model_key, {}).get("audio_profile")
+        videos_dir = str(self.videos_dir)
+        
+        needs_audio = model_key == "qwen3omni_captioner" or (
+            profile is not None and check_audio_exists(video_filename, videos_dir)
+        )
+        if needs_audio and not check_audio_exists(video_filename, videos_dir, profile):
+            audio_path = self.videos_dir / get_audio_filename(video_filename, profile)
+            try:
+                with span("audio", profile=profile or DEFAULT_AUDIO_PROFILE):
+                    await extract_audio_async(
+                        str(self.videos_dir / video_filename),
+                        str(audio_path),
+                        profile or DEFAULT_AUDIO_PROFILE
+                    )
+            except Exception as e:
+                if model_key == "qwen3omni_captioner":
+                    raise
+                # The original WAV is still there; send that instead
+                print(f"WARNING: {profile} audio extraction failed for {video_filename}: {str(e)}")
     
-    def load_caption(self, video_filename: str) -> Optional[Dict[str, Any]]:
-        """Load caption data from JSON file"""
-        caption_path = self.get_caption_path(video_filename)
+    async def get_content_hash(self, video_filename: str) -> Optional[str]:
+        """
+        Get the content hash of a video (cached per filename + size + mtime)
         
-        if not caption_path.exists():
+        Returns:
+            Hex digest or None if the video is not available locally
+        """
+        video_path = self.videos_dir / video_filename
+        try:
+            stat = video_path.stat()
+        except OSError:
             return None
         
+        content_hash = self.result_cache.get_alias(video_filename, stat)
+        if content_hash is None:
+            with span("hash"):
+                content_hash = await compute_file_hash_async(str(video_path))
+            self.result_cache.set_alias(video_filename, stat, content_hash)
+        return content_hash
+    
+    def get_audio_input(self, video_filename: str, model_key: str) -> Optional[str]:
+        """
+        Audio rendition VLLMClient will send with a video (see VLLMClient.find_audio_filename)
+        
+        Returns:
+            The model's audio profile if that rendition exists, DEFAULT_AUDIO_PROFILE
+            for the original WAV, or None if no audio has been extracted
+        """
+        videos_dir = str(self.videos_dir)
+        profile = AVAILABLE_MODELS.get(model_key, {}).get("audio_profile")
+        if profile and check_audio_exists(video_filename, videos_dir, profile):
+            return profile
+        if check_audio_exists(video_filename, videos_dir):
+            return DEFAULT_AUDIO_PROFILE
+        return None
+    
+    def get_input_profile(
+        self,
+        model_key: str,
+        content_hash: Optional[str],
+        audio_input: Optional[str] = None
+    ) -> Tuple[Optional[Union[ProxyProfile, FrameProfile]], Optional[str]]:
+        """
+        Preprocessing applied to a model's input video
+        
+        Models in "frames" request mode get a frame set; other models get their
+        proxy rendition, if one is configured. The audio sent alongside is part
+        of the identity, so a caption made from the video alone isn't served
+        once audio has been extracted (or after the audio profile changes).
+        
+        Args:
+            audio_input: Audio rendition sent with the video (see get_audio_input)
+        
+        Returns:
+            Tuple of (frame/proxy profile or None, identity string for the result cache key)
+        """
+        if not content_hash:
+            return None, None
+        
+        audio_identity = f"audio:{audio_input or 'none'}"
+        
+        frame_profile = self.frames.profile_for(model_key)
+        if frame_profile is not None:
+            return frame_profile, f"frames:{frame_profile.name}:{frame_profile.digest()}|{audio_identity}"
+        
+        profile = self.proxies.profile_for(model_key)
+        if profile is None:
+            return None, audio_identity
+        return profile, f"proxy:{profile.name}:{profile.digest()}|{audio_identity}"
+    
+    async def prepare_model_media(
+        self,
+        video_filename: str,
+        content_hash: Optional[str],
+        profile: Optional[Union[ProxyProfile, FrameProfile]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the prepared inputs passed to VLLMClient for one generation
+        
+        Returns:
+            Media dictionary ({} when the original file is sent), or None if
+            preprocessing failed and the original file is sent instead
+        """
+        if profile is None:
+            return {}
+        
+        if isinstance(profile, FrameProfile):
+            try:
+                with span("frames", profile=profile.name):
+                    manifest = await self.frames.ensure(video_filename, content_hash, profile)
+            except Exception as e:
+                print(f"WARNING: Frame extraction failed for {video_filename}, sending the video: {str(e)}")
+                return None
+            return {
+                "frames": manifest["frames"],
+                "frames_description": self.frames.describe(manifest["timestamps"])
+            }
+        
         try:
-            with open(caption_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with span("proxy", profile=profile.name):
+                report = await self.proxies.ensure(video_filename, content_hash, profile)
         except Exception as e:
-            print(f"Error loading caption: {str(e)}")
+            print(f"WARNING: Proxy {profile.name} failed for {video_filename}, sending the original: {str(e)}")
             return None
+        return {"video_path": report["path"]}
+    
+    def get_caption_path(self, video_filename: str, model_key: Optional[str] = None) -> Path:
+        """
+        Get the caption file path for a video
+        Format: {video_filename}_{model_name}.json
+        """
+        return self.captions_dir / f"{video_filename}_{model_key or self.model_name}.json"
+    
+    def get_answer_path(self, video_filename: str, model_key: str, prompt: str) -> Path:
+        """
+        Get the answer record path for one prompt about a video
+        Format: .answers/{video_filename}_{model_name}_{prompt hash}.json
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        return self.answers_dir / f"{video_filename}_{model_key}_{prompt_hash}.json"
+    
+    def caption_exists(self, video_filename: str, model_key: Optional[str] = None) -> bool:
+        """Check if caption exists for a video"""
+        return self.caption_index.has_caption(video_filename, model_key or self.model_name)
+    
+    def would_reuse_caption(self, video_filename: str, model_key: str, prompt: Optional[str] = None) -> bool:
+        """
+        Whether generate_caption would return the stored caption instead of calling the model
+        
+        True if a caption exists for the model and either no prompt was requested
+        or it was generated with the requested prompt (regenerate is up to the caller).
+        """
+        if not self.caption_exists(video_filename, model_key):
+            return False
+        existing_caption = self.load_caption(video_filename, model_key)
+        if existing_caption is None:
+            return False
+        prompt_requested = not (prompt is None or (isinstance(prompt, str) and prompt.strip() == ""))
+        return not prompt_requested or existing_caption.get("prompt") == prompt
+    
+    def load_caption(self, video_filename: str, model_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Load caption data (served from the caption index cache)"""
+        caption_data = self.caption_index.load(video_filename, model_key or self.model_name)
+        # Copy so callers can't mutate the cached document
+        return dict(caption_data) if caption_data is not None else None
     
     def load_all_captions(self, video_filename: str) -> list[Dict[str, Any]]:
         """
@@ -56,26 +273,63 @@ class CaptionService:
         Returns:
             List of caption data dictionaries, one per model that has generated a caption
         """
-        from .model_client import AVAILABLE_MODELS
-        
         all_captions = []
         
-        for model_key, model_config in AVAILABLE_MODELS.items():
-            # Construct caption path for this model
-            caption_path = self.captions_dir / f"{video_filename}_{model_key}.json"
-            
-            if caption_path.exists():
+        for model_key in self.caption_index.models_for(video_filename):
+            caption_data = self.caption_index.load(video_filename, model_key)
+            if caption_data is None:
+                continue
+            caption_data = dict(caption_data)
+            # Add model key to the data
+            caption_data['model_key'] = model_key
+            caption_data['model_display_name'] = AVAILABLE_MODELS[model_key]['display_name']
+            all_captions.append(caption_data)
+        
+        return all_captions
+    
+    def load_answers(self, video_filename: str, model_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Load the stored answers to prompts about a video
+        
+        Args:
+            video_filename: Name of the video file
+            model_key: Only answers from this model (all models if None)
+        
+        Returns:
+            Answer records, oldest first
+        """
+        answers = []
+        pattern = str(self.answers_dir / f"{glob.escape(video_filename)}_*.json")
+        with CAPTION_IO_SECONDS.labels("read").time():
+            for path in glob.glob(pattern):
                 try:
-                    with open(caption_path, 'r', encoding='utf-8') as f:
-                        caption_data = json.load(f)
-                        # Add model key to the data
-                        caption_data['model_key'] = model_key
-                        caption_data['model_display_name'] = model_config['display_name']
-                        all_captions.append(caption_data)
+                    with open(path, 'r', encoding='utf-8') as f:
+                        answer = json.load(f)
                 except Exception as e:
-                    print(f"Error loading caption for {model_key}: {str(e)}")
+                    print(f"Error reading answer {path}: {str(e)}")
+                    continue
+                # The pattern also matches videos whose name starts with this one
+                if answer.get("filename") != video_filename:
+                    continue
+                if model_key and answer.get("model_name") != model_key:
+                    continue
+                answers.append(answer)
+        answers.sort(key=lambda answer: answer.get("generated_at", ""))
+        return answers
+    
+    def get_caption_summary(self, video_filename: str) -> tuple[List[str], Optional[str]]:
+        """
+        Get the models with captions and a preview of the first caption for a video
         
-        return all_captions
+        Served from memory: used by the video listing so it never parses caption files.
+        
+        Returns:
+            Tuple of (model keys in AVAILABLE_MODELS order, preview text or None)
+        """
+        models = self.caption_index.models_for(video_filename)
+        if not models:
+            return [], None
+        return models, self.caption_index.preview(video_filename)
     
     def save_caption(
         self,
@@ -83,7 +337,9 @@ class CaptionService:
         caption: str,
         processing_time: float,
         prompt: str = None,
-        model_version: str = "Qwen/Qwen2-VL-7B-Instruct"  # Updated by model_key at generation time
+        model_version: str = "Qwen/Qwen2-VL-7B-Instruct",  # Updated by model_key at generation time
+        model_key: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Save caption data to JSON file
@@ -94,11 +350,14 @@ class CaptionService:
             processing_time: Time taken to generate caption
             prompt: Prompt used to generate the caption
             model_version: Version identifier of the model
+            model_key: Model the caption belongs to (defaults to the service's current model)
+            extra: Additional fields stored with the caption record
         
         Returns:
             Caption data dictionary
         """
         import sys
+        model_key = model_key or self.model_name
         print(f"DEBUG save_caption: Received prompt = {repr(prompt)}", file=sys.stderr)
         
         # If prompt is None or empty, this is an error - it should have been set to default earlier
@@ -111,31 +370,74 @@ class CaptionService:
             "prompt": prompt,
             "generated_at": datetime.utcnow().isoformat() + "Z",
             "processing_time_seconds": processing_time,
-            "model_name": self.model_name,
+            "model_name": model_key,
             "model_version": model_version
         }
+        if extra:
+            caption_data.update(extra)
         
         print(f"DEBUG save_caption: caption_data['prompt'] = {repr(caption_data['prompt'])}", file=sys.stderr)
         
-        caption_path = self.get_caption_path(video_filename)
+        caption_path = self.get_caption_path(video_filename, model_key)
         
         try:
-            with open(caption_path, 'w', encoding='utf-8') as f:
+            with span("save"), CAPTION_IO_SECONDS.labels("write").time(), open(caption_path, 'w', encoding='utf-8') as f:
                 json.dump(caption_data, f, indent=2, ensure_ascii=False)
             
+            self.caption_index.record_saved(video_filename, model_key, caption_path, caption_data)
             print(f"Caption saved: {caption_path}")
             return caption_data
         
         except Exception as e:
             raise Exception(f"Failed to save caption: {str(e)}")
     
-    def delete_caption(self, video_filename: str) -> bool:
+    def save_answer(
+        self,
+        video_filename: str,
+        caption: str,
+        processing_time: float,
+        prompt: str,
+        model_version: str,
+        model_key: str,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Save the answer to one prompt as its own record (same fields as a caption)
+        
+        Returns:
+            Answer data dictionary
+        """
+        answer_data = {
+            "filename": video_filename,
+            "caption": caption,
+            "prompt": prompt,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "processing_time_seconds": processing_time,
+            "model_name": model_key,
+            "model_version": model_version
+        }
+        if extra:
+            answer_data.update(extra)
+        
+        answer_path = self.get_answer_path(video_filename, model_key, prompt)
+        try:
+            with span("save"), CAPTION_IO_SECONDS.labels("write").time(), open(answer_path, 'w', encoding='utf-8') as f:
+                json.dump(answer_data, f, indent=2, ensure_ascii=False)
+            print(f"Answer saved: {answer_path}")
+            return answer_data
+        
+        except Exception as e:
+            raise Exception(f"Failed to save answer: {str(e)}")
+    
+    def delete_caption(self, video_filename: str, model_key: Optional[str] = None) -> bool:
         """Delete caption file"""
-        caption_path = self.get_caption_path(video_filename)
+        model_key = model_key or self.model_name
+        caption_path = self.get_caption_path(video_filename, model_key)
         
         if caption_path.exists():
             try:
                 caption_path.unlink()
+                self.caption_index.record_deleted(video_filename, model_key)
                 print(f"Caption deleted: {caption_path}")
                 return True
             except Exception as e:
@@ -144,6 +446,30 @@ class CaptionService:
         
         return False
     
+    def resolve_prompt(self, prompt: Optional[str], model_key: str) -> str:
+        """
+        Return the prompt actually sent to the model (model default when none given)
+        
+        Raises:
+            ValueError: If no usable prompt could be determined
+        """
+        # Check explicitly for None or empty string
+        if prompt is None or (isinstance(prompt, str) and prompt.strip() == ""):
+            # Model-specific default prompts
+            default_prompts = {
+                "qwen2vl": "Describe what you see in this video, including actions, objects, and any visible text on screen.",
+                "omnivinci": "Describe this video including both visual content and audio track. Mention any speech, music, sounds, or audio details you detect.",
+                "qwen3omni": "Analyze the video thoroughly and provide a cohesive, narrative-style description. Integrate all elements — visuals, sounds, dialogue, objects, atmosphere, and any other details — into a single, unified account. Do not separate the discussion into sections about audio or visuals; instead, blend everything together naturally, as if describing the experience of watching the video in real time. Focus on explaining what's happening, why it's happening, and what it means within the context of the overall story or message.",
+                "qwen3omni_captioner": "Audio-only captioning model - no prompt needed (prompt is ignored)."
+            }
+            prompt = default_prompts.get(model_key, "Describe this video in detail, including what you see, hear, and any actions taking place.")
+        
+        # Ensure prompt is never None at this point - use explicit check instead of assert
+        if prompt is None or (isinstance(prompt, str) and prompt.strip() == ""):
+            raise ValueError(f"Prompt should not be None or empty at this point. Received: {repr(prompt)}")
+        
+        return prompt
+    
     async def generate_caption(
         self,
         video_filename: str,
@@ -167,9 +493,10 @@ class CaptionService:
         self.model_name = model_key
         
         # Check if caption already exists for this model
-        # IMPORTANT: Only return existing caption if NOT regenerating
-        if not regenerate and self.caption_exists(video_filename):
-            existing_caption = self.load_caption(video_filename)
+        # IMPORTANT: Only return existing caption if NOT regenerating, and only if it
+        # was generated with the requested prompt (a different prompt must not get a stale caption)
+        if not regenerate and self.would_reuse_caption(video_filename, model_key, prompt):
+            existing_caption = self.load_caption(video_filename, model_key)
             if existing_caption:
                 # If existing caption has no prompt, update it with default before returning
                 if not existing_caption.get("prompt"):
@@ -190,7 +517,8 @@ class CaptionService:
                         caption=existing_caption["caption"],
                         processing_time=existing_caption["processing_time_seconds"],
                         prompt=default_prompt,
-                        model_version=existing_caption.get("model_version", "unknown")
+                        model_version=existing_caption.get("model_version", "unknown"),
+                        model_key=model_key
                     )
                 return existing_caption
         
@@ -198,30 +526,49 @@ class CaptionService:
         # The video filename is passed to the model client which constructs the remote URL
         
         # Set default prompt if none provided (so we save the actual prompt used)
-        # Check explicitly for None or empty string
-        if prompt is None or (isinstance(prompt, str) and prompt.strip() == ""):
-            # Model-specific default prompts
-            default_prompts = {
-                "qwen2vl": "Describe what you see in this video, including actions, objects, and any visible text on screen.",
-                "omnivinci": "Describe this video including both visual content and audio track. Mention any speech, music, sounds, or audio details you detect.",
-                "qwen3omni": "Analyze the video thoroughly and provide a cohesive, narrative-style description. Integrate all elements — visuals, sounds, dialogue, objects, atmosphere, and any other details — into a single, unified account. Do not separate the discussion into sections about audio or visuals; instead, blend everything together naturally, as if describing the experience of watching the video in real time. Focus on explaining what's happening, why it's happening, and what it means within the context of the overall story or message.",
-                "qwen3omni_captioner": "Audio-only captioning model - no prompt needed (prompt is ignored)."
-            }
-            prompt = default_prompts.get(model_key, "Describe this video in detail, including what you see, hear, and any actions taking place.")
+        prompt = self.resolve_prompt(prompt, model_key)
         
-        # Ensure prompt is never None at this point - use explicit check instead of assert
-        if prompt is None or (isinstance(prompt, str) and prompt.strip() == ""):
-            raise ValueError(f"Prompt should not be None or empty at this point. Received: {repr(prompt)}")
+        # Reuse the long-lived client for the selected model
+        model_client = self.get_model_client(model_key)
         
-        # Create model client for selected model
-        from .model_client import VLLMClient
-        model_client = VLLMClient(model_key=model_key, videos_dir=str(self.videos_dir))
+        # Content-addressed cache: identical video bytes + model + prompt + sampling params
+        # (+ input preprocessing) never hit the model twice, whatever the file is called
+        sampling_params = model_client.get_sampling_params()
+        content_hash = await self.get_content_hash(video_filename)
+        audio_input = self.get_audio_input(video_filename, model_key)
+        profile, input_profile = self.get_input_profile(model_key, content_hash, audio_input)
+        request_key = make_request_key(model_key, prompt, sampling_params, input_profile)
         
-        # Generate caption using vLLM service
-        result = await model_client.generate_caption(
-            video_filename,
-            prompt=prompt
-        )
+        cached_result = None
+        if content_hash and not regenerate:
+            with span("cache"):
+                cached_result = self.result_cache.get(content_hash, request_key)
+        
+        if cached_result is not None:
+            result = cached_result
+        else:
+            # Concurrent requests for the same content + model + prompt + sampling params
+            # (double-clicks, several users) wait on one upstream call instead of each hitting the GPU
+            flight_key = (content_hash or video_filename, request_key)
+            
+            async def generate() -> Dict[str, Any]:
+                # Proxy rendition for this model (built on first use, then served from disk)
+                media = await self.prepare_model_media(video_filename, content_hash, profile)
+                
+                # Generate caption using vLLM service
+                result = await model_client.generate_caption(
+                    video_filename,
+                    prompt=prompt,
+                    media=media or {}
+                )
+                # Don't cache an original-file result under the proxy request key
+                if content_hash and media is not None:
+                    self.result_cache.put(content_hash, request_key, model_key, prompt, sampling_params, result)
+                return result
+            
+            # Includes waiting on an identical in-flight generation started by another request
+            with span("generate"):
+                result = await self.inflight.do(flight_key, generate)
         
         # Double-check prompt before saving
         if prompt is None or (isinstance(prompt, str) and prompt.strip() == ""):
@@ -232,7 +579,16 @@ class CaptionService:
             video_filename=video_filename,
             caption=result["caption"],
             processing_time=result["processing_time"],
-            prompt=prompt
+            prompt=prompt,
+            model_version=result.get("model") or "unknown",
+            model_key=model_key,
+            extra={
+                "content_hash": content_hash,
+                "sampling_params": sampling_params,
+                "input_profile": input_profile,
+                "audio_input": audio_input,
+                "from_cache": cached_result is not None
+            }
         )
         
         # Verify prompt was saved correctly
@@ -240,5 +596,398 @@ class CaptionService:
             raise ValueError(f"Prompt was not saved! Caption data: {caption_data}")
         
         return caption_data
-
-
+    
+    async def generate_answers(
+        self,
+        video_filename: str,
+        prompts: List[str],
+        model_key: str = "omnivinci",
+        regenerate: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer several prompts about one video, storing each answer as its own record
+        
+        Answers already in the result cache are reused; the rest go to the model
+        in one request (a single batched pass for OmniVinci, see
+        VLLMClient.generate_multi). The main caption file is not touched.
+        
+        Args:
+            video_filename: Name of the video file
+            prompts: Prompts to answer (blank and duplicate prompts are dropped)
+            model_key: Model to use
+            regenerate: If True, bypass cached answers
+        
+        Returns:
+            One answer data dictionary per distinct prompt, in order
+        
+        Raises:
+            ValueError: If no usable prompt was given
+        """
+        prompts = list(dict.fromkeys(prompt.strip() for prompt in prompts if prompt and prompt.strip()))
+        if not prompts:
+            raise ValueError("At least one non-empty prompt is required")
+        
+        model_client = self.get_model_client(model_key)
+        sampling_params = model_client.get_sampling_params()
+        content_hash = await self.get_content_hash(video_filename)
+        audio_input = self.get_audio_input(video_filename, model_key)
+        profile, input_profile = self.get_input_profile(model_key, content_hash, audio_input)
+        request_keys = {
+            prompt: make_request_key(model_key, prompt, sampling_params, input_profile) for prompt in prompts
+        }
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        if content_hash and not regenerate:
+            with span("cache"):
+                for prompt in prompts:
+                    cached_result = self.result_cache.get(content_hash, request_keys[prompt])
+                    if cached_result is not None:
+                        results[prompt] = cached_result
+        from_cache = set(results)
+        
+        missing = [prompt for prompt in prompts if prompt not in results]
+        if missing:
+            media = await self.prepare_model_media(video_filename, content_hash, profile)
+            with span("generate", prompts=len(missing)):
+                generated = await model_client.generate_multi(video_filename, missing, media=media or {})
+            for prompt, result in zip(missing, generated):
+                results[prompt] = result
+                # Don't cache an original-file result under the proxy request key
+                if content_hash and media is not None:
+                    self.result_cache.put(content_hash, request_keys[prompt], model_key, prompt, sampling_params, result)
+        
+        return [
+            self.save_answer(
+                video_filename=video_filename,
+                caption=results[prompt]["caption"],
+                processing_time=results[prompt]["processing_time"],
+                prompt=prompt,
+                model_version=results[prompt].get("model") or "unknown",
+                model_key=model_key,
+                extra={
+                    "content_hash": content_hash,
+                    "sampling_params": sampling_params,
+                    "input_profile": input_profile,
+                    "audio_input": audio_input,
+                    "from_cache": prompt in from_cache
+                }
+            )
+            for prompt in prompts
+        ]
+    
+    async def stream_caption(
+        self,
+        video_filename: str,
+        prompt: Optional[str] = None,
+        model_key: str = "qwen2vl",
+        regenerate: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate a caption while streaming tokens, then persist it
+        
+        Yields {"type": "token", "text": ...} events as the model produces them and
+        a final {"type": "done", "caption_data": ...} event once the caption has
+        been saved. Existing or cached captions are replayed as a single token.
+        
+        Args:
+            video_filename: Name of the video file
+            prompt: Optional custom prompt
+            model_key: Model to use
+            regenerate: If True, regenerate even if caption exists
+        """
+        prompt_requested = not (prompt is None or (isinstance(prompt, str) and prompt.strip() == ""))
+        
+        # Existing caption generated with the requested prompt
+        if not regenerate and self.caption_exists(video_filename, model_key):
+            existing_caption = self.load_caption(video_filename, model_key)
+            if existing_caption and existing_caption.get("prompt") and (
+                not prompt_requested or existing_caption.get("prompt") == prompt
+            ):
+                yield {"type": "token", "text": existing_caption["caption"]}
+                yield {"type": "done", "caption_data": existing_caption}
+                return
+        
+        prompt = self.resolve_prompt(prompt, model_key)
+        model_client = self.get_model_client(model_key)
+        sampling_params = model_client.get_sampling_params()
+        content_hash = await self.get_content_hash(video_filename)
+        audio_input = self.get_audio_input(video_filename, model_key)
+        profile, input_profile = self.get_input_profile(model_key, content_hash, audio_input)
+        request_key = make_request_key(model_key, prompt, sampling_params, input_profile)
+        
+        # Same content + request already generated under any filename
+        cached_result = None
+        if content_hash and not regenerate:
+            with span("cache"):
+                cached_result = self.result_cache.get(content_hash, request_key)
+        if cached_result is not None:
+            caption_data = self.save_caption(
+                video_filename=video_filename,
+                caption=cached_result["caption"],
+                processing_time=cached_result["processing_time"],
+                prompt=prompt,
+                model_version=cached_result.get("model") or "unknown",
+                model_key=model_key,
+                extra={
+                    "content_hash": content_hash,
+                    "sampling_params": sampling_params,
+                    "input_profile": input_profile,
+                    "audio_input": audio_input,
+                    "from_cache": True
+                }
+            )
+            yield {"type": "token", "text": caption_data["caption"]}
+            yield {"type": "done", "caption_data": caption_data}
+            return
+        
+        media = await self.prepare_model_media(video_filename, content_hash, profile)
+        
+        result = None
+        async for event in model_client.stream_caption(video_filename, prompt=prompt, media=media or {}):
+            if event["type"] == "token":
+                yield event
+            else:
+                result = event
+        
+        if result is None:
+            raise Exception("Model stream ended without a result")
+        
+        if content_hash and media is not None:
+            self.result_cache.put(content_hash, request_key, model_key, prompt, sampling_params, result)
+        
+        caption_data = self.save_caption(
+            video_filename=video_filename,
+            caption=result["caption"],
+            processing_time=result["processing_time"],
+            prompt=prompt,
+            model_version=result.get("model") or "unknown",
+            model_key=model_key,
+            extra={
+                "content_hash": content_hash,
+                "sampling_params": sampling_params,
+                "input_profile": input_profile,
+                "audio_input": audio_input,
+                "from_cache": False,
+                "time_to_first_token_seconds": result.get("time_to_first_token"),
+                "tokens_per_second": result.get("tokens_per_second")
+            }
+        )
+        yield {"type": "done", "caption_data": caption_data}
+    
+    @staticmethod
+    def group_for_merge(items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Split consecutive captions into merge groups
+        
+        A group takes up to SEGMENT_MERGE_FANIN captions and stops at
+        SEGMENT_MERGE_MAX_CHARS, but always holds at least two (so every round
+        shrinks the list); merge_prompt trims an oversized pair to the budget.
+        """
+        groups: List[List[Dict[str, Any]]] = []
+        group: List[Dict[str, Any]] = []
+        chars = 0
+        for item in items:
+            size = len(item["caption"])
+            if group and len(group) >= 2 and (len(group) >= SEGMENT_MERGE_FANIN or chars + size > SEGMENT_MERGE_MAX_CHARS):
+                groups.append(group)
+                group, chars = [], 0
+            group.append(item)
+            chars += size
+        if group:
+            groups.append(group)
+        return groups
+    
+    @staticmethod
+    def merge_prompt(group: List[Dict[str, Any]], prompt: str, final: bool) -> str:
+        """Text-only prompt merging a group of consecutive captions (trimmed to SEGMENT_MERGE_MAX_CHARS)"""
+        per_caption = SEGMENT_MERGE_MAX_CHARS // len(group)
+        captions = "\n\n".join(
+            f"[{c['start']:.0f}s - {c['end']:.0f}s]\n{c['caption'][:per_caption]}" for c in group
+        )
+        if final:
+            instructions = (
+                "Merge them into a single cohesive caption of the whole video that follows these instructions: "
+                f"{prompt}"
+            )
+        else:
+            instructions = (
+                f"Merge them into one detailed caption of this part of the video "
+                f"({group[0]['start']:.0f}s to {group[-1]['end']:.0f}s). It will later be merged with the "
+                "captions of the other parts, so keep every event in order and don't add an introduction or "
+                f"conclusion. The captions were written for these instructions: {prompt}"
+            )
+        return (
+            "Below are captions of consecutive segments of one video, in order, with their time ranges.\n"
+            f"{instructions}\n\n{captions}"
+        )
+    
+    async def merge_segment_captions(
+        self,
+        segment_captions: List[Dict[str, Any]],
+        prompt: str,
+        summary_model: str
+    ) -> Tuple[str, int]:
+        """
+        Merge segment captions hierarchically into one caption
+        
+        Groups of consecutive captions (bounded by SEGMENT_MERGE_FANIN and
+        SEGMENT_MERGE_MAX_CHARS) are merged concurrently, then the merges are
+        merged, until one group is left for the final merge. No request ever
+        exceeds the character budget, however long the video.
+        
+        Returns:
+            Tuple of (caption, merge rounds)
+        """
+        summary_client = self.get_model_client(summary_model)
+        semaphore = asyncio.Semaphore(max(1, SEGMENT_CONCURRENCY or model_capacity(summary_model)))
+        items = [{"start": c["start"], "end": c["end"], "caption": c["caption"]} for c in segment_captions]
+        rounds = 0
+        
+        async def merge(group: List[Dict[str, Any]], final: bool) -> Dict[str, Any]:
+            if len(group) == 1 and not final:
+                return group[0]
+            async with semaphore:
+                summary = await summary_client.complete_text(
+                    self.merge_prompt(group, prompt, final),
+                    max_tokens=None if final else SEGMENT_MERGE_MAX_TOKENS
+                )
+            return {"start": group[0]["start"], "end": group[-1]["end"], "caption": summary["caption"]}
+        
+        while True:
+            rounds += 1
+            groups = self.group_for_merge(items)
+            if len(groups) == 1:
+                return (await merge(groups[0], final=True))["caption"], rounds
+            items = await asyncio.gather(*[merge(group, final=False) for group in groups])
+    
+    async def generate_segmented_caption(
+        self,
+        video_filename: str,
+        prompt: Optional[str] = None,
+        model_key: str = "qwen2vl",
+        segment_seconds: int = SEGMENT_SECONDS,
+        regenerate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Caption a long video map-reduce style
+        
+        The video is split into fixed windows (stream copy at keyframes), the
+        segments are captioned concurrently, and text-only requests merge the
+        segment captions into one, in rounds for long videos (see
+        merge_segment_captions). Per-segment captions and timestamps are
+        stored with the caption record.
+        
+        Args:
+            video_filename: Name of the video file
+            prompt: Optional custom prompt (applied to every segment)
+            model_key: Model used for the segments
+            segment_seconds: Target segment length
+            regenerate: If True, regenerate even if a segmented caption exists
+        
+        Returns:
+            Caption data dictionary (with "segments")
+        """
+        prompt_requested = not (prompt is None or (isinstance(prompt, str) and prompt.strip() == ""))
+        
+        if not regenerate and self.caption_exists(video_filename, model_key):
+            existing_caption = self.load_caption(video_filename, model_key)
+            if (
+                existing_caption
+                and existing_caption.get("segments")
+                and existing_caption.get("segment_seconds") == segment_seconds
+                and (not prompt_requested or existing_caption.get("prompt") == prompt)
+            ):
+                return existing_caption
+        
+        start_time = time.time()
+        prompt = self.resolve_prompt(prompt, model_key)
+        model_client = self.get_model_client(model_key)
+        sampling_params = model_client.get_sampling_params()
+        
+        content_hash = await self.get_content_hash(video_filename)
+        if content_hash is None:
+            raise FileNotFoundError(f"Video not found: {video_filename}")
+        
+        with span("split"):
+            manifest = await self.segments.ensure(video_filename, content_hash, segment_seconds)
+        segments = manifest["segments"]
+        
+        # Audio-aware models hear each segment's own audio, not the whole video's
+        audio_profile = AVAILABLE_MODELS[model_key].get("audio_profile")
+        send_audio = model_key == "qwen3omni_captioner" or (
+            audio_profile is not None and check_audio_exists(video_filename, str(self.videos_dir))
+        )
+        
+        concurrency = SEGMENT_CONCURRENCY or model_capacity(model_key)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def caption_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+            segment_prompt = (
+                f"{prompt}\n\nThis clip is part {segment['index'] + 1} of {len(segments)} of a longer video "
+                f"(from {segment['start']:.0f}s to {segment['end']:.0f}s)."
+            )
+            # Segment results are cached under the parent video's hash, so a retry
+            # after a partial failure only re-runs the segments that failed
+            request_key = make_request_key(
+                model_key, segment_prompt, sampling_params,
+                input_profile=f"segment:{segment_seconds}s:{segment['index']}"
+            )
+            result = None if regenerate else self.result_cache.get(content_hash, request_key)
+            
+            if result is None:
+                media: Dict[str, Any] = {"video_path": segment["path"], "audio_path": None}
+                if send_audio:
+                    profile = audio_profile or DEFAULT_AUDIO_PROFILE
+                    segment_path = self.videos_dir / segment["path"]
+                    audio_path = segment_path.with_name(segment_path.stem + AUDIO_PROFILES[profile]["suffix"])
+                    try:
+                        if not audio_path.exists():
+                            with span("audio", profile=profile, segment=segment["index"]):
+                                await extract_audio_async(str(segment_path), str(audio_path), profile)
+                        media["audio_path"] = str(audio_path.relative_to(self.videos_dir))
+                    except ValueError:
+                        pass  # No audio in this segment
+                
+                async with semaphore:
+                    result = await model_client.generate_caption(video_filename, prompt=segment_prompt, media=media)
+                self.result_cache.put(content_hash, request_key, model_key, segment_prompt, sampling_params, result)
+            
+            return {
+                "index": segment["index"],
+                "start": segment["start"],
+                "end": segment["end"],
+                "caption": result["caption"],
+                "processing_time_seconds": result["processing_time"]
+            }
+        
+        segment_captions = await asyncio.gather(*[caption_segment(segment) for segment in segments])
+        
+        # Reduce: merge the segment captions with text-only requests
+        summary_model = None
+        merge_rounds = 0
+        if len(segment_captions) == 1:
+            caption = segment_captions[0]["caption"]
+        else:
+            summary_model = SEGMENT_SUMMARY_MODEL or (
+                model_key if model_key not in ("omnivinci", "qwen3omni_captioner") else "qwen2vl"
+            )
+            with span("reduce", model=summary_model):
+                caption, merge_rounds = await self.merge_segment_captions(segment_captions, prompt, summary_model)
+        
+        return self.save_caption(
+            video_filename=video_filename,
+            caption=caption,
+            processing_time=time.time() - start_time,
+            prompt=prompt,
+            model_version=model_client.model_name,
+            model_key=model_key,
+            extra={
+                "content_hash": content_hash,
+                "sampling_params": sampling_params,
+                "mode": "segmented",
+                "segment_seconds": segment_seconds,
+                "summary_model": summary_model,
+                "merge_rounds": merge_rounds,
+                "segments": segment_captions
+            }
+        )
@@ -0,0 +1,223 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from .resilience import ModelOverloadedError, ModelResponseError, ModelTimeoutError
+
+
+# Adaptive (AIMD) concurrency limit per model backend
+MODEL_LIMIT_MIN = int(os.getenv("MODEL_LIMIT_MIN", "1"))
+# Upper bound as a multiple of the model's configured capacity (max_in_flight x replicas)
+MODEL_LIMIT_MAX_FACTOR = float(os.getenv("MODEL_LIMIT_MAX_FACTOR", "2"))
+# Multiplicative decrease on 429/5xx/timeouts
+MODEL_LIMIT_BACKOFF = float(os.getenv("MODEL_LIMIT_BACKOFF", "0.7"))
+# Requests allowed to wait for a slot; beyond this they are rejected with 503 + Retry-After
+MODEL_QUEUE_MAX = int(os.getenv("MODEL_QUEUE_MAX", "32"))
+# Never shorter than MODEL_REQUEST_TIMEOUT_SEC (see ConcurrencyLimiterRegistry), or a
+# request queued behind one long generation would fail even at limit 1
+MODEL_QUEUE_TIMEOUT_SEC = float(os.getenv("MODEL_QUEUE_TIMEOUT_SEC", "300"))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit with a bounded FIFO wait queue for one model
+    
+    The limit grows by one after a full limit's worth of successful requests
+    and is multiplied by MODEL_LIMIT_BACKOFF when the backend answers 429/5xx
+    or times out. Latency alone never shrinks the limit: caption latency
+    follows clip length far more than server load, so a long clip among
+    short ones would read as overload. At most one decrease is applied per
+    baseline latency, so one burst of failures from requests sent at the
+    same time only backs off once.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int = MODEL_LIMIT_MIN,
+        max_limit: Optional[int] = None,
+        max_queue: int = MODEL_QUEUE_MAX,
+        queue_timeout: float = MODEL_QUEUE_TIMEOUT_SEC,
+        backoff: float = MODEL_LIMIT_BACKOFF
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._successes_since_increase = 0
+        self._last_decrease = 0.0
+        
+        # Used for Retry-After and the decrease cooldown, not as an overload signal
+        self.latency_short: Optional[float] = None  # EWMA, alpha 0.3
+        self.latency_baseline: Optional[float] = None  # EWMA, alpha 0.02
+        
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.decreases = 0
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    def _has_capacity(self) -> bool:
+        return self.in_flight < math.floor(self.limit)
+    
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: roughly the time to drain the queue once"""
+        per_request = self.latency_short or 1.0
+        return max(1, math.ceil(per_request * (self.queued + 1) / max(1.0, self.limit)))
+    
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """
+        Hold one concurrency slot for the duration of a model request
+        
+        Raises:
+            ModelOverloadedError: If the wait queue is full or the wait exceeded queue_timeout
+        """
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+        else:
+            await self._wait_for_slot()
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._wake_waiters()
+    
+    async def _wait_for_slot(self) -> None:
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise ModelOverloadedError(
+                f"Model service overloaded: {self.name} is at its concurrency limit "
+                f"({math.floor(self.limit)}) with {self.queued} requests queued",
+                retry_after=self.retry_after()
+            )
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        try:
+            # The slot is handed over by _wake_waiters (in_flight already incremented)
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Got a slot just as we gave up; hand it back
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise ModelOverloadedError(
+                    f"Model service overloaded: waited {self.queue_timeout:g}s for a {self.name} slot",
+                    retry_after=self.retry_after()
+                )
+            raise
+    
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+    
+    def record_success(self, latency: float) -> None:
+        """A request finished normally after latency seconds"""
+        self.latency_short = latency if self.latency_short is None else 0.7 * self.latency_short + 0.3 * latency
+        self.latency_baseline = latency if self.latency_baseline is None else 0.98 * self.latency_baseline + 0.02 * latency
+        
+        # Additive increase: +1 after a full window of successes at the current limit
+        self._successes_since_increase += 1
+        if self._successes_since_increase >= math.floor(self.limit) and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._successes_since_increase = 0
+            self._wake_waiters()
+    
+    def record_overload(self, reason: str) -> None:
+        """The backend signalled overload (429, 5xx or a timeout)"""
+        self._decrease(reason)
+    
+    def _decrease(self, reason: str) -> None:
+        now = time.time()
+        if now - self._last_decrease < (self.latency_baseline or 1.0):
+            return
+        self._last_decrease = now
+        self._successes_since_increase = 0
+        new_limit = max(self.min_limit, self.limit * self.backoff)
+        if math.floor(new_limit) < math.floor(self.limit):
+            print(f"Concurrency limit for {self.name}: {math.floor(self.limit)} -> {math.floor(new_limit)} ({reason})")
+        self.limit = new_limit
+        self.decreases += 1
+    
+    def record_error(self, error: BaseException) -> None:
+        """Classify a failed request: only backend overload signals shrink the limit"""
+        if isinstance(error, ModelTimeoutError):
+            self.record_overload("timeout")
+        elif isinstance(error, ModelResponseError) and (
+            error.upstream_status == 429 or error.upstream_status >= 500
+        ):
+            self.record_overload(f"HTTP {error.upstream_status}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": math.floor(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": self.rejected,
+            "queue_timeouts": self.timed_out,
+            "decreases": self.decreases,
+            "latency_recent_seconds": round(self.latency_short, 3) if self.latency_short is not None else None,
+            "latency_baseline_seconds": round(self.latency_baseline, 3) if self.latency_baseline is not None else None
+        }
+
+
+class ConcurrencyLimiterRegistry:
+    """One AdaptiveLimiter per model key, sized from the model's configured capacity"""
+    
+    def __init__(self):
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+    
+    def get(self, model_key: str) -> AdaptiveLimiter:
+        if model_key not in self._limiters:
+            from .model_client import model_capacity, MODEL_REQUEST_TIMEOUT_SEC
+            capacity = model_capacity(model_key)
+            self._limiters[model_key] = AdaptiveLimiter(
+                model_key,
+                initial_limit=capacity,
+                max_limit=max(capacity, math.floor(capacity * MODEL_LIMIT_MAX_FACTOR)),
+                queue_timeout=max(MODEL_QUEUE_TIMEOUT_SEC, MODEL_REQUEST_TIMEOUT_SEC)
+            )
+        return self._limiters[model_key]
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        from .model_client import AVAILABLE_MODELS
+        return {model_key: self.get(model_key).stats() for model_key in AVAILABLE_MODELS}
+
+
+# Shared registry used by VLLMClient and the stats endpoints
+concurrency_limiters = ConcurrencyLimiterRegistry()
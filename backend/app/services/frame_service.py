@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, asdict, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .single_flight import SingleFlight
+from ..utils.file_utils import run_ffmpeg_async, get_video_metadata_async
+
+
+# Frame sets live under VIDEOS_DIR so the video HTTP server (port 8080) serves them to the models
+FRAMES_DIR_NAME = os.getenv("FRAMES_DIR_NAME", ".frames")
+FRAME_EXTRACT_TIMEOUT_SEC = float(os.getenv("FRAME_EXTRACT_TIMEOUT_SEC", "300"))
+
+
+@dataclass(frozen=True)
+class FrameProfile:
+    """How frames are sampled from a video for image-list requests"""
+    name: str
+    num_frames: int  # Uniform mode: exact count; fps mode: upper bound
+    fps: Optional[float] = None  # None samples num_frames uniformly over the whole video
+    max_side: int = 448  # Longest side in pixels (downscale only)
+    image_format: str = "jpg"  # jpg or webp
+    quality: int = 85  # 0-100
+    
+    def digest(self) -> str:
+        """Short hash of every setting, so changing a profile never reuses old frames"""
+        payload = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=4).hexdigest()
+
+
+# Sampling presets; models pick one with "frame_profile" in AVAILABLE_MODELS
+FRAME_PROFILES = {
+    # Fixed frame budget regardless of length: predictable latency and GPU memory
+    "uniform": FrameProfile(
+        name="uniform",
+        num_frames=int(os.getenv("FRAMES_UNIFORM_COUNT", "16")),
+        max_side=int(os.getenv("FRAMES_UNIFORM_MAX_SIDE", "448")),
+        image_format=os.getenv("FRAMES_UNIFORM_FORMAT", "jpg")
+    ),
+    # Constant temporal density (more detail on long videos), capped at num_frames
+    "fps": FrameProfile(
+        name="fps",
+        num_frames=int(os.getenv("FRAMES_FPS_MAX_COUNT", "32")),
+        fps=float(os.getenv("FRAMES_FPS_RATE", "0.5")),
+        max_side=int(os.getenv("FRAMES_FPS_MAX_SIDE", "448")),
+        image_format=os.getenv("FRAMES_FPS_FORMAT", "jpg")
+    ),
+}
+
+
+class FrameService:
+    """
+    Frame sets extracted from videos for image-list requests
+    
+    All frames of a set are decoded in one ffmpeg pass (fps + scale filters)
+    in the media worker pool and cached in VIDEOS_DIR/.frames/<hash>_<profile>_<digest>/
+    with a manifest of frame paths and timestamps, so the inference hosts
+    receive small images instead of decoding the whole video themselves.
+    """
+    
+    def __init__(self, videos_dir: str):
+        self.videos_dir = Path(videos_dir)
+        self.frames_dir = self.videos_dir / FRAMES_DIR_NAME
+        # Concurrent requests for the same frame set wait on one extraction
+        self.inflight = SingleFlight()
+    
+    def profile_for(self, model_key: str) -> Optional[FrameProfile]:
+        """Frame profile of a model in "frames" request mode, otherwise None"""
+        from .model_client import AVAILABLE_MODELS
+        model_config = AVAILABLE_MODELS.get(model_key, {})
+        if model_config.get("request_mode") != "frames":
+            return None
+        profile_name = model_config.get("frame_profile") or "uniform"
+        profile = FRAME_PROFILES.get(profile_name)
+        if profile is None:
+            print(f"WARNING: Unknown frame profile '{profile_name}' for {model_key}; sending the video")
+            return None
+        
+        # Per-model overrides of the preset's frame budget and resolution
+        overrides = {}
+        if model_config.get("frame_count"):
+            overrides["num_frames"] = model_config["frame_count"]
+        if model_config.get("frame_max_side"):
+            overrides["max_side"] = model_config["frame_max_side"]
+        return replace(profile, **overrides) if overrides else profile
+    
+    def set_name(self, content_hash: str, profile: FrameProfile) -> str:
+        return f"{content_hash}_{profile.name}_{profile.digest()}"
+    
+    def get_manifest(self, content_hash: str, profile: FrameProfile) -> Optional[Dict[str, Any]]:
+        """
+        Manifest of an existing frame set
+        
+        Returns:
+            Dictionary with frame paths (relative to VIDEOS_DIR) and timestamps, or None
+        """
+        manifest_path = self.frames_dir / self.set_name(content_hash, profile) / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading frame manifest {manifest_path}: {str(e)}")
+            return None
+    
+    async def ensure(self, video_filename: str, content_hash: str, profile: FrameProfile) -> Dict[str, Any]:
+        """
+        Get the frame set for a video, extracting it on first use
+        
+        Args:
+            video_filename: Source video filename in VIDEOS_DIR
+            content_hash: Content hash of the source video
+            profile: Sampling settings
+        
+        Returns:
+            Manifest with frame paths, timestamps and extraction time
+        
+        Raises:
+            MediaCommandError: If extraction failed
+            MediaJobTimeout: If extraction exceeded FRAME_EXTRACT_TIMEOUT_SEC
+        """
+        manifest = self.get_manifest(content_hash, profile)
+        if manifest is not None:
+            return manifest
+        
+        return await self.inflight.do(
+            (content_hash, profile.name, profile.digest()),
+            lambda: self._extract(video_filename, content_hash, profile)
+        )
+    
+    async def _extract(self, video_filename: str, content_hash: str, profile: FrameProfile) -> Dict[str, Any]:
+        source_path = self.videos_dir / video_filename
+        name = self.set_name(content_hash, profile)
+        set_dir = self.frames_dir / name
+        tmp_dir = self.frames_dir / f".{name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        
+        metadata = await get_video_metadata_async(str(source_path)) or {}
+        duration = metadata.get("duration")
+        
+        # Sampling rate: a fixed rate, or num_frames spread evenly over the duration
+        if profile.fps:
+            rate = profile.fps
+        elif duration:
+            rate = profile.num_frames / duration
+        else:
+            rate = 1.0
+        side = profile.max_side
+        video_filter = (
+            f"fps={rate:.6f},"
+            f"scale='if(gte(iw,ih),min({side},iw),-2)':'if(gte(iw,ih),-2,min({side},ih))'"
+        )
+        
+        args = [
+            'ffmpeg', '-y', '-i', str(source_path),
+            '-an', '-vf', video_filter,
+            '-frames:v', str(profile.num_frames),
+        ]
+        if profile.image_format == "webp":
+            args += ['-c:v', 'libwebp', '-quality', str(profile.quality)]
+        else:
+            # Map 0-100 quality onto the mjpeg qscale (2 = best, 31 = worst)
+            args += ['-q:v', str(max(2, min(31, round(31 - profile.quality * 29 / 100))))]
+        args += [str(tmp_dir / f"frame_%04d.{profile.image_format}")]
+        
+        start_time = time.time()
+        try:
+            await run_ffmpeg_async(args, timeout=FRAME_EXTRACT_TIMEOUT_SEC)
+            frame_files = sorted(p.name for p in tmp_dir.iterdir())
+            if not frame_files:
+                raise Exception("Frame extraction produced no frames")
+            
+            manifest = {
+                "video_filename": video_filename,
+                "content_hash": content_hash,
+                "profile": profile.name,
+                "profile_settings": asdict(profile),
+                "frames": [f"{FRAMES_DIR_NAME}/{name}/{frame}" for frame in frame_files],
+                # The fps filter emits the frame nearest each multiple of 1/rate
+                "timestamps": [round(i / rate, 2) for i in range(len(frame_files))],
+                "total_bytes": sum((tmp_dir / frame).stat().st_size for frame in frame_files),
+                "extract_seconds": round(time.time() - start_time, 3),
+                "created_at": datetime.now().isoformat()
+            }
+            with open(tmp_dir / "manifest.json", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            
+            shutil.rmtree(set_dir, ignore_errors=True)
+            os.replace(tmp_dir, set_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print(
+            f"Extracted {len(manifest['frames'])} frames ({profile.name}) for {video_filename} "
+            f"in {manifest['extract_seconds']}s"
+        )
+        return manifest
+    
+    @staticmethod
+    def describe(timestamps: List[float]) -> str:
+        """Preamble telling the model how the images relate to the video"""
+        times = ", ".join(f"{t:g}s" for t in timestamps)
+        return (
+            f"The following {len(timestamps)} images are frames sampled in order from a video "
+            f"at timestamps {times}."
+        )
@@ -0,0 +1,83 @@
+import os
+from typing import Dict
+
+import httpx
+
+
+# Connection pool tuning (per model backend URL)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "16"))
+HTTP_KEEPALIVE_EXPIRY_SEC = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "120"))
+HTTP_CONNECT_TIMEOUT_SEC = float(os.getenv("HTTP_CONNECT_TIMEOUT_SEC", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientRegistry:
+    """
+    Long-lived httpx.AsyncClient per model backend URL
+    
+    Keeps one keep-alive connection pool per base URL so caption requests
+    reuse TCP connections (and the SSH tunnel hop) instead of reconnecting
+    every time. Clients are created lazily and closed by the app lifespan.
+    """
+    
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY_SEC,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SEC,
+        http2: bool = HTTP2_ENABLED
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.connect_timeout = connect_timeout
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            print("WARNING: HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1")
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """
+        Get the shared client for a backend URL
+        
+        Args:
+            base_url: Model service base URL (e.g. http://localhost:8002)
+        
+        Returns:
+            Pooled AsyncClient; callers pass per-request timeouts
+        """
+        base_url = base_url.rstrip("/")
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                # Default timeout; long generation calls override the read timeout per request
+                timeout=httpx.Timeout(30.0, connect=self.connect_timeout)
+            )
+            self._clients[base_url] = client
+        return client
+    
+    async def aclose(self) -> None:
+        """Close every pooled client (called on app shutdown)"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+# Shared registry used by the router, CaptionService and /health
+http_clients = HTTPClientRegistry()
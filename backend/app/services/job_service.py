@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .caption_service import CaptionService
+from .model_client import model_capacity
+from .resilience import ModelOverloadedError
+from ..utils.file_utils import validate_video_constraints_async
+
+
+# Number of finished jobs kept for GET /api/jobs/{id}
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+
+
+@dataclass
+class JobItem:
+    """One video × model unit of work"""
+    video: str
+    model: str
+    state: str = "queued"
+    cached: bool = False
+    queued_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wait_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+    processing_time_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    """A batch captioning job"""
+    job_id: str
+    items: List[JobItem]
+    prompt: Optional[str] = None
+    regenerate: bool = False
+    state: str = "queued"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    task: Optional[asyncio.Task] = None
+    
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item.state] = counts.get(item.state, 0) + 1
+        return counts
+    
+    def to_dict(self, include_items: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "state": self.state,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": len(self.items),
+            "counts": self.counts(),
+        }
+        if include_items:
+            data["items"] = [item.__dict__ for item in self.items]
+        return data
+
+
+class JobScheduler:
+    """
+    In-process async scheduler for batch captioning jobs
+    
+    Each job expands into video × model items that run concurrently, gated by
+    a per-model semaphore sized from max_in_flight times the model's replica
+    count, so every vLLM server is kept busy without being flooded. Items reuse
+    CaptionService.generate_caption, including its regenerate semantics.
+    """
+    
+    def __init__(
+        self,
+        caption_service: CaptionService,
+        max_size_mb: int = 100,
+        max_duration_sec: int = 300
+    ):
+        self.caption_service = caption_service
+        self.max_size_mb = max_size_mb
+        self.max_duration_sec = max_duration_sec
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._model_slots: Dict[str, asyncio.Semaphore] = {}
+    
+    def _slots(self, model_key: str) -> asyncio.Semaphore:
+        if model_key not in self._model_slots:
+            self._model_slots[model_key] = asyncio.Semaphore(model_capacity(model_key))
+        return self._model_slots[model_key]
+    
+    def submit(
+        self,
+        pairs: List[Tuple[str, str]],
+        prompt: Optional[str] = None,
+        regenerate: bool = False
+    ) -> Job:
+        """
+        Create a job and start executing it in the background
+        
+        Args:
+            pairs: (video filename, model key) pairs; model keys are validated by the caller
+            prompt: Optional custom prompt applied to every item
+            regenerate: Regenerate captions that already exist
+        
+        Returns:
+            The new job
+        """
+        items = [JobItem(video=video, model=model) for video, model in pairs]
+        job = Job(job_id=uuid.uuid4().hex, items=items, prompt=prompt, regenerate=regenerate)
+        self.jobs[job.job_id] = job
+        self._trim_history()
+        job.task = asyncio.create_task(self._run_job(job))
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job; running model calls are abandoned, queued items never start"""
+        job = self.jobs.get(job_id)
+        if job is None or job.task is None or job.task.done():
+            return False
+        job.task.cancel()
+        return True
+    
+    async def shutdown(self) -> None:
+        """Cancel all unfinished jobs (called on app shutdown)"""
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _trim_history(self) -> None:
+        finished = [jid for jid, job in self.jobs.items() if job.finished_at is not None]
+        for jid in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self.jobs[jid]
+    
+    async def _run_job(self, job: Job) -> None:
+        job.state = "running"
+        try:
+            await asyncio.gather(*[self._run_item(job, item) for item in job.items])
+            failed = any(item.state == "failed" for item in job.items)
+            job.state = "completed_with_errors" if failed else "completed"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            for item in job.items:
+                if item.state in ("queued", "running"):
+                    item.state = "cancelled"
+                    item.finished_at = datetime.utcnow()
+        finally:
+            job.finished_at = datetime.utcnow()
+    
+    async def _run_item(self, job: Job, item: JobItem) -> None:
+        # Captions generate_caption would reuse (same prompt) need no model call,
+        # so they don't need a model slot
+        item.cached = not job.regenerate and self.caption_service.would_reuse_caption(
+            item.video, item.model, job.prompt
+        )
+        if item.cached:
+            await self._execute_item(job, item, time.time())
+            return
+        
+        queued = time.time()
+        async with self._slots(item.model):
+            await self._execute_item(job, item, queued)
+    
+    async def _execute_item(self, job: Job, item: JobItem, queued: float) -> None:
+        item.state = "running"
+        item.started_at = datetime.utcnow()
+        item.wait_seconds = time.time() - queued
+        started = time.time()
+        try:
+            if not item.cached:
+                video_path = Path(self.caption_service.videos_dir) / item.video
+                if not video_path.exists():
+                    raise FileNotFoundError("Video not found")
+                
+                is_valid, error_msg = await validate_video_constraints_async(
+                    str(video_path),
+                    max_size_mb=self.max_size_mb,
+                    max_duration_sec=self.max_duration_sec
+                )
+                if not is_valid:
+                    raise ValueError(error_msg)
+                
+                await self.caption_service.ensure_model_inputs(item.video, item.model)
+            
+            while True:
+                try:
+                    caption_data = await self.caption_service.generate_caption(
+                        video_filename=item.video,
+                        prompt=job.prompt,
+                        model_key=item.model,
+                        regenerate=job.regenerate
+                    )
+                    break
+                except ModelOverloadedError as e:
+                    # Batch work waits out overload instead of failing the item
+                    await asyncio.sleep(e.retry_after)
+            item.processing_time_seconds = caption_data.get("processing_time_seconds")
+            item.state = "completed"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            item.state = "failed"
+            item.error = str(e)
+        finally:
+            item.run_seconds = time.time() - started
+            item.finished_at = datetime.utcnow()
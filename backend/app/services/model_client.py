@@ -1,44 +1,108 @@
+import asyncio
 import httpx
+import json
 import os
 import time
-from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, AsyncIterator
 from pathlib import Path
 from ..utils.file_utils import check_audio_exists, get_audio_filename
+from ..utils.metrics import MODEL_REQUEST_SECONDS, MODEL_QUEUE_WAIT_SECONDS, observe_model_usage
+from ..utils.timing import span, record_span
+from .http_clients import HTTPClientRegistry, http_clients as default_http_clients
+from .replica_pool import ReplicaPool, ReplicaPoolRegistry, parse_endpoints, replica_pools as default_replica_pools
+from .concurrency_limiter import AdaptiveLimiter, concurrency_limiters
+from .resilience import (
+    ModelServiceError,
+    RetryPolicy,
+    HedgePolicy,
+    call_with_resilience,
+    translate_error
+)
 
 
-# Model configuration
+# Upper bound on one generation request (video processing can take minutes)
+MODEL_REQUEST_TIMEOUT_SEC = float(os.getenv("MODEL_REQUEST_TIMEOUT_SEC", "300"))
+
+
+def model_endpoints(env_prefix: str, default_url: str) -> list:
+    """
+    Replica endpoints of a model from <PREFIX>_API_URLS ("url|weight, url, ...")
+    or, for a single server, <PREFIX>_API_URL
+    """
+    return parse_endpoints(os.getenv(f"{env_prefix}_API_URLS") or os.getenv(f"{env_prefix}_API_URL", default_url))
+
+
+# Model configuration ("endpoints" lists the replicas of each model; max_in_flight is per replica)
 AVAILABLE_MODELS = {
     "qwen2vl": {
         "name": "Qwen/Qwen2-VL-7B-Instruct",
-        "url": os.getenv("QWEN2VL_API_URL", "http://localhost:8000"),
+        "endpoints": model_endpoints("QWEN2VL", "http://localhost:8000"),
         "display_name": "Qwen2-VL-7B",
-        "short_name": "qwen2vl"
+        "short_name": "qwen2vl",
+        "max_in_flight": int(os.getenv("QWEN2VL_MAX_IN_FLIGHT", "4")),
+        "proxy_profile": os.getenv("QWEN2VL_PROXY_PROFILE", "vl_448p_2fps"),
+        # "video" sends a video URL; "frames" sends frames extracted by the backend as images
+        "request_mode": os.getenv("QWEN2VL_REQUEST_MODE", "video"),
+        "frame_profile": os.getenv("QWEN2VL_FRAME_PROFILE", "uniform"),
+        "frame_count": int(os.getenv("QWEN2VL_FRAME_COUNT", "0")) or None,  # Overrides the profile
+        "frame_max_side": int(os.getenv("QWEN2VL_FRAME_MAX_SIDE", "0")) or None
     },
     "omnivinci": {
         "name": "nvidia/omnivinci",
-        "url": os.getenv("OMNIVINCI_API_URL", "http://localhost:8001"),
+        "endpoints": model_endpoints("OMNIVINCI", "http://localhost:8001"),
         "display_name": "OmniVinci",
-        "short_name": "omnivinci"
+        "short_name": "omnivinci",
+        "max_in_flight": int(os.getenv("OMNIVINCI_MAX_IN_FLIGHT", "1")),
+        "proxy_profile": os.getenv("OMNIVINCI_PROXY_PROFILE", "omnivinci_448p_4fps")
     },
     "qwen3omni": {
         "name": "/home/naresh/models/qwen3-omni-30b",
-        "url": os.getenv("QWEN3OMNI_API_URL", "http://localhost:8002"),
+        "endpoints": model_endpoints("QWEN3OMNI", "http://localhost:8002"),
         "display_name": "Qwen3-Omni-30B",
-        "short_name": "qwen3omni"
+        "short_name": "qwen3omni",
+        "max_in_flight": int(os.getenv("QWEN3OMNI_MAX_IN_FLIGHT", "4")),
+        # Audio rendition sent as audio_url (see AUDIO_PROFILES in file_utils)
+        "audio_profile": os.getenv("QWEN3OMNI_AUDIO_PROFILE", "flac16k_mono"),
+        "proxy_profile": os.getenv("QWEN3OMNI_PROXY_PROFILE", "omni_480p_2fps"),
+        "request_mode": os.getenv("QWEN3OMNI_REQUEST_MODE", "video"),
+        "frame_profile": os.getenv("QWEN3OMNI_FRAME_PROFILE", "uniform"),
+        "frame_count": int(os.getenv("QWEN3OMNI_FRAME_COUNT", "0")) or None,
+        "frame_max_side": int(os.getenv("QWEN3OMNI_FRAME_MAX_SIDE", "0")) or None
     },
     "qwen3omni_captioner": {
         "name": "Qwen/Qwen3-Omni-30B-A3B-Captioner",
-        "url": os.getenv("QWEN3OMNI_CAPTIONER_API_URL", "http://localhost:8003"),
+        "endpoints": model_endpoints("QWEN3OMNI_CAPTIONER", "http://localhost:8003"),
         "display_name": "Qwen3-Omni-Captioner",
-        "short_name": "qwen3omni_captioner"
+        "short_name": "qwen3omni_captioner",
+        "max_in_flight": int(os.getenv("QWEN3OMNI_CAPTIONER_MAX_IN_FLIGHT", "4")),
+        "audio_profile": os.getenv("QWEN3OMNI_CAPTIONER_AUDIO_PROFILE", "flac16k_mono"),
+        "proxy_profile": None  # Audio-only model
     }
 }
+for _config in AVAILABLE_MODELS.values():
+    _config["url"] = _config["endpoints"][0][0]  # Primary replica
+
+
+def model_capacity(model_key: str) -> int:
+    """Requests a model can serve at once across all its replicas"""
+    config = AVAILABLE_MODELS[model_key]
+    return max(1, config.get("max_in_flight", 1)) * len(config["endpoints"])
 
 
 class VLLMClient:
     """HTTP client for communicating with remote vLLM service via OpenAI-compatible API"""
     
-    def __init__(self, model_key: str = "qwen2vl", video_url_base: str = None, videos_dir: str = None):
+    def __init__(
+        self,
+        model_key: str = "qwen2vl",
+        video_url_base: str = None,
+        videos_dir: str = None,
+        http_clients: Optional[HTTPClientRegistry] = None,
+        replica_pools: Optional[ReplicaPoolRegistry] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None
+    ):
         """
         Initialize vLLM client for a specific model
         
@@ -46,6 +110,10 @@ class VLLMClient:
             model_key: Key from AVAILABLE_MODELS ('qwen2vl' or 'omnivinci')
             video_url_base: Base URL for video HTTP server
             videos_dir: Directory where video files are stored (for checking audio files)
+            http_clients: Registry of pooled HTTP clients (defaults to the shared app registry)
+            replica_pools: Registry of replica pools (defaults to the shared app registry)
+            retry: Retry policy for connect errors and 5xx (defaults from MODEL_RETRY_* env vars)
+            hedge: Hedged-request policy (defaults from MODEL_HEDGE_* env vars)
         """
         if model_key not in AVAILABLE_MODELS:
             raise ValueError(f"Unknown model: {model_key}. Available: {list(AVAILABLE_MODELS.keys())}")
@@ -59,249 +127,549 @@ class VLLMClient:
         # Not host.docker.internal - that's only for backend to access Mac's tunneled services
         self.video_url_base = "http://127.0.0.1:8080"
         self.videos_dir = videos_dir
-        self.timeout = 300.0  # 5 minutes timeout for video processing
+        self.timeout = MODEL_REQUEST_TIMEOUT_SEC
+        self.http_clients = http_clients or default_http_clients
+        # Requests are balanced over the model's replicas (least outstanding requests)
+        self.replicas: ReplicaPool = (replica_pools or default_replica_pools).get(model_key)
+        self.retry = retry or RetryPolicy()
+        self.hedge = hedge or HedgePolicy()
+        # Adaptive per-model concurrency limit shared by every client of this model
+        self.limiter: AdaptiveLimiter = concurrency_limiters.get(model_key)
+    
+    @property
+    def request_timeout(self) -> httpx.Timeout:
+        """Generation timeout: the long read timeout, but the registry's short connect timeout"""
+        return httpx.Timeout(self.timeout, connect=self.http_clients.connect_timeout)
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client for this model's primary replica"""
+        return self.http_clients.get(self.vllm_url)
+    
+    def get_sampling_params(self) -> Dict[str, Any]:
+        """
+        Get the sampling parameters sent with generation requests for this model
+        
+        Returns:
+            Dictionary with max_tokens, temperature and top_p
+        """
+        # Qwen3-Omni-30B supports comprehensive analysis with higher token limits
+        model_params = {
+            "qwen3omni": {
+                "max_tokens": int(os.getenv("QWEN3OMNI_MAX_TOKENS", "16384")),
+                "temperature": float(os.getenv("QWEN3OMNI_TEMPERATURE", "0.6")),
+                "top_p": float(os.getenv("QWEN3OMNI_TOP_P", "0.95"))
+            },
+            "qwen3omni_captioner": {
+                "max_tokens": int(os.getenv("QWEN3OMNI_CAPTIONER_MAX_TOKENS", "16384")),
+                "temperature": float(os.getenv("QWEN3OMNI_CAPTIONER_TEMPERATURE", "0.2")),
+                "top_p": float(os.getenv("QWEN3OMNI_CAPTIONER_TOP_P", "0.95"))
+            },
+            "qwen2vl": {
+                "max_tokens": int(os.getenv("QWEN2VL_MAX_TOKENS", "2048")),
+                "temperature": float(os.getenv("QWEN2VL_TEMPERATURE", "0.7")),
+                "top_p": float(os.getenv("QWEN2VL_TOP_P", "0.9"))
+            }
+        }
+        
+        # Get parameters for current model, with defaults
+        return model_params.get(self.model_key, {
+            "max_tokens": 2048,
+            "temperature": 0.7,
+            "top_p": 0.9
+        })
+    
+    @asynccontextmanager
+    async def admission(self) -> AsyncIterator[None]:
+        """
+        Hold a slot of the model's adaptive concurrency limit for one request,
+        feeding the request's latency or overload error back into the limit
+        
+        Raises:
+            ModelOverloadedError: If the model's wait queue is full
+        """
+        queued_at = time.time()
+        async with self.limiter.acquire():
+            start_time = time.time()
+            MODEL_QUEUE_WAIT_SECONDS.labels(self.model_key).observe(start_time - queued_at)
+            record_span("queue", start_time - queued_at, model=self.model_key)
+            try:
+                with span("model", model=self.model_key):
+                    yield
+            except Exception as e:
+                self.limiter.record_error(e)
+                MODEL_REQUEST_SECONDS.labels(self.model_key, type(e).__name__).observe(time.time() - start_time)
+                raise
+            latency = time.time() - start_time
+            self.limiter.record_success(latency)
+            MODEL_REQUEST_SECONDS.labels(self.model_key, "ok").observe(latency)
+    
+    async def _post(self, path: str, **kwargs) -> Dict[str, Any]:
+        """
+        POST to one of the model's replicas and return the JSON body
+        
+        Waits for a slot of the model's concurrency limit first. Connect
+        errors and 5xx are retried on other replicas with jittered backoff,
+        replicas with an open circuit are skipped, and a hedged second
+        request is sent when enabled and the first one is unusually slow.
+        
+        Raises:
+            ModelServiceError: Typed timeout / unavailable / error-response failure
+            ModelOverloadedError: If the model's wait queue is full
+        """
+        async def send(replica) -> Dict[str, Any]:
+            response = await self.http_clients.get(replica.url).post(
+                f"{replica.url}{path}", timeout=self.request_timeout, **kwargs
+            )
+            response.raise_for_status()
+            return response.json()
+        
+        async with self.admission():
+            try:
+                return await call_with_resilience(self.replicas, send, self.retry, self.hedge)
+            except Exception as e:
+                raise translate_error(e, self.timeout) or e
     
     async def health_check(self) -> Dict[str, Any]:
-        """Check if vLLM service is healthy"""
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.vllm_url}/v1/models")
-                response.raise_for_status()
-                models_data = response.json()
-                return {
-                    "status": "healthy",
-                    "model_loaded": True,
-                    "models": models_data.get("data", [])
-                }
-        except Exception as e:
+        """Check if vLLM service is healthy (any replica passing its probe counts)"""
+        results = await self.replicas.probe_all()
+        if any(results):
             return {
-                "status": "unhealthy",
-                "error": str(e)
+                "status": "healthy",
+                "model_loaded": True,
+                "healthy_replicas": sum(results),
+                "replicas": self.replicas.stats()
             }
+        return {
+            "status": "unhealthy",
+            "error": self.replicas.replicas[0].last_error,
+            "replicas": self.replicas.stats()
+        }
     
     async def get_model_info(self) -> Dict[str, Any]:
         """Get information about the model"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.vllm_url}/v1/models")
-                response.raise_for_status()
-                return response.json()
+            replica = self.replicas.choose()
+            response = await self.http_clients.get(replica.url).get(f"{replica.url}/v1/models", timeout=5.0)
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             raise Exception(f"Failed to get model info: {str(e)}")
     
-    async def generate_caption(
+    def find_audio_filename(self, video_filename: str, media: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Audio file sent to the model: an explicit media["audio_path"] (e.g. a
+        segment's audio), else its audio profile rendition if extracted, else the original WAV
+        
+        Returns:
+            Audio path relative to the videos directory, or None if no audio was extracted
+        """
+        if media and "audio_path" in media:
+            return media["audio_path"]
+        if not self.videos_dir:
+            return None
+        profile = self.model_config.get("audio_profile")
+        if profile and check_audio_exists(video_filename, self.videos_dir, profile):
+            return get_audio_filename(video_filename, profile)
+        if check_audio_exists(video_filename, self.videos_dir):
+            return get_audio_filename(video_filename)
+        return None
+    
+    def get_video_url(self, video_filename: str, media: Optional[Dict[str, Any]] = None) -> str:
+        """URL the model fetches the video from (the proxy rendition when one was prepared)"""
+        video_path = (media or {}).get("video_path") or video_filename
+        return f"{self.video_url_base}/{video_path}"
+    
+    def build_chat_payload(
         self,
         video_filename: str,
-        prompt: str = None
+        prompt: str = None,
+        media: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Generate caption for video using model-specific API
+        Build the OpenAI-compatible /v1/chat/completions payload for this model
         
         Args:
             video_filename: Name of the video file (accessible via remote HTTP server)
             prompt: Optional custom prompt
+            media: Prepared model inputs (e.g. {"video_path": ".proxies/..."}) from CaptionService
         
         Returns:
-            Dictionary with caption and metadata
+            Request payload (without the stream flag)
         """
+        params = self.get_sampling_params()
+        
         # Qwen3-Omni-Captioner is audio-only - requires audio file
         if self.model_key == "qwen3omni_captioner":
             # Check if audio file exists for this video
             if not self.videos_dir:
                 raise Exception("Videos directory not configured for audio-only model")
             
-            if not check_audio_exists(video_filename, self.videos_dir):
+            audio_filename = self.find_audio_filename(video_filename, media)
+            if audio_filename is None:
                 raise Exception(f"Audio file required for Qwen3-Omni-Captioner. Please extract audio from video first.")
             
-            audio_filename = get_audio_filename(video_filename)
             audio_url = f"{self.video_url_base}/{audio_filename}"
             
-            start_time = time.time()
-            
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    # Model-specific parameters for captioner
-                    model_params = {
-                        "max_tokens": int(os.getenv("QWEN3OMNI_CAPTIONER_MAX_TOKENS", "16384")),
-                        "temperature": float(os.getenv("QWEN3OMNI_CAPTIONER_TEMPERATURE", "0.2")),
-                        "top_p": float(os.getenv("QWEN3OMNI_CAPTIONER_TOP_P", "0.95"))
-                    }
-                    
-                    # Audio-only request - no video, no text prompt, no model name
-                    request_payload = {
-                        "messages": [
+            # Audio-only request - no video, no text prompt, no model name
+            return {
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": [
                             {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "audio_url",
-                                        "audio_url": {"url": audio_url}
-                                    }
-                                ]
+                                "type": "audio_url",
+                                "audio_url": {"url": audio_url}
                             }
-                        ],
-                        "max_tokens": model_params["max_tokens"],
-                        "temperature": model_params["temperature"],
-                        "top_p": model_params["top_p"]
-                    }
-                    
-                    response = await client.post(
-                        f"{self.vllm_url}/v1/chat/completions",
-                        json=request_payload,
-                        headers={"Content-Type": "application/json"}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    processing_time = time.time() - start_time
-                    
-                    # Extract caption from OpenAI response format
-                    caption = result["choices"][0]["message"]["content"]
-                    
-                    return {
-                        "caption": caption,
-                        "processing_time": processing_time,
-                        "model": self.model_name,
-                        "tokens_used": result.get("usage", {})
+                        ]
                     }
-            
-            except httpx.TimeoutException:
-                raise Exception("Model service request timed out (>5 minutes)")
-            except httpx.HTTPStatusError as e:
-                error_detail = e.response.text
-                raise Exception(f"vLLM service error: {e.response.status_code} - {error_detail}")
-            except Exception as e:
-                raise Exception(f"Failed to generate caption: {str(e)}")
+                ],
+                "max_tokens": params["max_tokens"],
+                "temperature": params["temperature"],
+                "top_p": params["top_p"]
+            }
         
         # Construct video URL for model to access
-        video_url = f"{self.video_url_base}/{video_filename}"
+        video_url = self.get_video_url(video_filename, media)
         
         # Check if audio file exists for this video
         audio_url = None
-        if self.videos_dir:
-            if check_audio_exists(video_filename, self.videos_dir):
-                audio_filename = get_audio_filename(video_filename)
-                audio_url = f"{self.video_url_base}/{audio_filename}"
+        audio_filename = self.find_audio_filename(video_filename, media)
+        if audio_filename:
+            audio_url = f"{self.video_url_base}/{audio_filename}"
         
         # Default prompt if none provided
         if not prompt:
             prompt = "Describe this video in detail, including what you see, hear, and any actions taking place."
         
+        # Build content array with video, audio (if available), and text prompt
+        # Order matches the API format: video_url, audio_url, text
+        
+        # Qwen3-Omni specific video processing parameters
+        if self.model_key == "qwen3omni":
+            video_url_obj = {
+                "url": video_url,
+                "seconds_per_chunk": 1,
+                "fps": 2
+            }
+        else:
+            video_url_obj = {"url": video_url}
+        
+        frames = (media or {}).get("frames")
+        if frames:
+            # Frame-sampled mode: pre-extracted frames as a multi-image message, so the
+            # vLLM host doesn't decode the video (needs --limit-mm-per-prompt image>=N)
+            content_items = [{"type": "text", "text": media["frames_description"]}] if media.get("frames_description") else []
+            content_items += [
+                {"type": "image_url", "image_url": {"url": f"{self.video_url_base}/{frame}"}}
+                for frame in frames
+            ]
+        else:
+            content_items = [
+                {"type": "video_url", "video_url": video_url_obj}
+            ]
+        
+        # Add audio URL if available
+        if audio_url:
+            content_items.append({"type": "audio_url", "audio_url": {"url": audio_url}})
+        
+        # Add text prompt last
+        content_items.append({"type": "text", "text": prompt})
+        
+        return {
+            "model": self.model_name,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": content_items
+                }
+            ],
+            "max_tokens": params["max_tokens"],
+            "temperature": params["temperature"],
+            "top_p": params["top_p"]
+        }
+    
+    async def generate_caption(
+        self,
+        video_filename: str,
+        prompt: str = None,
+        media: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate caption for video using model-specific API
+        
+        Args:
+            video_filename: Name of the video file (accessible via remote HTTP server)
+            prompt: Optional custom prompt
+            media: Prepared model inputs (e.g. proxy rendition path) from CaptionService
+        
+        Returns:
+            Dictionary with caption and metadata
+        """
         start_time = time.time()
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # OmniVinci uses custom /infer/video endpoint with form data
-                # Note: OmniVinci endpoint may not support separate audio stream
-                if self.model_key == "omnivinci":
-                    response = await client.post(
-                        f"{self.vllm_url}/infer/video",
-                        data={"url": video_url, "prompt": prompt}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    processing_time = time.time() - start_time
-                    
-                    # Extract caption from OmniVinci response
-                    caption = result.get("response", result.get("caption", ""))
-                    
-                    return {
-                        "caption": caption,
-                        "processing_time": processing_time,
-                        "model": self.model_name,
-                        "tokens_used": {}
-                    }
+            # OmniVinci uses custom /infer/video endpoint with form data
+            # Note: OmniVinci endpoint may not support separate audio stream
+            if self.model_key == "omnivinci":
+                video_url = self.get_video_url(video_filename, media)
+                if not prompt:
+                    prompt = "Describe this video in detail, including what you see, hear, and any actions taking place."
                 
-                # Other models use vLLM OpenAI-compatible API (qwen2vl, qwen3omni)
-                # Note: qwen3omni_captioner is handled separately above
-                else:
-                    # Build content array with video, audio (if available), and text prompt
-                    # Order matches the API format: video_url, audio_url, text
-                    
-                    # Qwen3-Omni specific video processing parameters
-                    if self.model_key == "qwen3omni":
-                        video_url_obj = {
-                            "url": video_url,
-                            "seconds_per_chunk": 1,
-                            "fps": 2
-                        }
-                    else:
-                        video_url_obj = {"url": video_url}
-                    
-                    content_items = [
-                        {"type": "video_url", "video_url": video_url_obj}
-                    ]
-                    
-                    # Add audio URL if available
-                    if audio_url:
-                        content_items.append({"type": "audio_url", "audio_url": {"url": audio_url}})
-                    
-                    # Add text prompt last
-                    content_items.append({"type": "text", "text": prompt})
-                    
-                    # Model-specific token limits and parameters
-                    # Qwen3-Omni-30B supports comprehensive analysis with higher token limits
-                    model_params = {
-                        "qwen3omni": {
-                            "max_tokens": int(os.getenv("QWEN3OMNI_MAX_TOKENS", "16384")),
-                            "temperature": float(os.getenv("QWEN3OMNI_TEMPERATURE", "0.6")),
-                            "top_p": float(os.getenv("QWEN3OMNI_TOP_P", "0.95"))
-                        },
-                        "qwen2vl": {
-                            "max_tokens": int(os.getenv("QWEN2VL_MAX_TOKENS", "2048")),
-                            "temperature": float(os.getenv("QWEN2VL_TEMPERATURE", "0.7")),
-                            "top_p": float(os.getenv("QWEN2VL_TOP_P", "0.9"))
-                        }
-                    }
-                    
-                    # Get parameters for current model, with defaults
-                    params = model_params.get(self.model_key, {
-                        "max_tokens": 2048,
-                        "temperature": 0.7,
-                        "top_p": 0.9
-                    })
-                    
-                    request_payload = {
-                        "model": self.model_name,
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": content_items
-                            }
-                        ],
-                        "max_tokens": params["max_tokens"],
-                        "temperature": params["temperature"],
-                        "top_p": params["top_p"]
-                    }
-                    
-                    response = await client.post(
-                        f"{self.vllm_url}/v1/chat/completions",
-                        json=request_payload,
-                        headers={"Content-Type": "application/json"}
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    processing_time = time.time() - start_time
-                    
-                    # Extract caption from OpenAI response format
-                    caption = result["choices"][0]["message"]["content"]
-                    
-                    return {
-                        "caption": caption,
-                        "processing_time": processing_time,
-                        "model": self.model_name,
-                        "tokens_used": result.get("usage", {})
-                    }
+                result = await self._post("/infer/video", data={"url": video_url, "prompt": prompt})
+                
+                processing_time = time.time() - start_time
+                
+                # Extract caption from OmniVinci response
+                caption = result.get("response", result.get("caption", ""))
+                observe_model_usage(self.model_key, result.get("usage"))
+                
+                return {
+                    "caption": caption,
+                    "processing_time": processing_time,
+                    "model": self.model_name,
+                    "tokens_used": {}
+                }
+            
+            # Other models use vLLM OpenAI-compatible API (qwen2vl, qwen3omni, qwen3omni_captioner)
+            request_payload = self.build_chat_payload(video_filename, prompt, media)
+            
+            result = await self._post(
+                "/v1/chat/completions",
+                json=request_payload,
+                headers={"Content-Type": "application/json"}
+            )
+            
+            processing_time = time.time() - start_time
+            
+            # Extract caption from OpenAI response format
+            caption = result["choices"][0]["message"]["content"]
+            usage = result.get("usage") or {}
+            observe_model_usage(
+                self.model_key,
+                usage,
+                tokens_per_second=usage.get("completion_tokens", 0) / processing_time if processing_time > 0 else None
+            )
+            
+            return {
+                "caption": caption,
+                "processing_time": processing_time,
+                "model": self.model_name,
+                "tokens_used": result.get("usage", {})
+            }
         
-        except httpx.TimeoutException:
-            raise Exception("Model service request timed out (>5 minutes)")
-        except httpx.HTTPStatusError as e:
-            error_detail = e.response.text
-            raise Exception(f"vLLM service error: {e.response.status_code} - {error_detail}")
+        except ModelServiceError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate caption: {str(e)}")
+    
+    async def generate_multi(
+        self,
+        video_filename: str,
+        prompts: List[str],
+        media: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer several prompts about one video
+        
+        OmniVinci answers all prompts in one batched pass (/infer/video/multi),
+        fetching and decoding the video once. Other models get one concurrent
+        request per prompt.
+        
+        Args:
+            video_filename: Name of the video file (accessible via remote HTTP server)
+            prompts: Prompts to answer (already resolved, non-empty)
+            media: Prepared model inputs (e.g. proxy rendition path) from CaptionService
+        
+        Returns:
+            One caption dictionary per prompt, in order (as generate_caption returns)
+        """
+        if self.model_key != "omnivinci":
+            return list(await asyncio.gather(*[
+                self.generate_caption(video_filename, prompt=prompt, media=media) for prompt in prompts
+            ]))
+        
+        params = self.get_sampling_params()
+        start_time = time.time()
+        try:
+            result = await self._post(
+                "/infer/video/multi",
+                json={
+                    "url": self.get_video_url(video_filename, media),
+                    "prompts": prompts,
+                    "max_tokens": params["max_tokens"],
+                    "temperature": params["temperature"]
+                }
+            )
+        except ModelServiceError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to generate captions: {str(e)}")
+        
+        processing_time = time.time() - start_time
+        answers = result.get("responses", [])
+        if len(answers) != len(prompts):
+            raise Exception(f"Failed to generate captions: expected {len(prompts)} answers, got {len(answers)}")
+        observe_model_usage(self.model_key, result.get("usage"))
+        return [
+            {
+                "caption": answer.get("response", ""),
+                # The pass is shared, so each answer took the whole request
+                "processing_time": processing_time,
+                "model": self.model_name,
+                "tokens_used": answer.get("usage", {})
+            }
+            for answer in answers
+        ]
+    
+    async def complete_text(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Text-only chat completion (used to merge segment captions)
+        
+        Args:
+            prompt: User message
+            max_tokens: Optional override of the model's max_tokens
+        
+        Returns:
+            Dictionary with caption, processing_time, model and tokens_used
+        """
+        if self.model_key in ("omnivinci", "qwen3omni_captioner"):
+            raise Exception(f"{self.model_key} does not accept text-only requests")
+        
+        params = self.get_sampling_params()
+        request_payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens or params["max_tokens"],
+            "temperature": params["temperature"],
+            "top_p": params["top_p"]
+        }
+        
+        start_time = time.time()
+        result = await self._post(
+            "/v1/chat/completions",
+            json=request_payload,
+            headers={"Content-Type": "application/json"}
+        )
+        
+        observe_model_usage(self.model_key, result.get("usage"))
+        return {
+            "caption": result["choices"][0]["message"]["content"],
+            "processing_time": time.time() - start_time,
+            "model": self.model_name,
+            "tokens_used": result.get("usage", {})
+        }
+    
+    async def stream_caption(
+        self,
+        video_filename: str,
+        prompt: str = None,
+        media: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate caption with stream=true, yielding tokens as they arrive
+        
+        Yields events of the form {"type": "token", "text": ...} followed by one
+        {"type": "done", ...} event carrying the full caption, processing time,
+        time-to-first-token and tokens/second. Models without a streaming API
+        (OmniVinci) yield their whole caption as a single token.
+        
+        Args:
+            video_filename: Name of the video file (accessible via remote HTTP server)
+            prompt: Optional custom prompt
+            media: Prepared model inputs (e.g. proxy rendition path) from CaptionService
+        """
+        if self.model_key == "omnivinci":
+            result = await self.generate_caption(video_filename, prompt=prompt, media=media)
+            yield {"type": "token", "text": result["caption"]}
+            yield {
+                "type": "done",
+                **result,
+                "time_to_first_token": result["processing_time"],
+                "tokens_per_second": None
+            }
+            return
+        
+        request_payload = self.build_chat_payload(video_filename, prompt, media)
+        request_payload["stream"] = True
+        # Ask vLLM to append a usage chunk so token counts are exact
+        request_payload["stream_options"] = {"include_usage": True}
+        
+        start_time = time.time()
+        first_token_time = None
+        parts = []
+        chunk_count = 0
+        usage: Dict[str, Any] = {}
+        
+        # The whole stream holds one slot of the model's concurrency limit
+        async with self.admission():
+            # Retries (on another replica) are only possible before the first token was sent
+            attempt = 0
+            tried = set()
+            while True:
+                attempt += 1
+                try:
+                    async with self.replicas.lease(exclude=set(tried)) as replica:
+                        tried.add(replica.url)
+                        async with self.http_clients.get(replica.url).stream(
+                            "POST",
+                            f"{replica.url}/v1/chat/completions",
+                            json=request_payload,
+                            headers={"Content-Type": "application/json"},
+                            timeout=self.request_timeout
+                        ) as response:
+                            if response.status_code >= 400:
+                                await response.aread()
+                            response.raise_for_status()
+                            
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                
+                                chunk = json.loads(data)
+                                if chunk.get("usage"):
+                                    usage = chunk["usage"]
+                                for choice in chunk.get("choices", []):
+                                    text = choice.get("delta", {}).get("content")
+                                    if text:
+                                        if first_token_time is None:
+                                            first_token_time = time.time()
+                                        chunk_count += 1
+                                        parts.append(text)
+                                        yield {"type": "token", "text": text}
+                    break
+                
+                except Exception as e:
+                    if first_token_time is None and self.retry.should_retry(e, attempt):
+                        await asyncio.sleep(self.retry.delay(attempt))
+                        continue
+                    error = translate_error(e, self.timeout)
+                    if error is not None:
+                        raise error
+                    raise Exception(f"Failed to generate caption: {str(e)}")
+        
+        end_time = time.time()
+        processing_time = end_time - start_time
+        time_to_first_token = (first_token_time - start_time) if first_token_time else None
+        
+        # Decode rate after the first token; fall back to chunk count if usage wasn't reported
+        completion_tokens = usage.get("completion_tokens") or chunk_count
+        decode_time = (end_time - first_token_time) if first_token_time else 0
+        tokens_per_second = completion_tokens / decode_time if decode_time > 0 else None
+        observe_model_usage(self.model_key, usage, tokens_per_second, time_to_first_token)
+        
+        yield {
+            "type": "done",
+            "caption": "".join(parts),
+            "processing_time": processing_time,
+            "model": self.model_name,
+            "tokens_used": usage,
+            "time_to_first_token": time_to_first_token,
+            "tokens_per_second": tokens_per_second
+        }
 
 
 def get_available_models() -> Dict[str, Any]:
@@ -311,7 +679,9 @@ def get_available_models() -> Dict[str, Any]:
             "name": config["name"],
             "display_name": config["display_name"],
             "short_name": config["short_name"],
-            "url": config["url"]
+            "url": config["url"],
+            # Per-replica routing state (in-flight, health, failures, latency)
+            "replicas": default_replica_pools.get(key).stats()
         }
         for key, config in AVAILABLE_MODELS.items()
     }
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .single_flight import SingleFlight
+from ..utils.file_utils import (
+    run_ffmpeg_async,
+    get_video_metadata_async,
+    probe_video_metadata,
+    parse_frame_rate,
+    media_workers,
+    MEDIA_PROBE_TIMEOUT_SEC
+)
+
+
+# Send per-model proxy renditions to the models instead of the original files
+PROXY_ENABLED = os.getenv("PROXY_ENABLED", "true").lower() == "true"
+# Proxies live under VIDEOS_DIR so the video HTTP server (port 8080) serves them to the models
+PROXY_DIR_NAME = os.getenv("PROXY_DIR_NAME", ".proxies")
+PROXY_TRANSCODE_TIMEOUT_SEC = float(os.getenv("PROXY_TRANSCODE_TIMEOUT_SEC", "600"))
+
+
+@dataclass(frozen=True)
+class ProxyProfile:
+    """Target rendition for a model's input video"""
+    name: str
+    max_height: int  # Downscale only; smaller sources keep their resolution
+    fps: float  # Upper bound; lower frame rate sources are not duplicated
+    video_codec: str = "libx264"
+    crf: int = 28
+    preset: str = "veryfast"
+    audio_codec: Optional[str] = "aac"  # None drops the audio track
+    audio_sample_rate: int = 16000
+    audio_channels: int = 1
+    audio_bitrate: str = "48k"
+    
+    def digest(self) -> str:
+        """Short hash of every setting, so changing a profile never reuses old proxies"""
+        payload = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=4).hexdigest()
+
+
+# Renditions matched to how each model samples its input
+PROXY_PROFILES = {
+    # Qwen2-VL ignores audio and samples video at 2 fps
+    "vl_448p_2fps": ProxyProfile(
+        name="vl_448p_2fps",
+        max_height=int(os.getenv("PROXY_VL_MAX_HEIGHT", "448")),
+        fps=float(os.getenv("PROXY_VL_FPS", "2")),
+        audio_codec=None
+    ),
+    # Qwen3-Omni is sent fps=2 and hears the audio track at 16 kHz mono
+    "omni_480p_2fps": ProxyProfile(
+        name="omni_480p_2fps",
+        max_height=int(os.getenv("PROXY_OMNI_MAX_HEIGHT", "480")),
+        fps=float(os.getenv("PROXY_OMNI_FPS", "2"))
+    ),
+    # OmniVinci takes 128 frames spread over the video; 4 fps keeps enough of them for short clips
+    "omnivinci_448p_4fps": ProxyProfile(
+        name="omnivinci_448p_4fps",
+        max_height=int(os.getenv("PROXY_OMNIVINCI_MAX_HEIGHT", "448")),
+        fps=float(os.getenv("PROXY_OMNIVINCI_FPS", "4"))
+    ),
+}
+
+
+class ProxyService:
+    """
+    Per-model proxy renditions of source videos
+    
+    Proxies are transcoded with ffmpeg in the media worker pool and cached in
+    VIDEOS_DIR/.proxies keyed by source content hash + profile digest, so a
+    renamed or re-uploaded video reuses its proxies and a changed profile
+    produces new ones. Each proxy has a JSON sidecar with its size and the
+    savings against the source.
+    """
+    
+    def __init__(self, videos_dir: str, enabled: bool = PROXY_ENABLED):
+        self.videos_dir = Path(videos_dir)
+        self.proxy_dir = self.videos_dir / PROXY_DIR_NAME
+        self.enabled = enabled
+        # Concurrent requests for the same proxy wait on one transcode
+        self.inflight = SingleFlight()
+    
+    def profile_for(self, model_key: str) -> Optional[ProxyProfile]:
+        """Proxy profile configured for a model, or None if it gets the original"""
+        from .model_client import AVAILABLE_MODELS
+        profile_name = AVAILABLE_MODELS.get(model_key, {}).get("proxy_profile")
+        if not self.enabled or not profile_name:
+            return None
+        profile = PROXY_PROFILES.get(profile_name)
+        if profile is None:
+            print(f"WARNING: Unknown proxy profile '{profile_name}' for {model_key}; sending the original video")
+        return profile
+    
+    def proxy_filename(self, content_hash: str, profile: ProxyProfile) -> str:
+        return f"{content_hash}_{profile.name}_{profile.digest()}.mp4"
+    
+    def get_report(self, content_hash: str, profile: ProxyProfile) -> Optional[Dict[str, Any]]:
+        """
+        Report of an existing proxy
+        
+        Returns:
+            Sidecar dictionary (path, sizes, savings) or None if the proxy has not been built
+        """
+        proxy_path = self.proxy_dir / self.proxy_filename(content_hash, profile)
+        sidecar_path = proxy_path.with_suffix(".json")
+        if not proxy_path.exists() or not sidecar_path.exists():
+            return None
+        try:
+            with open(sidecar_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading proxy report {sidecar_path.name}: {str(e)}")
+            return None
+    
+    async def ensure(self, video_filename: str, content_hash: str, profile: ProxyProfile) -> Dict[str, Any]:
+        """
+        Get the proxy for a video, transcoding it on first use
+        
+        Args:
+            video_filename: Source video filename in VIDEOS_DIR
+            content_hash: Content hash of the source video
+            profile: Target rendition
+        
+        Returns:
+            Report with the proxy's relative path (under VIDEOS_DIR), sizes and savings
+        
+        Raises:
+            MediaCommandError: If the transcode failed
+            MediaJobTimeout: If the transcode exceeded PROXY_TRANSCODE_TIMEOUT_SEC
+        """
+        report = self.get_report(content_hash, profile)
+        if report is not None:
+            return report
+        
+        return await self.inflight.do(
+            (content_hash, profile.name, profile.digest()),
+            lambda: self._create(video_filename, content_hash, profile)
+        )
+    
+    async def _create(self, video_filename: str, content_hash: str, profile: ProxyProfile) -> Dict[str, Any]:
+        source_path = self.videos_dir / video_filename
+        filename = self.proxy_filename(content_hash, profile)
+        proxy_path = self.proxy_dir / filename
+        tmp_path = self.proxy_dir / f".{filename}.tmp.mp4"
+        self.proxy_dir.mkdir(parents=True, exist_ok=True)
+        
+        source_stat = source_path.stat()
+        source_metadata = await get_video_metadata_async(str(source_path), stat=source_stat) or {}
+        
+        # Drop frames down to the profile rate (never duplicate them); scale never upscales
+        source_fps = None
+        for stream in source_metadata.get("streams", []):
+            if stream.get("codec_type") == "video":
+                source_fps = parse_frame_rate(stream.get("avg_frame_rate"))
+                break
+        target_fps = min(profile.fps, source_fps) if source_fps else profile.fps
+        video_filter = f"fps={target_fps:g},scale=-2:'min({profile.max_height},ih)'"
+        args = [
+            'ffmpeg', '-y', '-i', str(source_path),
+            '-map', '0:v:0',
+            '-vf', video_filter,
+            '-c:v', profile.video_codec, '-preset', profile.preset, '-crf', str(profile.crf),
+            '-pix_fmt', 'yuv420p',
+        ]
+        if profile.audio_codec:
+            args += [
+                '-map', '0:a:0?',
+                '-c:a', profile.audio_codec,
+                '-ar', str(profile.audio_sample_rate),
+                '-ac', str(profile.audio_channels),
+                '-b:a', profile.audio_bitrate,
+            ]
+        else:
+            args += ['-an']
+        # faststart puts the index up front so the model host can start decoding while downloading
+        args += ['-movflags', '+faststart', str(tmp_path)]
+        
+        start_time = time.time()
+        try:
+            await run_ffmpeg_async(args, timeout=PROXY_TRANSCODE_TIMEOUT_SEC)
+            os.replace(tmp_path, proxy_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        transcode_seconds = time.time() - start_time
+        
+        proxy_metadata = await media_workers.run(
+            probe_video_metadata, str(proxy_path), timeout=MEDIA_PROBE_TIMEOUT_SEC
+        )
+        
+        report = {
+            "video_filename": video_filename,
+            "content_hash": content_hash,
+            "profile": profile.name,
+            "profile_settings": asdict(profile),
+            "path": f"{PROXY_DIR_NAME}/{filename}",
+            "source_size": source_stat.st_size,
+            "proxy_size": proxy_path.stat().st_size,
+            "transcode_seconds": round(transcode_seconds, 3),
+            "created_at": datetime.now().isoformat(),
+            **self._savings(source_stat.st_size, proxy_path.stat().st_size, source_metadata, proxy_metadata)
+        }
+        
+        with open(proxy_path.with_suffix(".json"), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        
+        print(
+            f"Proxy {profile.name} for {video_filename}: {report['source_size']} -> {report['proxy_size']} bytes "
+            f"({report['size_reduction_pct']}% smaller) in {report['transcode_seconds']}s"
+        )
+        return report
+    
+    @staticmethod
+    def _savings(
+        source_size: int,
+        proxy_size: int,
+        source_metadata: Dict[str, Any],
+        proxy_metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Transfer and decode savings of a proxy against its source"""
+        def pixel_rate(metadata: Dict[str, Any]) -> Optional[float]:
+            video_stream = next(
+                (s for s in metadata.get("streams", []) if s.get("codec_type") == "video"), {}
+            )
+            fps = parse_frame_rate(video_stream.get("avg_frame_rate"))
+            if not fps or not metadata.get("width") or not metadata.get("height"):
+                return None
+            return metadata["width"] * metadata["height"] * fps
+        
+        source_rate = pixel_rate(source_metadata)
+        proxy_rate = pixel_rate(proxy_metadata)
+        
+        return {
+            "source_resolution": [source_metadata.get("width"), source_metadata.get("height")],
+            "proxy_resolution": [proxy_metadata.get("width"), proxy_metadata.get("height")],
+            "bytes_saved": source_size - proxy_size,
+            "size_reduction_pct": round(100 * (1 - proxy_size / source_size), 1) if source_size else 0.0,
+            # Pixels the model host decodes per second of video, source vs proxy
+            "decode_reduction_pct": (
+                round(100 * (1 - proxy_rate / source_rate), 1) if source_rate and proxy_rate else None
+            )
+        }
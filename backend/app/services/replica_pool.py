@@ -0,0 +1,278 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Collection, Dict, List, Optional, Tuple
+
+import httpx
+
+from .http_clients import HTTPClientRegistry, http_clients as default_http_clients
+from .resilience import CircuitBreaker, CircuitOpenError
+
+
+# Health probing of model replicas
+REPLICA_PROBE_INTERVAL_SEC = float(os.getenv("REPLICA_PROBE_INTERVAL_SEC", "10"))
+REPLICA_PROBE_TIMEOUT_SEC = float(os.getenv("REPLICA_PROBE_TIMEOUT_SEC", "5"))
+# Consecutive failed health probes before a replica is taken out of rotation
+# (request failures trip the replica's circuit breaker instead)
+REPLICA_EJECT_AFTER_FAILURES = int(os.getenv("REPLICA_EJECT_AFTER_FAILURES", "3"))
+
+
+def parse_endpoints(value: str) -> List[Tuple[str, float]]:
+    """
+    Parse a comma-separated replica list
+    
+    Each entry is a base URL with an optional "|weight" suffix, e.g.
+    "http://gpu1:8002|2, http://gpu2:8002" (weight defaults to 1).
+    
+    Returns:
+        List of (base_url, weight) tuples
+    """
+    endpoints = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, weight = entry.partition("|")
+        endpoints.append((url.strip().rstrip("/"), float(weight) if weight.strip() else 1.0))
+    return endpoints
+
+
+def is_replica_failure(error: BaseException) -> bool:
+    """Errors that say something about the replica (not the request): transport errors and 5xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+@dataclass
+class Replica:
+    """One model server behind a model key"""
+    url: str
+    weight: float = 1.0
+    in_flight: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    total_requests: int = 0
+    total_failures: int = 0
+    latency_ewma: Optional[float] = None  # Seconds, successful requests only
+    last_error: Optional[str] = None
+    ejected_at: Optional[float] = None
+    probe_failures: int = 0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    
+    def load(self) -> float:
+        """Outstanding requests per unit of weight, counting the one being placed"""
+        return (self.in_flight + 1) / self.weight
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "consecutive_failures": self.consecutive_failures,
+            "probe_failures": self.probe_failures,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "last_error": self.last_error,
+            "ejected_at": self.ejected_at,
+            "circuit": self.breaker.to_dict()
+        }
+
+
+class ReplicaPool:
+    """
+    Replicas of one model with least-outstanding-requests balancing
+    
+    Each request goes to the healthy replica with the fewest in-flight
+    requests relative to its weight (ties broken at random). A replica is
+    ejected after REPLICA_EJECT_AFTER_FAILURES failed health probes and
+    readmitted by the first successful one; if every replica is ejected,
+    requests are spread over all of them rather than failing outright.
+    Replicas whose circuit breaker is open are skipped, and when all of them
+    are open requests fail fast with CircuitOpenError.
+    """
+    
+    def __init__(
+        self,
+        model_key: str,
+        endpoints: List[Tuple[str, float]],
+        http_clients: Optional[HTTPClientRegistry] = None,
+        eject_after: int = REPLICA_EJECT_AFTER_FAILURES
+    ):
+        if not endpoints:
+            raise ValueError(f"No endpoints configured for model {model_key}")
+        self.model_key = model_key
+        self.replicas = [Replica(url=url, weight=max(weight, 0.01)) for url, weight in endpoints]
+        self.http_clients = http_clients or default_http_clients
+        self.eject_after = max(1, eject_after)
+        # Recent successful request latencies (hedging percentile)
+        self.latencies: deque = deque(maxlen=200)
+    
+    def choose(self, exclude: Collection[str] = ()) -> Replica:
+        """
+        Pick the replica for the next request
+        
+        Args:
+            exclude: Replica URLs not to use (e.g. ones already tried for this request)
+        
+        Returns:
+            The least loaded healthy replica (falls back to unhealthy or excluded ones if needed)
+        
+        Raises:
+            CircuitOpenError: If every replica's circuit breaker is open
+        """
+        available = [r for r in self.replicas if r.breaker.allows_request()]
+        if not available:
+            raise CircuitOpenError(
+                f"Model service unavailable: circuit open for every {self.model_key} replica"
+            )
+        candidates = [r for r in available if r.healthy and r.url not in exclude]
+        if not candidates:
+            candidates = [r for r in available if r.url not in exclude] or available
+        lowest = min(r.load() for r in candidates)
+        return random.choice([r for r in candidates if r.load() == lowest])
+    
+    def has_alternative(self, tried: Collection[str]) -> bool:
+        """Whether a healthy replica other than the ones tried could take a request"""
+        return any(
+            r.healthy and r.breaker.allows_request() and r.url not in tried for r in self.replicas
+        )
+    
+    @asynccontextmanager
+    async def lease(self, exclude: Collection[str] = ()) -> AsyncIterator[Replica]:
+        """
+        Hold a replica for the duration of one request
+        
+        Counts the request as in flight and records its outcome: transport
+        errors and 5xx responses count against the replica (and its circuit
+        breaker), anything else (including 4xx and cancellation) does not.
+        """
+        replica = self.choose(exclude)
+        replica.breaker.on_request()
+        replica.in_flight += 1
+        replica.total_requests += 1
+        start_time = time.time()
+        try:
+            yield replica
+        except BaseException as e:
+            if is_replica_failure(e):
+                self.record_failure(replica, e)
+            else:
+                replica.breaker.on_abandoned()
+            raise
+        else:
+            self.record_success(replica, time.time() - start_time)
+        finally:
+            replica.in_flight -= 1
+    
+    def record_success(self, replica: Replica, latency: Optional[float] = None) -> None:
+        replica.consecutive_failures = 0
+        if replica.breaker.state != "closed":
+            print(f"Circuit closed for {self.model_key} replica {replica.url}")
+        replica.breaker.on_success()
+        if latency is not None:
+            self.latencies.append(latency)
+            replica.latency_ewma = latency if replica.latency_ewma is None else 0.8 * replica.latency_ewma + 0.2 * latency
+    
+    def record_failure(self, replica: Replica, error: BaseException) -> None:
+        replica.consecutive_failures += 1
+        replica.total_failures += 1
+        replica.last_error = f"{type(error).__name__}: {error}"
+        was_open = replica.breaker.state == "open"
+        replica.breaker.on_failure()
+        if not was_open and replica.breaker.state == "open":
+            print(f"Circuit opened for {self.model_key} replica {replica.url}: {replica.last_error}")
+    
+    async def probe(self, replica: Replica, timeout: float = REPLICA_PROBE_TIMEOUT_SEC) -> bool:
+        """Health-check one replica (GET /v1/models), ejecting or readmitting it"""
+        try:
+            client = self.http_clients.get(replica.url)
+            response = await client.get(f"{replica.url}/v1/models", timeout=timeout)
+            response.raise_for_status()
+        except Exception as e:
+            replica.probe_failures += 1
+            replica.last_error = f"{type(e).__name__}: {e}"
+            if replica.healthy and replica.probe_failures >= self.eject_after:
+                replica.healthy = False
+                replica.ejected_at = time.time()
+                print(f"Ejected {self.model_key} replica {replica.url} after {replica.probe_failures} failed probes")
+            return False
+        
+        replica.probe_failures = 0
+        if not replica.healthy:
+            replica.healthy = True
+            replica.ejected_at = None
+            print(f"Readmitted {self.model_key} replica {replica.url}")
+        return True
+    
+    async def probe_all(self) -> List[bool]:
+        return await asyncio.gather(*[self.probe(replica) for replica in self.replicas])
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        return [replica.to_dict() for replica in self.replicas]
+
+
+class ReplicaPoolRegistry:
+    """
+    One ReplicaPool per model key, plus the background health prober
+    
+    Pools are built lazily from AVAILABLE_MODELS[...]["endpoints"]; the probe
+    loop is started and stopped by the app lifespan.
+    """
+    
+    def __init__(self, http_clients: Optional[HTTPClientRegistry] = None):
+        self.http_clients = http_clients or default_http_clients
+        self._pools: Dict[str, ReplicaPool] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+    
+    def get(self, model_key: str) -> ReplicaPool:
+        if model_key not in self._pools:
+            from .model_client import AVAILABLE_MODELS
+            self._pools[model_key] = ReplicaPool(
+                model_key, AVAILABLE_MODELS[model_key]["endpoints"], self.http_clients
+            )
+        return self._pools[model_key]
+    
+    def stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        from .model_client import AVAILABLE_MODELS
+        return {model_key: self.get(model_key).stats() for model_key in AVAILABLE_MODELS}
+    
+    def breaker_states(self) -> Dict[str, Dict[str, str]]:
+        """Circuit breaker state of every replica: {model_key: {url: state}}"""
+        from .model_client import AVAILABLE_MODELS
+        return {
+            model_key: {r.url: r.breaker.state for r in self.get(model_key).replicas}
+            for model_key in AVAILABLE_MODELS
+        }
+    
+    def start(self, interval: float = REPLICA_PROBE_INTERVAL_SEC) -> None:
+        """Start probing every replica of every model in the background"""
+        if interval <= 0 or (self._probe_task is not None and not self._probe_task.done()):
+            return
+        self._probe_task = asyncio.create_task(self._probe_loop(interval))
+    
+    async def _probe_loop(self, interval: float) -> None:
+        from .model_client import AVAILABLE_MODELS
+        while True:
+            await asyncio.gather(*[self.get(model_key).probe_all() for model_key in AVAILABLE_MODELS])
+            await asyncio.sleep(interval)
+    
+    async def aclose(self) -> None:
+        """Stop the probe loop (called on app shutdown)"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+
+# Shared registry used by VLLMClient and the app lifespan
+replica_pools = ReplicaPoolRegistry()
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, TypeVar
+
+import httpx
+
+
+T = TypeVar("T")
+
+# Retries of connect errors and 5xx responses (attempts include the first one)
+MODEL_RETRY_ATTEMPTS = int(os.getenv("MODEL_RETRY_ATTEMPTS", "3"))
+MODEL_RETRY_BASE_DELAY_SEC = float(os.getenv("MODEL_RETRY_BASE_DELAY_SEC", "0.5"))
+MODEL_RETRY_MAX_DELAY_SEC = float(os.getenv("MODEL_RETRY_MAX_DELAY_SEC", "8"))
+# Per-replica circuit breaker
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT_SEC = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SEC", "30"))
+# Hedged requests: a second request to another replica once the first is slower than this percentile
+MODEL_HEDGE_ENABLED = os.getenv("MODEL_HEDGE_ENABLED", "false").lower() == "true"
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+
+
+class ModelServiceError(Exception):
+    """Base class of model backend failures; status_code is the HTTP status to report"""
+    status_code = 503
+    headers: Optional[Dict[str, str]] = None  # Extra response headers (e.g. Retry-After)
+
+
+class ModelTimeoutError(ModelServiceError):
+    """The model server did not answer within the request timeout"""
+    status_code = 504
+
+
+class ModelUnavailableError(ModelServiceError):
+    """No replica could be reached (connection refused, tunnel down, ...)"""
+    status_code = 503
+
+
+class CircuitOpenError(ModelUnavailableError):
+    """Every replica's circuit breaker is open; failing fast instead of waiting"""
+    status_code = 503
+
+
+class ModelOverloadedError(ModelServiceError):
+    """The model's concurrency limit is reached and its wait queue is full"""
+    status_code = 503
+    
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = max(1, retry_after)
+        self.headers = {"Retry-After": str(self.retry_after)}
+
+
+class ModelResponseError(ModelServiceError):
+    """The model server answered with an error status"""
+    
+    def __init__(self, upstream_status: int, detail: str):
+        super().__init__(f"vLLM service error: {upstream_status} - {detail}")
+        self.upstream_status = upstream_status
+        self.detail = detail
+        # A 4xx means the request itself was rejected, not that the service is down
+        self.status_code = 503 if upstream_status >= 500 else 502
+
+
+def translate_error(error: BaseException, timeout: float) -> Optional[ModelServiceError]:
+    """
+    Map an httpx error to the typed model error, or None if it is not a transport/HTTP error
+    
+    Args:
+        error: Exception raised by the HTTP call
+        timeout: Request timeout in seconds (for the message)
+    """
+    if isinstance(error, ModelServiceError):
+        return error
+    if isinstance(error, httpx.TimeoutException) and not isinstance(error, httpx.ConnectTimeout):
+        return ModelTimeoutError(f"Model service request timed out (>{timeout:g}s)")
+    if isinstance(error, httpx.HTTPStatusError):
+        return ModelResponseError(error.response.status_code, error.response.text)
+    if isinstance(error, httpx.TransportError):
+        return ModelUnavailableError(f"Model service unavailable: {type(error).__name__}: {error}")
+    return None
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one replica
+    
+    Opens after failure_threshold consecutive failures; while open, requests
+    fail fast. After reset_timeout one trial request is let through
+    (half-open): success closes the breaker, failure re-opens it.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT_SEC
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+    
+    def allows_request(self) -> bool:
+        """Whether a request may be sent now (without claiming the half-open trial)"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.time() - self.opened_at >= self.reset_timeout
+        return not self.trial_in_flight
+    
+    def on_request(self) -> None:
+        """Called when a request is sent; an expired open breaker becomes half-open"""
+        if self.state == "open" and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            self.trial_in_flight = True
+    
+    def on_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+    
+    def on_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.time()
+            self.times_opened += 1
+    
+    def on_abandoned(self) -> None:
+        """The request was cancelled (e.g. a losing hedge); frees the half-open trial slot"""
+        self.trial_in_flight = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_at": self.opened_at,
+            "times_opened": self.times_opened
+        }
+
+
+class RetryPolicy:
+    """Retries with exponential backoff and full jitter"""
+    
+    def __init__(
+        self,
+        max_attempts: int = MODEL_RETRY_ATTEMPTS,
+        base_delay: float = MODEL_RETRY_BASE_DELAY_SEC,
+        max_delay: float = MODEL_RETRY_MAX_DELAY_SEC
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        """
+        Connect errors and 5xx responses are retried; read timeouts are not
+        (a wedged server would just make the caller wait another full timeout)
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
+    
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """attempt: number of attempts already made"""
+        return attempt < self.max_attempts and self.is_retryable(error)
+    
+    def delay(self, attempt: int) -> float:
+        """Sleep before the next attempt: uniform in [0, min(max_delay, base * 2^(attempt-1))]"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class HedgePolicy:
+    """When to send a second request to another replica"""
+    
+    def __init__(
+        self,
+        enabled: bool = MODEL_HEDGE_ENABLED,
+        percentile: float = MODEL_HEDGE_PERCENTILE,
+        min_samples: int = MODEL_HEDGE_MIN_SAMPLES
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.hedges_sent = 0
+        self.hedges_won = 0
+    
+    def delay(self, latencies: List[float]) -> Optional[float]:
+        """Latency percentile of recent successful requests, or None if hedging does not apply"""
+        if not self.enabled or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+
+async def call_with_resilience(
+    pool: Any,
+    send: Callable[[Any], Awaitable[T]],
+    retry: RetryPolicy,
+    hedge: Optional[HedgePolicy] = None
+) -> T:
+    """
+    Send a request to a model's replicas with retries and optional hedging
+    
+    Args:
+        pool: ReplicaPool of the model
+        send: Coroutine function performing the request against one replica
+        retry: Retry policy
+        hedge: Hedging policy (None disables hedging)
+    
+    Returns:
+        The result of the first successful attempt
+    
+    Raises:
+        CircuitOpenError: If every replica's breaker is open
+        Exception: The last error once retries are exhausted (untranslated httpx errors)
+    """
+    tried: Set[str] = set()
+    
+    async def attempt_once() -> T:
+        async with pool.lease(exclude=set(tried)) as replica:
+            tried.add(replica.url)
+            return await send(replica)
+    
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            delay = hedge.delay(list(pool.latencies)) if hedge is not None else None
+            if delay is None or not pool.has_alternative(tried):
+                return await attempt_once()
+            return await _hedged(pool, attempt_once, delay, tried, hedge)
+        except Exception as e:
+            if not retry.should_retry(e, attempt):
+                raise
+            await asyncio.sleep(retry.delay(attempt))
+
+
+async def _hedged(pool: Any, attempt_once: Callable[[], Awaitable[T]], delay: float, tried: Set[str], hedge: HedgePolicy) -> T:
+    """Run attempt_once, and again on another replica if the first is still running after delay"""
+    primary = asyncio.ensure_future(attempt_once())
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+        if not pool.has_alternative(tried):
+            return await primary
+        
+        hedge.hedges_sent += 1
+        tasks.add(asyncio.ensure_future(attempt_once()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        hedge.hedges_won += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The losing request is cancelled (its replica lease is released)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Cache lives in the captions volume next to the caption files
+RESULT_CACHE_PATH = os.getenv(
+    "RESULT_CACHE_PATH",
+    os.path.join(os.getenv("CAPTIONS_DIR", "/app/captions"), ".result_cache.sqlite3")
+)
+
+
+def make_request_key(
+    model_key: str,
+    prompt: str,
+    sampling_params: Dict[str, Any],
+    input_profile: Optional[str] = None
+) -> str:
+    """
+    Stable key for everything besides the video that determines a model's output
+    
+    Args:
+        model_key: Model key from AVAILABLE_MODELS
+        prompt: Prompt actually sent to the model
+        sampling_params: max_tokens / temperature / top_p sent with the request
+        input_profile: Identity of the preprocessing applied to the video and of
+            the audio sent with it (see CaptionService.get_input_profile)
+    
+    Returns:
+        Hex digest identifying the request
+    """
+    request = {"model": model_key, "prompt": prompt, "sampling": sampling_params}
+    if input_profile:
+        # Only present when preprocessing is used, so keys for original-file requests are unchanged
+        request["input"] = input_profile
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of model outputs
+    
+    Results are keyed by (video content hash, request key), so renamed or
+    re-uploaded copies of the same video never hit the model twice, and
+    different prompts or sampling parameters are cached separately. Filename
+    aliases remember the content hash of each video at a given size/mtime so
+    unchanged files are not re-hashed.
+    """
+    
+    def __init__(self, db_path: str = RESULT_CACHE_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                request_key TEXT NOT NULL,
+                model_key TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                sampling_params TEXT NOT NULL,
+                caption TEXT NOT NULL,
+                processing_time REAL,
+                model_version TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (content_hash, request_key)
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                filename TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_alias(self, filename: str, stat: os.stat_result) -> Optional[str]:
+        """Content hash recorded for a filename, if the file is unchanged since"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, size, mtime_ns FROM aliases WHERE filename = ?", (filename,)
+            ).fetchone()
+        if row is None or row[1] != stat.st_size or row[2] != stat.st_mtime_ns:
+            return None
+        return row[0]
+    
+    def set_alias(self, filename: str, stat: os.stat_result, content_hash: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aliases (filename, content_hash, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                (filename, content_hash, stat.st_size, stat.st_mtime_ns)
+            )
+            self._conn.commit()
+    
+    def get(self, content_hash: str, request_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+        
+        Returns:
+            Dictionary with caption, processing_time and model_version, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT caption, processing_time, model_version FROM results "
+                "WHERE content_hash = ? AND request_key = ?",
+                (content_hash, request_key)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"caption": row[0], "processing_time": row[1], "model": row[2]}
+    
+    def put(
+        self,
+        content_hash: str,
+        request_key: str,
+        model_key: str,
+        prompt: str,
+        sampling_params: Dict[str, Any],
+        result: Dict[str, Any]
+    ) -> None:
+        """Store a model result under its content hash and request key"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO results (
+                    content_hash, request_key, model_key, prompt, sampling_params,
+                    caption, processing_time, model_version, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    content_hash,
+                    request_key,
+                    model_key,
+                    prompt,
+                    json.dumps(sampling_params, sort_keys=True),
+                    result["caption"],
+                    result.get("processing_time"),
+                    result.get("model"),
+                    time.time(),
+                )
+            )
+            self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
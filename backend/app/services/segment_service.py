@@ -0,0 +1,133 @@
+import csv
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .single_flight import SingleFlight
+from ..utils.file_utils import run_ffmpeg_async
+
+
+# Segments live under VIDEOS_DIR so the video HTTP server (port 8080) serves them to the models
+SEGMENTS_DIR_NAME = os.getenv("SEGMENTS_DIR_NAME", ".segments")
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "60"))
+SEGMENT_SPLIT_TIMEOUT_SEC = float(os.getenv("SEGMENT_SPLIT_TIMEOUT_SEC", "600"))
+
+
+class SegmentService:
+    """
+    Fixed-window segments of long videos for map-reduce captioning
+    
+    Videos are split with stream copy (no re-encode), so cuts land on the
+    keyframe at or after each window boundary; the actual start/end times
+    reported by ffmpeg's segment list are kept in a manifest. Segment sets
+    are cached in VIDEOS_DIR/.segments keyed by content hash + window length.
+    """
+    
+    def __init__(self, videos_dir: str):
+        self.videos_dir = Path(videos_dir)
+        self.segments_dir = self.videos_dir / SEGMENTS_DIR_NAME
+        # Concurrent requests for the same split wait on one ffmpeg run
+        self.inflight = SingleFlight()
+    
+    def set_name(self, content_hash: str, segment_seconds: int) -> str:
+        return f"{content_hash}_{segment_seconds}s"
+    
+    def get_manifest(self, content_hash: str, segment_seconds: int) -> Optional[Dict[str, Any]]:
+        manifest_path = self.segments_dir / self.set_name(content_hash, segment_seconds) / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading segment manifest {manifest_path}: {str(e)}")
+            return None
+    
+    async def ensure(self, video_filename: str, content_hash: str, segment_seconds: int = SEGMENT_SECONDS) -> Dict[str, Any]:
+        """
+        Get the segments of a video, splitting it on first use
+        
+        Args:
+            video_filename: Source video filename in VIDEOS_DIR
+            content_hash: Content hash of the source video
+            segment_seconds: Target window length
+        
+        Returns:
+            Manifest with one {index, path, start, end} entry per segment (paths relative to VIDEOS_DIR)
+        
+        Raises:
+            MediaCommandError: If the split failed
+            MediaJobTimeout: If the split exceeded SEGMENT_SPLIT_TIMEOUT_SEC
+        """
+        manifest = self.get_manifest(content_hash, segment_seconds)
+        if manifest is not None:
+            return manifest
+        
+        return await self.inflight.do(
+            (content_hash, segment_seconds),
+            lambda: self._split(video_filename, content_hash, segment_seconds)
+        )
+    
+    async def _split(self, video_filename: str, content_hash: str, segment_seconds: int) -> Dict[str, Any]:
+        source_path = self.videos_dir / video_filename
+        name = self.set_name(content_hash, segment_seconds)
+        set_dir = self.segments_dir / name
+        tmp_dir = self.segments_dir / f".{name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        
+        list_path = tmp_dir / "segments.csv"
+        suffix = source_path.suffix.lower() or ".mp4"
+        args = [
+            'ffmpeg', '-y', '-i', str(source_path),
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', str(segment_seconds),
+            '-reset_timestamps', '1',
+            '-segment_list', str(list_path),
+            '-segment_list_type', 'csv',
+            str(tmp_dir / f"segment_%03d{suffix}")
+        ]
+        
+        start_time = time.time()
+        try:
+            await run_ffmpeg_async(args, timeout=SEGMENT_SPLIT_TIMEOUT_SEC)
+            
+            # segments.csv rows: filename,start,end (actual keyframe-aligned times)
+            segments = []
+            with open(list_path, 'r', encoding='utf-8') as f:
+                for index, row in enumerate(csv.reader(f)):
+                    if len(row) < 3:
+                        continue
+                    segments.append({
+                        "index": index,
+                        "path": f"{SEGMENTS_DIR_NAME}/{name}/{row[0]}",
+                        "start": round(float(row[1]), 3),
+                        "end": round(float(row[2]), 3)
+                    })
+            if not segments:
+                raise Exception("Segment split produced no segments")
+            
+            manifest = {
+                "video_filename": video_filename,
+                "content_hash": content_hash,
+                "segment_seconds": segment_seconds,
+                "segments": segments,
+                "split_seconds": round(time.time() - start_time, 3),
+                "created_at": datetime.now().isoformat()
+            }
+            with open(tmp_dir / "manifest.json", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            
+            shutil.rmtree(set_dir, ignore_errors=True)
+            os.replace(tmp_dir, set_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        print(f"Split {video_filename} into {len(segments)} segments of ~{segment_seconds}s in {manifest['split_seconds']}s")
+        return manifest
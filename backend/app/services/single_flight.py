@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls into one upstream call
+    
+    The first caller for a key starts the call as its own task; callers that
+    arrive while it is running await the same task and receive its result (or
+    exception). The task is shielded, so one caller going away does not cancel
+    the work the others are waiting on.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once per key at a time
+        
+        Args:
+            key: Identity of the call (must be hashable)
+            fn: Zero-argument coroutine function performing the upstream call
+        
+        Returns:
+            The result of the (possibly shared) call
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.coalesced_calls += 1
+        
+        return await asyncio.shield(task)
+    
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring how much duplicate work was avoided"""
+        total = self.upstream_calls + self.coalesced_calls
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "coalesced_ratio": round(self.coalesced_calls / total, 4) if total else 0.0
+        }
@@ -0,0 +1,405 @@
+import asyncio
+import base64
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .caption_index import CaptionIndex
+from ..utils.file_utils import VIDEO_EXTENSIONS, get_audio_filename, get_video_duration_async
+
+
+# How often the videos directory mtime is checked for new/removed files
+VIDEO_LIBRARY_REFRESH_SEC = float(os.getenv("VIDEO_LIBRARY_REFRESH_SEC", "2"))
+# Full rescan even without a directory mtime change (catches in-place rewrites)
+VIDEO_LIBRARY_RESCAN_SEC = float(os.getenv("VIDEO_LIBRARY_RESCAN_SEC", "60"))
+
+SORT_FIELDS = ("mtime", "size", "duration", "name")
+
+# Identifies this process in library versions; counters restart with the process
+_VERSION_EPOCH = format(int(time.time() * 1000), "x")
+
+# Fields a listing can project; caption_text is opt-in because it is the bulk of the payload
+LISTING_FIELDS = (
+    "filename", "size", "duration", "has_caption", "caption_text", "model_used",
+    "created_at", "has_audio", "audio_filename", "audio_size"
+)
+DEFAULT_LISTING_FIELDS = tuple(f for f in LISTING_FIELDS if f != "caption_text")
+
+
+class InvalidVersion(ValueError):
+    """Raised when a ?since= library version cannot be parsed"""
+    pass
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor is malformed or was issued for a different sort"""
+    pass
+
+
+@dataclass
+class VideoRecord:
+    """A video file known to the library"""
+    filename: str
+    stat: os.stat_result
+    duration: Optional[float] = None
+    probed: bool = False  # Duration lookup finished (successfully or not)
+    audio_filename: Optional[str] = None
+    audio_size: Optional[int] = None
+    
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_filename is not None
+    
+    def sort_key(self, sort: str) -> Tuple:
+        # Filename is the tie-breaker so keys are unique and cursors are stable
+        if sort == "mtime":
+            return (self.stat.st_mtime_ns, self.filename)
+        if sort == "size":
+            return (self.stat.st_size, self.filename)
+        if sort == "duration":
+            # Unknown durations sort before every known one
+            return (self.duration is not None, self.duration or 0.0, self.filename)
+        return (self.filename,)
+
+
+class VideoLibrary:
+    """
+    In-memory index of the videos directory
+    
+    Holds one record per video (stat, duration from the media index, matching
+    WAV track) so listings never walk the directory or stat files per request.
+    Kept fresh by polling the directory mtime, the same way CaptionIndex
+    tracks the captions directory. Sorted orders are cached per sort field
+    until the set of records changes.
+    """
+    
+    def __init__(
+        self,
+        videos_dir: str,
+        caption_index: CaptionIndex,
+        refresh_interval: float = VIDEO_LIBRARY_REFRESH_SEC
+    ):
+        self.videos_dir = Path(videos_dir)
+        self.caption_index = caption_index
+        self.refresh_interval = refresh_interval
+        
+        self._refresh_lock = asyncio.Lock()
+        self._records: Dict[str, VideoRecord] = {}
+        self._dir_mtime_ns: Optional[int] = None
+        self._last_check = 0.0
+        self._last_scan = 0.0
+        self._scanned = False
+        # Bumped whenever a record is added, removed or changed
+        self.generation = 0
+        self.last_modified = time.time()
+        self._video_generation: Dict[str, int] = {}
+        self._removed: Dict[str, int] = {}  # Tombstones for delta polling
+        self._sorted: Dict[str, Tuple[int, List[Tuple], List[VideoRecord]]] = {}
+    
+    def _scan(self) -> Tuple[Optional[int], Dict[str, os.stat_result], Dict[str, int]]:
+        """One pass over the videos directory: video stats and WAV sizes"""
+        videos: Dict[str, os.stat_result] = {}
+        wavs: Dict[str, int] = {}
+        try:
+            dir_mtime_ns = os.stat(self.videos_dir).st_mtime_ns
+            with os.scandir(self.videos_dir) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_file():
+                        continue
+                    suffix = os.path.splitext(dir_entry.name)[1].lower()
+                    if suffix in VIDEO_EXTENSIONS:
+                        videos[dir_entry.name] = dir_entry.stat()
+                    elif suffix == ".wav":
+                        wavs[dir_entry.name] = dir_entry.stat().st_size
+        except FileNotFoundError:
+            dir_mtime_ns = None
+        return dir_mtime_ns, videos, wavs
+    
+    async def refresh(self, force: bool = False) -> None:
+        """Rescan if the videos directory changed since the last check"""
+        async with self._refresh_lock:
+            now = time.monotonic()
+            if not force and self._scanned and now - self._last_check < self.refresh_interval:
+                return
+            self._last_check = now
+            
+            try:
+                dir_mtime_ns = os.stat(self.videos_dir).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = None
+            
+            if not (
+                force
+                or not self._scanned
+                or dir_mtime_ns != self._dir_mtime_ns
+                or now - self._last_scan >= VIDEO_LIBRARY_RESCAN_SEC
+            ):
+                return
+            
+            dir_mtime_ns, videos, wavs = await asyncio.to_thread(self._scan)
+            
+            records: Dict[str, VideoRecord] = {}
+            changed = set()
+            for filename, stat in videos.items():
+                audio_filename = get_audio_filename(filename)
+                audio_size = wavs.get(audio_filename)
+                
+                previous = self._records.get(filename)
+                if (
+                    previous is not None
+                    and previous.stat.st_size == stat.st_size
+                    and previous.stat.st_mtime_ns == stat.st_mtime_ns
+                ):
+                    record = previous
+                else:
+                    record = VideoRecord(filename=filename, stat=stat)
+                    changed.add(filename)
+                
+                if audio_size is None:
+                    audio_filename = None
+                if (record.audio_filename, record.audio_size) != (audio_filename, audio_size):
+                    record.audio_filename = audio_filename
+                    record.audio_size = audio_size
+                    changed.add(filename)
+                records[filename] = record
+            
+            # Durations come from the persistent media index; only new/changed files are probed
+            pending = [r for r in records.values() if not r.probed]
+            durations = await asyncio.gather(*[
+                get_video_duration_async(str(self.videos_dir / r.filename), stat=r.stat, raise_transient=True)
+                for r in pending
+            ], return_exceptions=True)
+            for record, duration in zip(pending, durations):
+                if isinstance(duration, BaseException):
+                    # Leave unprobed so the next scan retries (e.g. after a probe timeout)
+                    print(f"Error getting duration for {record.filename}: {str(duration)}")
+                    continue
+                record.duration = duration
+                record.probed = True
+                changed.add(record.filename)
+            
+            removed = set(self._records) - set(records)
+            
+            self._records = records
+            self._dir_mtime_ns = dir_mtime_ns
+            self._last_scan = time.monotonic()
+            self._scanned = True
+            if changed or removed:
+                self.generation += 1
+                self.last_modified = time.time()
+                for filename in changed:
+                    self._video_generation[filename] = self.generation
+                    self._removed.pop(filename, None)
+                for filename in removed:
+                    self._video_generation.pop(filename, None)
+                    self._removed[filename] = self.generation
+    
+    async def version(self) -> Tuple[str, float]:
+        """
+        Current library version, covering both videos and captions
+        
+        Returns:
+            Tuple of (version string usable as ?since=, last modified timestamp)
+        """
+        await self.refresh()
+        self.caption_index.refresh()
+        version = f"{_VERSION_EPOCH}.{self.generation}.{self.caption_index.generation}"
+        return version, max(self.last_modified, self.caption_index.last_modified)
+    
+    async def changes_since(self, since: str) -> Optional[Tuple[List[VideoRecord], List[str]]]:
+        """
+        Videos whose metadata or captions changed after a previous version
+        
+        Args:
+            since: Version returned by version()
+        
+        Returns:
+            Tuple of (changed records, removed filenames), or None if the version
+            comes from another process and the client must reload the full list
+        
+        Raises:
+            InvalidVersion: If the version is malformed
+        """
+        try:
+            epoch, library_generation, caption_generation = since.split(".")
+            library_generation = int(library_generation)
+            caption_generation = int(caption_generation)
+        except ValueError:
+            raise InvalidVersion(f"Malformed version '{since}'")
+        
+        await self.refresh()
+        if epoch != _VERSION_EPOCH:
+            return None
+        
+        names = {f for f, g in self._video_generation.items() if g > library_generation}
+        names.update(self.caption_index.changed_since(caption_generation))
+        changed = [self._records[f] for f in sorted(names) if f in self._records]
+        removed = sorted(f for f, g in self._removed.items() if g > library_generation)
+        return changed, removed
+    
+    async def get(self, filename: str) -> Optional[VideoRecord]:
+        await self.refresh()
+        return self._records.get(filename)
+    
+    async def records(self, sort: str = "mtime", descending: bool = True) -> List[VideoRecord]:
+        """All records in the requested order"""
+        await self.refresh()
+        _, records = self._sorted_records(sort)
+        return list(reversed(records)) if descending else list(records)
+    
+    def _sorted_records(self, sort: str) -> Tuple[List[Tuple], List[VideoRecord]]:
+        """Records in ascending order of sort key (cached until the library changes)"""
+        cached = self._sorted.get(sort)
+        if cached is not None and cached[0] == self.generation:
+            return cached[1], cached[2]
+        records = sorted(self._records.values(), key=lambda r: r.sort_key(sort))
+        keys = [r.sort_key(sort) for r in records]
+        self._sorted[sort] = (self.generation, keys, records)
+        return keys, records
+    
+    async def query(
+        self,
+        sort: str = "mtime",
+        descending: bool = True,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        has_caption: Optional[bool] = None,
+        model: Optional[str] = None,
+        has_audio: Optional[bool] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None
+    ) -> Tuple[List[VideoRecord], Optional[str], int]:
+        """
+        One page of the library (keyset pagination)
+        
+        Args:
+            sort: One of SORT_FIELDS
+            descending: Sort direction
+            limit: Page size
+            cursor: Opaque cursor returned with the previous page
+            has_caption: Only videos with (True) or without (False) any caption
+            model: Only videos captioned by this model
+            has_audio: Only videos with (True) or without (False) an extracted WAV
+            min_duration: Minimum duration in seconds (videos of unknown duration are excluded)
+            max_duration: Maximum duration in seconds (videos of unknown duration are excluded)
+        
+        Returns:
+            Tuple of (records, next_cursor or None, total matching the filters)
+        
+        Raises:
+            InvalidCursor: If the cursor is malformed or belongs to another sort
+        """
+        await self.refresh()
+        keys, records = self._sorted_records(sort)
+        
+        # Position from the cursor first, so only the matching window is filtered
+        if descending:
+            end = len(records) if cursor is None else bisect_left(keys, self._decode_cursor(cursor, sort, descending))
+            candidates = range(end - 1, -1, -1)
+        else:
+            start = 0 if cursor is None else bisect_right(keys, self._decode_cursor(cursor, sort, descending))
+            candidates = range(start, len(records))
+        
+        def matches(record: VideoRecord) -> bool:
+            if has_audio is not None and record.has_audio != has_audio:
+                return False
+            if min_duration is not None and (record.duration is None or record.duration < min_duration):
+                return False
+            if max_duration is not None and (record.duration is None or record.duration > max_duration):
+                return False
+            if has_caption is not None or model is not None:
+                caption_models = self.caption_index.models_for(record.filename)
+                if has_caption is not None and bool(caption_models) != has_caption:
+                    return False
+                if model is not None and model not in caption_models:
+                    return False
+            return True
+        
+        filtered = any(v is not None for v in (has_caption, model, has_audio, min_duration, max_duration))
+        total = sum(1 for r in records if matches(r)) if filtered else len(records)
+        
+        page: List[VideoRecord] = []
+        next_cursor = None
+        for i in candidates:
+            record = records[i]
+            if not matches(record):
+                continue
+            if len(page) == limit:
+                # There is at least one more match; continue after the last returned record
+                next_cursor = self._encode_cursor(page[-1].sort_key(sort), sort, descending)
+                break
+            page.append(record)
+        
+        return page, next_cursor, total
+    
+    @staticmethod
+    def _encode_cursor(key: Tuple, sort: str, descending: bool) -> str:
+        payload = json.dumps({"s": sort, "d": descending, "k": list(key)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            key = tuple(payload["k"])
+        except Exception:
+            raise InvalidCursor("Malformed cursor")
+        if payload.get("s") != sort or payload.get("d") != descending:
+            raise InvalidCursor("Cursor was issued for a different sort order")
+        return key
+
+
+def project_record(
+    record: VideoRecord,
+    caption_index: CaptionIndex,
+    fields: Tuple[str, ...] = DEFAULT_LISTING_FIELDS,
+    preview_chars: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Build a listing item with only the requested fields
+    
+    Args:
+        record: Library record
+        caption_index: Caption index for caption status and previews
+        fields: Subset of LISTING_FIELDS to include
+        preview_chars: Truncate caption_text to this many characters
+    
+    Returns:
+        Dictionary shaped like VideoInfo, restricted to the requested fields
+    """
+    item: Dict[str, Any] = {}
+    caption_models = None
+    if {"has_caption", "model_used", "caption_text"} & set(fields):
+        caption_models = caption_index.models_for(record.filename)
+    
+    for field in fields:
+        if field == "filename":
+            item[field] = record.filename
+        elif field == "size":
+            item[field] = record.stat.st_size
+        elif field == "duration":
+            item[field] = record.duration
+        elif field == "has_caption":
+            item[field] = bool(caption_models)
+        elif field == "model_used":
+            item[field] = ",".join(caption_models) if caption_models else None
+        elif field == "caption_text":
+            preview = caption_index.preview(record.filename) if caption_models else None
+            if preview is not None and preview_chars is not None and len(preview) > preview_chars:
+                preview = preview[:preview_chars].rstrip() + "…"
+            item[field] = preview
+        elif field == "created_at":
+            item[field] = datetime.fromtimestamp(record.stat.st_mtime, tz=timezone.utc)
+        elif field == "has_audio":
+            item[field] = record.has_audio
+        elif field == "audio_filename":
+            item[field] = record.audio_filename
+        elif field == "audio_size":
+            item[field] = record.audio_size
+    return item
@@ -1,8 +1,100 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
 import re
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import ffmpeg
+from typing import List, Dict, Any, Optional, Callable
+
+
+# Media worker configuration
+# Leave one core for the API event loop; everything else can run ffmpeg
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_CONCURRENT_FFMPEG = int(os.getenv("MAX_CONCURRENT_FFMPEG", str(MEDIA_WORKERS)))
+MEDIA_PROBE_TIMEOUT_SEC = float(os.getenv("MEDIA_PROBE_TIMEOUT_SEC", "30"))
+MEDIA_JOB_TIMEOUT_SEC = float(os.getenv("MEDIA_JOB_TIMEOUT_SEC", "600"))
+
+# Supported video extensions
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv'}
+
+# Audio renditions extracted next to the video. The speech/audio encoders of the
+# Qwen3-Omni models resample to 16 kHz mono anyway, so the model profiles stop there.
+AUDIO_PROFILES = {
+    # Original download format ({stem}.wav), about 10 MB per minute
+    "wav44k_stereo": {
+        "suffix": ".wav", "format": "wav", "codec": "pcm_s16le",
+        "sample_rate": 44100, "channels": 2, "bitrate": None, "media_type": "audio/wav"
+    },
+    # About 1.9 MB per minute
+    "wav16k_mono": {
+        "suffix": ".16k.wav", "format": "wav", "codec": "pcm_s16le",
+        "sample_rate": 16000, "channels": 1, "bitrate": None, "media_type": "audio/wav"
+    },
+    # Lossless, about 1 MB per minute for speech
+    "flac16k_mono": {
+        "suffix": ".16k.flac", "format": "flac", "codec": "flac",
+        "sample_rate": 16000, "channels": 1, "bitrate": None, "media_type": "audio/flac"
+    },
+    # Lossy, about 0.2 MB per minute
+    "opus16k_mono": {
+        "suffix": ".16k.opus", "format": "ogg", "codec": "libopus",
+        "sample_rate": 16000, "channels": 1, "bitrate": "24k", "media_type": "audio/ogg"
+    },
+}
+DEFAULT_AUDIO_PROFILE = "wav44k_stereo"
+
+
+class MediaJobTimeout(Exception):
+    """Raised when an ffprobe/ffmpeg job exceeds its timeout (the child process is killed)"""
+    pass
+
+
+class MediaCommandError(Exception):
+    """
+    Raised when an ffprobe/ffmpeg command exits with a non-zero status
+    
+    Built only from its constructor arguments so it survives the trip back
+    from a media worker process (ffmpeg.Error can't be unpickled).
+    """
+    
+    def __init__(self, cmd: str, stderr: str):
+        super().__init__(cmd, stderr)
+        self.cmd = cmd
+        self.stderr = stderr
+    
+    def __str__(self) -> str:
+        return f"{self.cmd} failed: {self.stderr.strip()[-2000:]}"
+
+
+def run_media_command(args: List[str], timeout: float = MEDIA_JOB_TIMEOUT_SEC) -> bytes:
+    """
+    Run an ffmpeg/ffprobe command line, killing the child if it overruns
+    
+    Args:
+        args: Full command line (e.g. from ffmpeg's .compile())
+        timeout: Seconds before the child process is killed
+    
+    Returns:
+        Captured stdout
+    
+    Raises:
+        MediaJobTimeout: If the command exceeded the timeout
+        MediaCommandError: If the command exited with a non-zero status
+    """
+    try:
+        # subprocess.run kills the child on timeout before re-raising
+        result = subprocess.run(args, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise MediaJobTimeout(f"{args[0]} timed out after {timeout:.0f}s")
+    
+    if result.returncode != 0:
+        raise MediaCommandError(args[0], result.stderr.decode('utf-8', errors='replace'))
+    return result.stdout
 
 
 def get_video_files(videos_dir: str) -> List[Path]:
@@ -20,12 +112,9 @@ def get_video_files(videos_dir: str) -> List[Path]:
     if not videos_path.exists():
         return []
     
-    # Supported video extensions
-    video_extensions = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv'}
-    
     video_files = []
     for file_path in videos_path.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in video_extensions:
+        if file_path.is_file() and file_path.suffix.lower() in VIDEO_EXTENSIONS:
             video_files.append(file_path)
     
     # Sort by modification time (newest first)
@@ -34,35 +123,108 @@ def get_video_files(videos_dir: str) -> List[Path]:
     return video_files
 
 
-def get_video_duration(video_path: str) -> Optional[float]:
+def probe_video_metadata(video_path: str, timeout: float = MEDIA_PROBE_TIMEOUT_SEC) -> Dict[str, Any]:
     """
-    Get video duration in seconds using ffprobe
+    Run ffprobe on a video and normalize the fields we care about
     
     Args:
         video_path: Path to video file
+        timeout: Seconds before ffprobe is killed
     
     Returns:
-        Duration in seconds or None if unable to determine
+        Dictionary with duration, codecs, audio track flag, resolution and streams
+    
+    Raises:
+        MediaCommandError: If ffprobe fails
+        MediaJobTimeout: If ffprobe exceeded the timeout
     """
-    try:
-        probe = ffmpeg.probe(video_path)
-        video_stream = next(
-            (stream for stream in probe['streams'] if stream['codec_type'] == 'video'),
-            None
-        )
-        if video_stream:
-            duration = float(video_stream.get('duration', 0))
-            if duration > 0:
-                return duration
-        
+    output = run_media_command(
+        ['ffprobe', '-show_format', '-show_streams', '-of', 'json', video_path],
+        timeout=timeout
+    )
+    probe = json.loads(output.decode('utf-8'))
+    streams = probe.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    
+    duration = None
+    if video_stream and float(video_stream.get('duration', 0) or 0) > 0:
+        duration = float(video_stream['duration'])
+    elif 'format' in probe and 'duration' in probe['format']:
         # Fallback to format duration
-        if 'format' in probe and 'duration' in probe['format']:
-            return float(probe['format']['duration'])
-        
+        duration = float(probe['format']['duration'])
+    
+    return {
+        "duration": duration,
+        "video_codec": video_stream.get('codec_name') if video_stream else None,
+        "audio_codec": audio_stream.get('codec_name') if audio_stream else None,
+        "has_audio_track": audio_stream is not None,
+        "width": video_stream.get('width') if video_stream else None,
+        "height": video_stream.get('height') if video_stream else None,
+        "streams": [
+            {
+                "index": s.get('index'),
+                "codec_type": s.get('codec_type'),
+                "codec_name": s.get('codec_name'),
+                "avg_frame_rate": s.get('avg_frame_rate')
+            }
+            for s in streams
+        ]
+    }
+
+
+def get_video_metadata(video_path: str, stat: Optional[os.stat_result] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get video metadata from the persistent media index, probing only on a miss
+    
+    Args:
+        video_path: Path to video file
+        stat: Optional pre-computed stat result
+    
+    Returns:
+        Metadata dictionary or None if the file does not exist
+    """
+    from .media_index import get_media_index
+    return get_media_index().get_or_probe(
+        video_path,
+        probe_video_metadata,
+        stat=stat,
+        cache_errors=(MediaCommandError, ValueError)
+    )
+
+
+def get_video_duration(video_path: str, stat: Optional[os.stat_result] = None) -> Optional[float]:
+    """
+    Get video duration in seconds (served from the media index)
+    
+    Args:
+        video_path: Path to video file
+        stat: Optional pre-computed stat result
+    
+    Returns:
+        Duration in seconds or None if unable to determine
+    """
+    metadata = get_video_metadata(video_path, stat=stat)
+    if metadata is None:
         return None
+    return metadata.get("duration")
+
+
+def parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """
+    Parse an ffprobe frame rate ("30000/1001", "25/1" or "25")
     
-    except Exception as e:
-        print(f"Error getting video duration: {str(e)}")
+    Returns:
+        Frames per second or None if unknown
+    """
+    if not rate:
+        return None
+    try:
+        if '/' in rate:
+            num, den = rate.split('/', 1)
+            return float(num) / float(den) if float(den) else None
+        return float(rate)
+    except ValueError:
         return None
 
 
@@ -88,29 +250,41 @@ def validate_video_constraints(
         return False, "Video file not found"
     
     # Check file size
-    file_size_mb = file_path.stat().st_size / (1024 * 1024)
+    stat = file_path.stat()
+    file_size_mb = stat.st_size / (1024 * 1024)
     if file_size_mb > max_size_mb:
         return False, f"Video size ({file_size_mb:.1f}MB) exceeds limit of {max_size_mb}MB"
     
     # Check duration
-    duration = get_video_duration(video_path)
+    duration = get_video_duration(video_path, stat=stat)
     if duration and duration > max_duration_sec:
         return False, f"Video duration ({duration:.1f}s) exceeds limit of {max_duration_sec}s"
     
     return True, None
 
 
-def extract_model_from_caption_filename(caption_filename: str) -> Optional[str]:
+def extract_model_from_caption_filename(
+    caption_filename: str,
+    known_models: Optional[List[str]] = None
+) -> Optional[str]:
     """
     Extract model name from caption filename
     Format: video.mp4_modelname.json
     
     Args:
         caption_filename: Caption file name
+        known_models: Model keys to match first (needed for keys that contain
+            underscores, e.g. qwen3omni_captioner)
     
     Returns:
         Model name or None
     """
+    if known_models:
+        # Longest key first so "qwen3omni_captioner" wins over a shorter suffix
+        for model_key in sorted(known_models, key=len, reverse=True):
+            if caption_filename.endswith(f"_{model_key}.json"):
+                return model_key
+    
     # Pattern: {video_name}_{model}.json
     match = re.search(r'_([^_]+)\.json$', caption_filename)
     if match:
@@ -158,110 +332,387 @@ def find_caption_for_video(
     return None
 
 
-def get_audio_filename(video_filename: str) -> str:
+def compute_file_hash(file_path: str, chunk_size: int = 4 * 1024 * 1024) -> str:
     """
-    Convert video filename to WAV audio filename
+    Compute a content hash of a file by streaming it in chunks
+    
+    Args:
+        file_path: Path to file
+        chunk_size: Bytes read per chunk
+    
+    Returns:
+        Hex digest (BLAKE2b, 128-bit)
+    """
+    # BLAKE2b is the fastest strong hash in the stdlib and releases the GIL on large buffers
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def compute_file_hash_async(file_path: str) -> str:
+    """Async variant of compute_file_hash (runs in a thread; hashing is I/O-bound)"""
+    return await asyncio.to_thread(compute_file_hash, file_path)
+
+
+def get_audio_filename(video_filename: str, profile: Optional[str] = None) -> str:
+    """
+    Convert video filename to audio filename
     
     Args:
         video_filename: Video filename (e.g., "example.mp4")
+        profile: Audio profile name from AUDIO_PROFILES (default: the 44.1 kHz WAV)
     
     Returns:
-        Audio filename with .wav extension (e.g., "example.wav")
+        Audio filename (e.g., "example.wav", or "example.16k.flac" for flac16k_mono)
     """
     video_path = Path(video_filename)
-    return video_path.with_suffix('.wav').name
+    suffix = AUDIO_PROFILES[profile or DEFAULT_AUDIO_PROFILE]["suffix"]
+    return video_path.stem + suffix
 
 
-def check_audio_exists(video_filename: str, videos_dir: str) -> bool:
+def check_audio_exists(video_filename: str, videos_dir: str, profile: Optional[str] = None) -> bool:
     """
     Check if audio file exists for a video
     
     Args:
         video_filename: Video filename
         videos_dir: Videos directory path
+        profile: Audio profile name (default: the 44.1 kHz WAV)
     
     Returns:
         True if audio file exists, False otherwise
     """
     videos_path = Path(videos_dir)
-    audio_filename = get_audio_filename(video_filename)
+    audio_filename = get_audio_filename(video_filename, profile)
     audio_path = videos_path / audio_filename
     
     return audio_path.exists() and audio_path.is_file()
 
 
-def extract_audio_to_wav(video_path: str, output_path: str) -> str:
+def _run_audio_extraction(
+    video_path: str,
+    output_path: str,
+    profile: str = DEFAULT_AUDIO_PROFILE,
+    timeout: float = MEDIA_JOB_TIMEOUT_SEC
+) -> str:
     """
-    Extract audio from video file and convert to WAV format
+    Run the ffmpeg audio extraction itself (executed inline or in a media worker)
+    
+    A single ffmpeg pass: mapping the first audio stream makes ffmpeg's own
+    demuxer probe answer "does it have audio", so no separate ffprobe run is needed.
+    Output is written to a temporary file and renamed, so a partial file is never
+    mistaken for a cached rendition.
+    """
+    settings = AUDIO_PROFILES[profile]
+    tmp_path = f"{output_path}.part"
+    try:
+        # -map 0:a:0: first audio stream only (fails fast if there is none)
+        # -vn: disable video
+        args = [
+            'ffmpeg', '-y', '-i', video_path,
+            '-map', '0:a:0', '-vn',
+            '-c:a', settings["codec"],
+            '-ar', str(settings["sample_rate"]),
+            '-ac', str(settings["channels"]),
+        ]
+        if settings["bitrate"]:
+            args += ['-b:a', settings["bitrate"]]
+        args += ['-f', settings["format"], tmp_path]
+        run_media_command(args, timeout=timeout)
+        
+        # Verify output file was created
+        if not Path(tmp_path).exists():
+            raise Exception("Audio extraction completed but output file not found")
+        os.replace(tmp_path, output_path)
+        
+        return output_path
+    
+    except MediaJobTimeout:
+        raise
+    except MediaCommandError as e:
+        error_msg = e.stderr or str(e)
+        # Check for common error messages
+        if (
+            "matches no streams" in error_msg.lower()
+            or "no audio stream" in error_msg.lower()
+            or "does not contain any stream" in error_msg.lower()
+        ):
+            raise ValueError("Video has no audio track")
+        raise Exception(f"FFmpeg error: {error_msg}")
+    except Exception as e:
+        if "no audio track" in str(e).lower() or "Video has no audio track" in str(e):
+            raise ValueError("Video has no audio track")
+        raise Exception(f"Failed to extract audio: {str(e)}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _known_to_have_no_audio(video_path: str) -> bool:
+    """True only if the media index already recorded that the video has no audio track (never probes)"""
+    from .media_index import get_media_index
+    metadata = get_media_index().lookup(video_path)
+    return bool(metadata and not metadata.get("probe_error") and not metadata.get("has_audio_track"))
+
+
+def extract_audio(video_path: str, output_path: str, profile: str = DEFAULT_AUDIO_PROFILE) -> str:
+    """
+    Extract audio from a video file using an audio profile
     
     Args:
         video_path: Path to input video file
-        output_path: Path to output WAV file
+        output_path: Path to output audio file
+        profile: Audio profile name from AUDIO_PROFILES
     
     Returns:
-        Path to output WAV file
+        Path to output audio file
     
     Raises:
-        Exception: If video has no audio track or extraction fails
+        ValueError: If the video has no audio track or the profile is unknown
+        Exception: If extraction fails
     """
-    import ffmpeg
+    if profile not in AUDIO_PROFILES:
+        raise ValueError(f"Unknown audio profile: {profile}. Available: {list(AUDIO_PROFILES.keys())}")
     
     video_file = Path(video_path)
     
     if not video_file.exists():
         raise FileNotFoundError(f"Video file not found: {video_path}")
     
-    # Check if video has audio track
-    try:
-        probe = ffmpeg.probe(video_path)
-        audio_streams = [s for s in probe.get('streams', []) if s.get('codec_type') == 'audio']
-        
-        if not audio_streams:
-            raise ValueError("Video has no audio track")
-    except Exception as e:
-        if "no audio track" in str(e).lower() or "Video has no audio track" in str(e):
-            raise ValueError("Video has no audio track")
-        # If probe fails for other reasons, continue and let ffmpeg handle it
+    if _known_to_have_no_audio(video_path):
+        raise ValueError("Video has no audio track")
     
-    try:
-        # Extract audio and convert to WAV
-        # -vn: disable video
-        # -acodec pcm_s16le: PCM 16-bit little-endian (standard WAV)
-        # -ar 44100: sample rate 44.1kHz (CD quality)
-        # -ac 2: stereo (2 channels)
-        (
-            ffmpeg
-            .input(video_path)
-            .output(
-                output_path,
-                vn=None,  # No video
-                acodec='pcm_s16le',  # WAV codec
-                ar=44100,  # Sample rate
-                ac=2  # Stereo
+    return _run_audio_extraction(video_path, output_path, profile)
+
+
+def extract_audio_to_wav(video_path: str, output_path: str) -> str:
+    """
+    Extract audio from video file and convert to WAV format (44.1 kHz stereo)
+    
+    Args:
+        video_path: Path to input video file
+        output_path: Path to output WAV file
+    
+    Returns:
+        Path to output WAV file
+    
+    Raises:
+        Exception: If video has no audio track or extraction fails
+    """
+    return extract_audio(video_path, output_path, DEFAULT_AUDIO_PROFILE)
+
+
+class MediaWorkerPool:
+    """
+    Process pool for ffprobe/ffmpeg jobs so media work never blocks the event loop
+    
+    Jobs are plain picklable functions that shell out to ffmpeg with their own
+    timeout (the child is killed when it overruns). A semaphore caps how many
+    ffmpeg processes run at once; extra jobs wait on the event loop instead of
+    piling up inside the executor.
+    """
+    
+    def __init__(self, max_workers: int = MEDIA_WORKERS, max_concurrent: int = MAX_CONCURRENT_FFMPEG):
+        self.max_workers = max_workers
+        self.max_concurrent = max_concurrent
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.active_jobs = 0
+        self.queued_jobs = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers must not inherit the event loop, sockets or the SQLite handle
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
             )
-            .overwrite_output()  # Overwrite if exists
-            .run(quiet=True, capture_stdout=True, capture_stderr=True)
-        )
+        return self._executor
+    
+    async def run(self, fn: Callable, *args, timeout: float = MEDIA_JOB_TIMEOUT_SEC):
+        """
+        Run a media job in the pool
         
-        # Verify output file was created
-        output_file = Path(output_path)
-        if not output_file.exists():
-            raise Exception("Audio extraction completed but output file not found")
+        Args:
+            fn: Module-level function to execute in a worker process
+            *args: Positional arguments for fn (fn must accept a trailing timeout)
+            timeout: Per-job timeout enforced inside the worker
         
-        return output_path
+        Returns:
+            Whatever fn returns
+        
+        Raises:
+            MediaJobTimeout: If the job exceeded its timeout
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        
+        from .metrics import observe_media_job
+        start_time = time.perf_counter()
+        outcome = "error"
+        
+        self.queued_jobs += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued_jobs -= 1
+        
+        self.active_jobs += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), fn, *args, timeout)
+            try:
+                # Backstop in case the worker itself wedges; the child-side timeout fires first
+                result = await asyncio.wait_for(future, timeout + 10)
+                outcome = "ok"
+                return result
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise MediaJobTimeout(f"Media job timed out after {timeout:.0f}s")
+            except MediaJobTimeout:
+                # Raised by the worker when it killed an overrunning ffmpeg/ffprobe
+                outcome = "timeout"
+                raise
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool for the next job
+                self.shutdown()
+                raise
+        finally:
+            self.active_jobs -= 1
+            self._semaphore.release()
+            observe_media_job(fn.__name__, time.perf_counter() - start_time, outcome)
+    
+    def shutdown(self) -> None:
+        """Stop worker processes (called on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared media worker pool
+media_workers = MediaWorkerPool()
+
+
+async def get_video_metadata_async(
+    video_path: str,
+    stat: Optional[os.stat_result] = None,
+    raise_transient: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Async variant of get_video_metadata; index misses are probed in the media worker pool
     
-    except ffmpeg.Error as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
-        # Check for common error messages
-        if "no audio stream" in error_msg.lower() or "does not contain any stream" in error_msg.lower():
-            raise ValueError("Video has no audio track")
-        raise Exception(f"FFmpeg error: {error_msg}")
+    Args:
+        video_path: Path to video file
+        stat: Optional pre-computed stat result
+        raise_transient: Re-raise probe timeouts and worker failures instead of returning None
+    
+    Returns:
+        Metadata dictionary or None if the file does not exist
+    
+    Raises:
+        MediaJobTimeout, BrokenProcessPool: Only with raise_transient
+    """
+    from .media_index import get_media_index
+    index = get_media_index()
+    
+    if stat is None:
+        try:
+            stat = os.stat(video_path)
+        except OSError:
+            return None
+    
+    cached = index.lookup(video_path, stat)
+    if cached is not None:
+        return cached
+    
+    try:
+        metadata = await media_workers.run(probe_video_metadata, video_path, timeout=MEDIA_PROBE_TIMEOUT_SEC)
+    except (MediaCommandError, ValueError) as e:
+        # ffprobe rejected the file: remember that until the file changes
+        print(f"Error probing {video_path}: {str(e)}")
+        return index.store(video_path, stat, None, probe_error=str(e))
     except Exception as e:
-        if "no audio track" in str(e).lower() or "Video has no audio track" in str(e):
-            raise ValueError("Video has no audio track")
-        raise Exception(f"Failed to extract audio: {str(e)}")
+        # Timeouts and worker failures are transient: don't cache them
+        if raise_transient:
+            raise
+        print(f"Error probing {video_path}: {str(e)}")
+        return None
+    
+    return index.store(video_path, stat, metadata)
 
 
+async def get_video_duration_async(
+    video_path: str,
+    stat: Optional[os.stat_result] = None,
+    raise_transient: bool = False
+) -> Optional[float]:
+    """Async variant of get_video_duration (see get_video_metadata_async for raise_transient)"""
+    metadata = await get_video_metadata_async(video_path, stat=stat, raise_transient=raise_transient)
+    if metadata is None:
+        return None
+    return metadata.get("duration")
 
 
+async def validate_video_constraints_async(
+    video_path: str,
+    max_size_mb: int = 100,
+    max_duration_sec: int = 300
+) -> tuple[bool, Optional[str]]:
+    """Async variant of validate_video_constraints"""
+    file_path = Path(video_path)
+    
+    if not file_path.exists():
+        return False, "Video file not found"
+    
+    # Check file size
+    stat = file_path.stat()
+    file_size_mb = stat.st_size / (1024 * 1024)
+    if file_size_mb > max_size_mb:
+        return False, f"Video size ({file_size_mb:.1f}MB) exceeds limit of {max_size_mb}MB"
+    
+    # Check duration
+    duration = await get_video_duration_async(video_path, stat=stat)
+    if duration and duration > max_duration_sec:
+        return False, f"Video duration ({duration:.1f}s) exceeds limit of {max_duration_sec}s"
+    
+    return True, None
+
+
+async def extract_audio_async(video_path: str, output_path: str, profile: str = DEFAULT_AUDIO_PROFILE) -> str:
+    """Async variant of extract_audio; ffmpeg runs in the media worker pool"""
+    if profile not in AUDIO_PROFILES:
+        raise ValueError(f"Unknown audio profile: {profile}. Available: {list(AUDIO_PROFILES.keys())}")
+    
+    video_file = Path(video_path)
+    
+    if not video_file.exists():
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+    
+    if _known_to_have_no_audio(video_path):
+        raise ValueError("Video has no audio track")
+    
+    return await media_workers.run(_run_audio_extraction, video_path, output_path, profile, timeout=MEDIA_JOB_TIMEOUT_SEC)
+
+
+async def extract_audio_to_wav_async(video_path: str, output_path: str) -> str:
+    """Async variant of extract_audio_to_wav; ffmpeg runs in the media worker pool"""
+    return await extract_audio_async(video_path, output_path, DEFAULT_AUDIO_PROFILE)
+
 
+async def run_ffmpeg_async(args: List[str], timeout: float = MEDIA_JOB_TIMEOUT_SEC) -> bytes:
+    """
+    Run an arbitrary compiled ffmpeg command (e.g. a transcode) in the media worker pool
+    
+    Args:
+        args: Full command line, typically from ffmpeg-python's .compile()
+        timeout: Seconds before the ffmpeg child is killed
+    
+    Returns:
+        Captured stdout
+    """
+    return await media_workers.run(run_media_command, args, timeout=timeout)
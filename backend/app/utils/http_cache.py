@@ -0,0 +1,48 @@
+import hashlib
+from email.utils import formatdate
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: str) -> str:
+    """
+    Build a strong entity tag from version components
+    
+    Args:
+        parts: Strings that together identify the representation
+    
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def cache_headers(etag: str, last_modified: Optional[float] = None) -> Dict[str, str]:
+    """
+    Validator headers for a conditional response
+    
+    Cache-Control: no-cache lets browsers keep the body but revalidate every
+    time, so polling clients get a 304 instead of the full payload.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 response carrying the same validators as the full response"""
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,242 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+# Index lives in the captions volume so it survives container rebuilds
+MEDIA_INDEX_PATH = os.getenv(
+    "MEDIA_INDEX_PATH",
+    os.path.join(os.getenv("CAPTIONS_DIR", "/app/captions"), ".media_index.sqlite3")
+)
+
+
+class MediaIndex:
+    """
+    Persistent SQLite index of ffprobe metadata for video files
+    
+    Rows are keyed by absolute path and are only valid while the file's size
+    and mtime match the values recorded at probe time, so a file is probed
+    once and re-probed only after it changes on disk.
+    """
+    
+    def __init__(self, db_path: str = MEDIA_INDEX_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                duration REAL,
+                video_codec TEXT,
+                audio_codec TEXT,
+                has_audio_track INTEGER NOT NULL DEFAULT 0,
+                width INTEGER,
+                height INTEGER,
+                streams TEXT,
+                probe_error TEXT,
+                probed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(video_path: str) -> str:
+        return str(Path(video_path).resolve())
+    
+    @staticmethod
+    def _row_to_metadata(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "size": row[1],
+            "mtime_ns": row[2],
+            "duration": row[3],
+            "video_codec": row[4],
+            "audio_codec": row[5],
+            "has_audio_track": bool(row[6]),
+            "width": row[7],
+            "height": row[8],
+            "streams": json.loads(row[9]) if row[9] else [],
+            "probe_error": row[10],
+        }
+    
+    def lookup(self, video_path: str, stat: Optional[os.stat_result] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return cached metadata if the file has not changed since it was probed
+        
+        Args:
+            video_path: Path to video file
+            stat: Optional pre-computed stat result (saves a syscall when listing)
+        
+        Returns:
+            Metadata dictionary or None if missing or stale
+        """
+        if stat is None:
+            try:
+                stat = os.stat(video_path)
+            except OSError:
+                return None
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM media WHERE path = ?", (self._key(video_path),)
+            ).fetchone()
+        
+        if row is None or row[1] != stat.st_size or row[2] != stat.st_mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._row_to_metadata(row)
+    
+    def store(
+        self,
+        video_path: str,
+        stat: os.stat_result,
+        metadata: Optional[Dict[str, Any]],
+        probe_error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Record probe results (or a probe failure) for a file at its current size/mtime
+        
+        Returns:
+            The metadata dictionary as it will be served from the index
+        """
+        metadata = metadata or {}
+        streams = metadata.get("streams", [])
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO media (
+                    path, size, mtime_ns, duration, video_codec, audio_codec,
+                    has_audio_track, width, height, streams, probe_error, probed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    self._key(video_path),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    metadata.get("duration"),
+                    metadata.get("video_codec"),
+                    metadata.get("audio_codec"),
+                    1 if metadata.get("has_audio_track") else 0,
+                    metadata.get("width"),
+                    metadata.get("height"),
+                    json.dumps(streams),
+                    probe_error,
+                    time.time(),
+                )
+            )
+            self._conn.commit()
+        
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "duration": metadata.get("duration"),
+            "video_codec": metadata.get("video_codec"),
+            "audio_codec": metadata.get("audio_codec"),
+            "has_audio_track": bool(metadata.get("has_audio_track")),
+            "width": metadata.get("width"),
+            "height": metadata.get("height"),
+            "streams": streams,
+            "probe_error": probe_error,
+        }
+    
+    def get_or_probe(
+        self,
+        video_path: str,
+        probe_fn: Callable[[str], Dict[str, Any]],
+        stat: Optional[os.stat_result] = None,
+        cache_errors: Tuple[Type[BaseException], ...] = (Exception,)
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return cached metadata, probing and storing it first if missing or stale
+        
+        Probe failures listed in cache_errors are cached too so a corrupt file
+        is not re-probed on every poll; any other failure is treated as transient.
+        
+        Args:
+            video_path: Path to video file
+            probe_fn: Callable returning normalized metadata for a path
+            stat: Optional pre-computed stat result
+            cache_errors: Exception types that mean "this file cannot be probed"
+        
+        Returns:
+            Metadata dictionary or None if the file does not exist or the probe failed transiently
+        """
+        if stat is None:
+            try:
+                stat = os.stat(video_path)
+            except OSError:
+                return None
+        
+        cached = self.lookup(video_path, stat)
+        if cached is not None:
+            return cached
+        
+        try:
+            metadata = probe_fn(video_path)
+        except cache_errors as e:
+            print(f"Error probing {video_path}: {str(e)}")
+            return self.store(video_path, stat, None, probe_error=str(e))
+        except Exception as e:
+            print(f"Error probing {video_path}: {str(e)}")
+            return None
+        
+        return self.store(video_path, stat, metadata)
+    
+    def prune(self, existing_paths) -> int:
+        """
+        Drop rows for files that no longer exist
+        
+        Args:
+            existing_paths: Iterable of paths currently present on disk
+        
+        Returns:
+            Number of rows removed
+        """
+        keep = {self._key(p) for p in existing_paths}
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM media").fetchall()
+            stale = [(r[0],) for r in rows if r[0] not in keep]
+            if stale:
+                self._conn.executemany("DELETE FROM media WHERE path = ?", stale)
+                self._conn.commit()
+        return len(stale)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counters (misses include stale rows)"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_media_index: Optional[MediaIndex] = None
+_media_index_lock = threading.Lock()
+
+
+def get_media_index() -> MediaIndex:
+    """Get the process-wide media index, opening it on first use"""
+    global _media_index
+    if _media_index is None:
+        with _media_index_lock:
+            if _media_index is None:
+                _media_index = MediaIndex()
+    return _media_index
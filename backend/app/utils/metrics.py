@@ -0,0 +1,211 @@
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+# Buckets: API calls range from sub-millisecond listings to multi-minute generations
+API_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+MODEL_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+MEDIA_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+IO_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+API_REQUEST_SECONDS = Histogram(
+    "caption_api_request_duration_seconds",
+    "API request latency until the response body was sent",
+    ["method", "route", "status"],
+    buckets=API_BUCKETS
+)
+API_REQUESTS_IN_FLIGHT = Gauge(
+    "caption_api_requests_in_flight",
+    "API requests currently being handled"
+)
+
+MODEL_REQUEST_SECONDS = Histogram(
+    "caption_model_request_duration_seconds",
+    "Model backend request latency (after admission), by outcome",
+    ["model", "outcome"],
+    buckets=MODEL_BUCKETS
+)
+MODEL_QUEUE_WAIT_SECONDS = Histogram(
+    "caption_model_queue_wait_seconds",
+    "Time spent waiting for a slot of the model's concurrency limit",
+    ["model"],
+    buckets=MEDIA_BUCKETS
+)
+MODEL_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "caption_model_time_to_first_token_seconds",
+    "Time to the first streamed token",
+    ["model"],
+    buckets=MODEL_BUCKETS
+)
+MODEL_TOKENS_PER_SECOND = Histogram(
+    "caption_model_tokens_per_second",
+    "Decode rate of completed generations",
+    ["model"],
+    buckets=(1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+)
+MODEL_TOKENS = Counter(
+    "caption_model_tokens",
+    "Tokens sent to (prompt) and generated by (completion) the model",
+    ["model", "direction"]
+)
+
+MEDIA_JOB_SECONDS = Histogram(
+    "caption_media_job_duration_seconds",
+    "ffprobe/ffmpeg job latency in the media worker pool (including queueing)",
+    ["tool", "job", "outcome"],
+    buckets=MEDIA_BUCKETS
+)
+
+CAPTION_IO_SECONDS = Histogram(
+    "caption_file_io_seconds",
+    "Caption JSON file read/write time",
+    ["op"],
+    buckets=IO_BUCKETS
+)
+
+# Media worker functions by the tool they shell out to
+_MEDIA_TOOLS = {"probe_video_metadata": "ffprobe"}
+
+
+def observe_media_job(job: str, seconds: float, outcome: str) -> None:
+    """Record one media worker job (job is the worker function's name)"""
+    MEDIA_JOB_SECONDS.labels(_MEDIA_TOOLS.get(job, "ffmpeg"), job.lstrip("_"), outcome).observe(seconds)
+
+
+def observe_model_usage(
+    model_key: str,
+    usage: Optional[Dict[str, Any]],
+    tokens_per_second: Optional[float] = None,
+    time_to_first_token: Optional[float] = None
+) -> None:
+    """Record token counts and decode speed of a completed generation"""
+    usage = usage or {}
+    if usage.get("prompt_tokens"):
+        MODEL_TOKENS.labels(model_key, "prompt").inc(usage["prompt_tokens"])
+    if usage.get("completion_tokens"):
+        MODEL_TOKENS.labels(model_key, "completion").inc(usage["completion_tokens"])
+    if tokens_per_second:
+        MODEL_TOKENS_PER_SECOND.labels(model_key).observe(tokens_per_second)
+    if time_to_first_token is not None:
+        MODEL_TIME_TO_FIRST_TOKEN_SECONDS.labels(model_key).observe(time_to_first_token)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request
+    
+    Labels use the matched route template (e.g. /api/videos/{filename}/caption),
+    not the raw path, so cardinality stays bounded. Streaming responses are
+    timed until their last body chunk.
+    """
+    
+    def __init__(self, app, skip_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        API_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            API_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            API_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status["code"])
+            ).observe(time.perf_counter() - start_time)
+
+
+class StateCollector:
+    """
+    Scrape-time export of state the services already track
+    
+    Concurrency limits, queue depths, replica health and cache counters are
+    read from the services' own stats() when /metrics is scraped, so they add
+    no work to the request path.
+    """
+    
+    def __init__(self, caption_service: Any):
+        self.caption_service = caption_service
+    
+    def collect(self):
+        from ..services.concurrency_limiter import concurrency_limiters
+        from ..services.replica_pool import replica_pools
+        from .file_utils import media_workers
+        from .media_index import get_media_index
+        
+        limit = GaugeMetricFamily("caption_model_concurrency_limit", "Current adaptive concurrency limit", labels=["model"])
+        in_flight = GaugeMetricFamily("caption_model_requests_in_flight", "Model requests holding a concurrency slot", labels=["model"])
+        queued = GaugeMetricFamily("caption_model_requests_queued", "Model requests waiting for a concurrency slot", labels=["model"])
+        rejected = CounterMetricFamily("caption_model_requests_rejected", "Model requests rejected with 503 (queue full or wait timeout)", labels=["model"])
+        for model_key, stats in concurrency_limiters.stats().items():
+            limit.add_metric([model_key], stats["limit"])
+            in_flight.add_metric([model_key], stats["in_flight"])
+            queued.add_metric([model_key], stats["queued"])
+            rejected.add_metric([model_key], stats["rejected"] + stats["queue_timeouts"])
+        yield from (limit, in_flight, queued, rejected)
+        
+        replica_in_flight = GaugeMetricFamily("caption_replica_requests_in_flight", "In-flight requests per model replica", labels=["model", "replica"])
+        replica_healthy = GaugeMetricFamily("caption_replica_healthy", "1 if the replica passes health probes", labels=["model", "replica"])
+        circuit_open = GaugeMetricFamily("caption_replica_circuit_open", "1 if the replica's circuit breaker is open or half-open", labels=["model", "replica"])
+        for model_key, replicas in replica_pools.stats().items():
+            for replica in replicas:
+                labels = [model_key, replica["url"]]
+                replica_in_flight.add_metric(labels, replica["in_flight"])
+                replica_healthy.add_metric(labels, 1 if replica["healthy"] else 0)
+                circuit_open.add_metric(labels, 0 if replica["circuit"]["state"] == "closed" else 1)
+        yield from (replica_in_flight, replica_healthy, circuit_open)
+        
+        media_active = GaugeMetricFamily("caption_media_jobs_active", "ffprobe/ffmpeg jobs running in the worker pool")
+        media_active.add_metric([], media_workers.active_jobs)
+        media_queued = GaugeMetricFamily("caption_media_jobs_queued", "ffprobe/ffmpeg jobs waiting for a worker slot")
+        media_queued.add_metric([], media_workers.queued_jobs)
+        yield from (media_active, media_queued)
+        
+        # Hit ratio = hit / (hit + miss) in PromQL
+        lookups = CounterMetricFamily("caption_cache_lookups", "Cache lookups by result", labels=["cache", "result"])
+        result_cache = self.caption_service.result_cache.stats()
+        lookups.add_metric(["result_cache", "hit"], result_cache["hits"])
+        lookups.add_metric(["result_cache", "miss"], result_cache["misses"])
+        media_index = get_media_index().stats()
+        lookups.add_metric(["media_index", "hit"], media_index["hits"])
+        lookups.add_metric(["media_index", "miss"], media_index["misses"])
+        caption_docs = self.caption_service.caption_index.stats()
+        lookups.add_metric(["caption_docs", "hit"], caption_docs["doc_hits"])
+        lookups.add_metric(["caption_docs", "miss"], caption_docs["doc_misses"])
+        single_flight = self.caption_service.inflight.stats()
+        lookups.add_metric(["single_flight", "hit"], single_flight["coalesced_calls"])
+        lookups.add_metric(["single_flight", "miss"], single_flight["upstream_calls"])
+        yield lookups
+
+
+def register_state_collector(caption_service: Any) -> None:
+    """Register the scrape-time collector once (safe to call again, e.g. on reload)"""
+    global _state_collector
+    if _state_collector is None:
+        _state_collector = StateCollector(caption_service)
+        REGISTRY.register(_state_collector)
+
+
+_state_collector: Optional[StateCollector] = None
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition of every registered metric, and its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Requests slower than this are written to the slow log with their stage breakdown (0 disables)
+SLOW_REQUEST_THRESHOLD_SEC = float(os.getenv("SLOW_REQUEST_THRESHOLD_SEC", "30"))
+SLOW_REQUEST_LOG_PATH = os.getenv(
+    "SLOW_REQUEST_LOG_PATH",
+    os.path.join(os.getenv("CAPTIONS_DIR", "/app/captions"), ".slow_requests.jsonl")
+)
+
+
+class RequestTimer:
+    """Stage spans recorded while handling one HTTP request"""
+    
+    def __init__(self, method: str, path: str, query: str = ""):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.utcnow().isoformat() + "Z"
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.finished = False
+    
+    def add(self, name: str, start: float, duration: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+        """Record a span (start is a perf_counter() value)"""
+        if self.finished:
+            return
+        span = {
+            "name": name,
+            "start_ms": round((start - self.start) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1)
+        }
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+    
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+    
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: one entry per stage name (durations of
+        repeated stages are summed), plus the total so far
+        """
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span["name"], [0.0, 0])
+            entry[0] += span["duration_ms"]
+            entry[1] += 1
+        parts = []
+        for name, (duration_ms, count) in totals.items():
+            desc = f';desc="{count}x"' if count > 1 else ""
+            parts.append(f"{name}{desc};dur={duration_ms:.1f}")
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+    
+    def to_record(self, route: Optional[str], status: int) -> Dict[str, Any]:
+        return {
+            "timestamp": self.started_at,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "route": route,
+            "status": status,
+            "total_ms": round(self.elapsed() * 1000, 1),
+            "spans": self.spans
+        }
+
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """
+    Time a stage of the current request (no-op outside a request, e.g. in background jobs)
+    
+    Tasks started while handling the request inherit its timer, so stages
+    run in child tasks are recorded too. A failing stage is recorded with
+    the exception type as "error".
+    """
+    timer = _current_timer.get()
+    if timer is None or timer.finished:
+        yield
+        return
+    
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        timer.add(name, start, time.perf_counter() - start, attrs)
+
+
+def record_span(name: str, seconds: float, **attrs: Any) -> None:
+    """Record a stage measured elsewhere that ended just now (e.g. a queue wait)"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, time.perf_counter() - seconds, seconds, attrs)
+
+
+_slow_log_lock = threading.Lock()
+
+
+def write_slow_log(record: Dict[str, Any], path: str = SLOW_REQUEST_LOG_PATH) -> None:
+    """Append one request record to the JSONL slow log"""
+    try:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _slow_log_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+    except Exception as e:
+        print(f"Error writing slow request log {path}: {str(e)}")
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting per-stage timings of every HTTP request
+    
+    Adds a Server-Timing header with the stages recorded before the response
+    started (for streaming responses, the stages before the first byte), and
+    writes requests slower than SLOW_REQUEST_THRESHOLD_SEC to the slow log
+    with their full breakdown, including stages that ran while streaming.
+    """
+    
+    def __init__(self, app, threshold: float = SLOW_REQUEST_THRESHOLD_SEC, skip_paths=("/metrics", "/health")):
+        self.app = app
+        self.threshold = threshold
+        self.skip_paths = set(skip_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        timer = RequestTimer(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        token = _current_timer.set(timer)
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            timer.finished = True
+            if self.threshold > 0 and timer.elapsed() >= self.threshold:
+                route = getattr(scope.get("route"), "path", None)
+                write_slow_log(timer.to_record(route, status["code"]))
@@ -0,0 +1,10 @@
+# Benchmark package: measure backend throughput without the GPU cluster
+#
+# Run from backend/:
+#   python -m benchmarks.stub_server --port 9000                # fake model servers
+#   python -m benchmarks.make_library --videos-dir /tmp/bench/videos --captions-dir /tmp/bench/captions
+#   QWEN2VL_API_URL=http://localhost:9000 OMNIVINCI_API_URL=http://localhost:9000 \
+#   QWEN3OMNI_API_URL=http://localhost:9000 QWEN3OMNI_CAPTIONER_API_URL=http://localhost:9000 \
+#   VIDEOS_DIR=/tmp/bench/videos CAPTIONS_DIR=/tmp/bench/captions \
+#   uvicorn app.main:app --port 8011
+#   python -m benchmarks.load_driver --scenario list,caption,all-captions,stream --concurrency 16
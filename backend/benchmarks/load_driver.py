@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Load driver for the backend API
+
+Runs each scenario in turn for a fixed duration with a fixed number of
+concurrent clients (closed loop) and reports throughput, latency
+percentiles and the backend's CPU and RSS over the run.
+
+Scenarios:
+    list          GET  /api/videos
+    caption       POST /api/videos/{filename}/caption
+    all-captions  GET  /api/videos/{filename}/all-captions
+    stream        GET  /api/videos/{filename}/caption/stream (also reports time to first token)
+
+CPU and RSS come from the backend's /metrics (process_cpu_seconds_total and
+process_resident_memory_bytes), or from /proc/<pid> with --pid when the
+backend runs on the same machine. Media worker processes are not included.
+
+Usage:
+    python -m benchmarks.load_driver --base-url http://localhost:8011 \\
+        --scenario list,all-captions,caption,stream --concurrency 16 --duration 30 \\
+        --model qwen2vl --regenerate --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+SCENARIOS = ("list", "caption", "all-captions", "stream")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no samples)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    concurrency: int
+    latencies: List[float] = field(default_factory=list)  # Successful requests, seconds
+    first_token: List[float] = field(default_factory=list)  # Stream scenario only
+    errors: Dict[str, int] = field(default_factory=dict)  # By status code or exception type
+    elapsed: float = 0.0
+    cpu_percent: Optional[float] = None
+    rss_mb_start: Optional[float] = None
+    rss_mb_peak: Optional[float] = None
+
+    def record_error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        requests = len(self.latencies) + sum(self.errors.values())
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "scenario": self.name,
+            "concurrency": self.concurrency,
+            "requests": requests,
+            "errors": self.errors,
+            "duration_seconds": round(self.elapsed, 2),
+            "throughput_rps": round(len(self.latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(self.latencies, 50)),
+                "p95": ms(percentile(self.latencies, 95)),
+                "p99": ms(percentile(self.latencies, 99)),
+                "max": ms(max(self.latencies) if self.latencies else None)
+            },
+            "first_token_ms": {
+                "p50": ms(percentile(self.first_token, 50)),
+                "p95": ms(percentile(self.first_token, 95)),
+                "p99": ms(percentile(self.first_token, 99))
+            } if self.first_token else None,
+            "cpu_percent": self.cpu_percent,
+            "rss_mb_start": self.rss_mb_start,
+            "rss_mb_peak": self.rss_mb_peak
+        }
+
+
+class ResourceSampler:
+    """CPU seconds and RSS of the backend process, from /metrics or /proc/<pid>"""
+
+    def __init__(self, client: httpx.AsyncClient, base_url: str, pid: Optional[int] = None):
+        self.client = client
+        self.base_url = base_url
+        self.pid = pid
+
+    async def sample(self) -> Optional[Dict[str, float]]:
+        """{"cpu_seconds": ..., "rss_mb": ...} or None if unavailable"""
+        if self.pid is not None:
+            return self._sample_proc()
+        try:
+            response = await self.client.get(f"{self.base_url}/metrics", timeout=5)
+            response.raise_for_status()
+        except Exception:
+            return None
+        values = {}
+        for line in response.text.splitlines():
+            if line.startswith("process_cpu_seconds_total "):
+                values["cpu_seconds"] = float(line.split()[1])
+            elif line.startswith("process_resident_memory_bytes "):
+                values["rss_mb"] = float(line.split()[1]) / (1024 * 1024)
+        return values if len(values) == 2 else None
+
+    def _sample_proc(self) -> Optional[Dict[str, float]]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat (after pid and comm)
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            with open(f"/proc/{self.pid}/status") as f:
+                rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration, ValueError):
+            return None
+        return {"cpu_seconds": cpu_seconds, "rss_mb": rss_kb / 1024}
+
+
+class LoadDriver:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.base_url = args.base_url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+        )
+        self.sampler = ResourceSampler(self.client, self.base_url, args.pid)
+        self.filenames: List[str] = []
+
+    async def load_filenames(self) -> None:
+        response = await self.client.get(f"{self.base_url}/api/videos")
+        response.raise_for_status()
+        self.filenames = [video["filename"] for video in response.json()]
+        if self.args.videos:
+            self.filenames = self.filenames[:self.args.videos]
+        if not self.filenames:
+            raise SystemExit("The backend lists no videos; generate a library with benchmarks.make_library first")
+
+    def caption_params(self) -> Dict[str, Any]:
+        return {"model": self.args.model, "regenerate": str(self.args.regenerate).lower()}
+
+    async def request_once(self, scenario: str, result: ScenarioResult) -> None:
+        filename = random.choice(self.filenames)
+        start_time = time.perf_counter()
+        try:
+            if scenario == "list":
+                response = await self.client.get(f"{self.base_url}/api/videos")
+            elif scenario == "all-captions":
+                response = await self.client.get(f"{self.base_url}/api/videos/{filename}/all-captions")
+            elif scenario == "caption":
+                response = await self.client.post(
+                    f"{self.base_url}/api/videos/{filename}/caption",
+                    params=self.caption_params(),
+                    json={"prompt": self.args.prompt}
+                )
+            else:
+                await self.stream_once(filename, start_time, result)
+                return
+        except Exception as e:
+            result.record_error(type(e).__name__)
+            return
+
+        if response.status_code >= 400:
+            result.record_error(str(response.status_code))
+        else:
+            result.latencies.append(time.perf_counter() - start_time)
+
+    async def stream_once(self, filename: str, start_time: float, result: ScenarioResult) -> None:
+        params = {**self.caption_params(), "prompt": self.args.prompt}
+        first_token = None
+        event = None
+        async with self.client.stream(
+            "GET", f"{self.base_url}/api/videos/{filename}/caption/stream", params=params
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                result.record_error(str(response.status_code))
+                return
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                    if event == "token" and first_token is None:
+                        first_token = time.perf_counter() - start_time
+                elif line.startswith("data:") and event == "error":
+                    status = json.loads(line[len("data:"):]).get("status")
+                    result.record_error(f"stream_{status or 'error'}")
+                    return
+        if event != "done":
+            result.record_error("stream_incomplete")
+            return
+        result.latencies.append(time.perf_counter() - start_time)
+        if first_token is not None:
+            result.first_token.append(first_token)
+
+    async def run_scenario(self, scenario: str) -> ScenarioResult:
+        result = ScenarioResult(scenario, self.args.concurrency)
+        discard = ScenarioResult(scenario, self.args.concurrency)
+
+        # Warm-up requests are not counted (connection setup, caches, lazy imports)
+        warmup_until = time.perf_counter() + self.args.warmup
+        while time.perf_counter() < warmup_until:
+            await asyncio.gather(*[self.request_once(scenario, discard) for _ in range(self.args.concurrency)])
+
+        before = await self.sampler.sample()
+        peak_rss = [before["rss_mb"]] if before else []
+        deadline = time.perf_counter() + self.args.duration
+        start_time = time.perf_counter()
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.request_once(scenario, result)
+
+        async def sample_rss():
+            while True:
+                await asyncio.sleep(1)
+                sample = await self.sampler.sample()
+                if sample:
+                    peak_rss.append(sample["rss_mb"])
+
+        sampler_task = asyncio.create_task(sample_rss())
+        try:
+            await asyncio.gather(*[worker() for _ in range(self.args.concurrency)])
+        finally:
+            sampler_task.cancel()
+        result.elapsed = time.perf_counter() - start_time
+
+        after = await self.sampler.sample()
+        if before and after:
+            result.cpu_percent = round(100 * (after["cpu_seconds"] - before["cpu_seconds"]) / result.elapsed, 1)
+            result.rss_mb_start = round(before["rss_mb"], 1)
+            result.rss_mb_peak = round(max(peak_rss + [after["rss_mb"]]), 1)
+        return result
+
+    async def run(self) -> List[Dict[str, Any]]:
+        await self.load_filenames()
+        summaries = []
+        try:
+            for scenario in self.args.scenario.split(","):
+                scenario = scenario.strip()
+                if scenario not in SCENARIOS:
+                    raise SystemExit(f"Unknown scenario {scenario!r} (choose from {', '.join(SCENARIOS)})")
+                print(f"Running {scenario}: {self.args.concurrency} clients for {self.args.duration:g}s...")
+                summaries.append((await self.run_scenario(scenario)).summary())
+        finally:
+            await self.client.aclose()
+        return summaries
+
+
+def print_table(summaries: List[Dict[str, Any]]) -> None:
+    def fmt(value: Any) -> str:
+        return "-" if value is None else f"{value}"
+
+    header = f"{'scenario':<14}{'reqs':>7}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttft p50':>10}{'cpu %':>8}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        latency = s["latency_ms"]
+        ttft = (s["first_token_ms"] or {}).get("p50")
+        print(
+            f"{s['scenario']:<14}{s['requests']:>7}{sum(s['errors'].values()):>8}{s['throughput_rps']:>9}"
+            f"{fmt(latency['p50']):>10}{fmt(latency['p95']):>10}{fmt(latency['p99']):>10}"
+            f"{fmt(ttft):>10}{fmt(s['cpu_percent']):>8}{fmt(s['rss_mb_peak']):>9}"
+        )
+        if s["errors"]:
+            print(f"{'':<14}errors: {s['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend API")
+    parser.add_argument("--base-url", default="http://localhost:8011")
+    parser.add_argument("--scenario", default="list,all-captions", help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--model", default="qwen2vl")
+    parser.add_argument("--prompt", default="Describe this video in detail.")
+    parser.add_argument("--regenerate", action="store_true", help="Bypass saved captions (every request reaches the model)")
+    parser.add_argument("--videos", type=int, default=0, help="Only use the first N listed videos (0: all)")
+    parser.add_argument("--pid", type=int, default=None, help="Read CPU/RSS from /proc/<pid> instead of /metrics")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    summaries = asyncio.run(LoadDriver(args).run())
+    print()
+    print_table(summaries)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "results": summaries}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
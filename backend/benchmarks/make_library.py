@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Synthetic video/caption library for backend benchmarks
+
+Encodes one short test-pattern clip (video + sine-wave audio) per distinct
+duration with ffmpeg, then remuxes it into --count files that differ only
+in a metadata tag: every file has its own content hash (so the result
+cache and media index see distinct videos) but creating thousands of them
+takes seconds. Caption JSON files in the backend's format are written for
+a fraction of the videos and models, so listing and all-captions requests
+have realistic work to do.
+
+Usage:
+    python -m benchmarks.make_library --videos-dir /tmp/bench/videos \\
+        --captions-dir /tmp/bench/captions --count 1000 --durations 10,30,120
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+
+MODELS = ["qwen2vl", "omnivinci", "qwen3omni", "qwen3omni_captioner"]
+WORDS = (
+    "the video shows a person walking through a park with trees and a dog running nearby while "
+    "birds sing and a car passes by on the road in the distance under a cloudy sky"
+).split()
+
+
+def encode_base_clip(path: Path, duration: int, size: str, fps: int) -> None:
+    """Encode a test-pattern clip with a tone (fast preset; the content is irrelevant)"""
+    subprocess.run(
+        [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', '64k',
+            '-shortest', str(path)
+        ],
+        check=True
+    )
+
+
+def remux_copy(base: Path, path: Path, tag: str) -> None:
+    """Copy a clip with a unique metadata tag (stream copy, no re-encode)"""
+    subprocess.run(
+        [
+            'ffmpeg', '-y', '-loglevel', 'error', '-i', str(base),
+            '-map', '0', '-c', 'copy', '-metadata', f'comment={tag}', str(path)
+        ],
+        check=True
+    )
+
+
+def fake_caption(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def write_caption(captions_dir: Path, video_filename: str, model_key: str, words: int, generated_at: datetime) -> None:
+    """Caption file in the format CaptionService.save_caption writes"""
+    caption_data = {
+        "filename": video_filename,
+        "caption": fake_caption(words),
+        "prompt": "Describe this video in detail.",
+        "generated_at": generated_at.isoformat() + "Z",
+        "processing_time_seconds": round(random.uniform(5, 120), 3),
+        "model_name": model_key,
+        "model_version": f"benchmark/{model_key}",
+        "from_cache": False
+    }
+    with open(captions_dir / f"{video_filename}_{model_key}.json", 'w', encoding='utf-8') as f:
+        json.dump(caption_data, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic video/caption library for benchmarks")
+    parser.add_argument("--videos-dir", required=True)
+    parser.add_argument("--captions-dir", required=True)
+    parser.add_argument("--count", type=int, default=200, help="Number of videos")
+    parser.add_argument("--durations", default="10,30", help="Comma-separated clip durations in seconds")
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--caption-ratio", type=float, default=0.5, help="Fraction of (video, model) pairs with a caption")
+    parser.add_argument("--models", default=",".join(MODELS))
+    parser.add_argument("--caption-words", type=int, default=150, help="Mean caption length in words")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        raise SystemExit("ffmpeg is required to generate the synthetic videos")
+
+    random.seed(args.seed)
+    videos_dir = Path(args.videos_dir)
+    captions_dir = Path(args.captions_dir)
+    videos_dir.mkdir(parents=True, exist_ok=True)
+    captions_dir.mkdir(parents=True, exist_ok=True)
+    durations: List[int] = [int(d) for d in args.durations.split(",") if d.strip()]
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+
+    start_time = time.time()
+    base_dir = videos_dir / ".bench_base"
+    base_dir.mkdir(exist_ok=True)
+    bases = {}
+    for duration in durations:
+        bases[duration] = base_dir / f"base_{duration}s.mp4"
+        if not bases[duration].exists():
+            print(f"Encoding {duration}s base clip...")
+            encode_base_clip(bases[duration], duration, args.size, args.fps)
+
+    now = datetime.utcnow()
+    captions = 0
+    for i in range(args.count):
+        duration = durations[i % len(durations)]
+        video_filename = f"bench_{i:05d}_{duration}s.mp4"
+        video_path = videos_dir / video_filename
+        if not video_path.exists():
+            remux_copy(bases[duration], video_path, f"bench-{i}")
+        # Spread modification times so sorting by date is meaningful
+        mtime = time.time() - i * 60
+        os.utime(video_path, (mtime, mtime))
+
+        for model_key in models:
+            if random.random() < args.caption_ratio:
+                words = max(1, int(random.gauss(args.caption_words, args.caption_words / 4)))
+                write_caption(captions_dir, video_filename, model_key, words, now - timedelta(minutes=i))
+                captions += 1
+
+        if (i + 1) % 100 == 0:
+            print(f"  {i + 1}/{args.count} videos")
+
+    print(f"Created {args.count} videos and {captions} captions in {time.time() - start_time:.1f}s")
+    print(f"  Videos:   {videos_dir}")
+    print(f"  Captions: {captions_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Stub model server for benchmarking the backend without GPUs
+
+Implements the endpoints the backend calls on its model servers:
+/v1/models, /v1/chat/completions (plain and stream=true with a usage chunk)
+and OmniVinci's /infer/video and /infer/video/multi. Responses follow a configurable latency model:
+a prefill delay drawn from a distribution, then tokens at a fixed decode
+rate. Errors (500), overload (429) and hangs (never answers, so the backend
+hits its request timeout) can be injected at given rates, and a concurrency
+cap with a queue mimics a GPU serving a limited batch.
+
+One stub can stand in for every model (point all <MODEL>_API_URL variables
+at it); run several on different ports to benchmark replica balancing.
+
+Usage:
+    python -m benchmarks.stub_server --port 9000 --prefill-dist lognormal \\
+        --prefill-mean 2.0 --tokens-per-second 40 --output-tokens 200 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+WORDS = (
+    "a person walks across the frame while the camera pans slowly to the left revealing "
+    "a busy street with cars people and shops in the background music plays softly"
+).split()
+
+
+@dataclass
+class StubConfig:
+    """Latency model and fault injection of the stub"""
+    prefill_dist: str = "fixed"  # fixed, uniform or lognormal
+    prefill_mean: float = 1.0  # Seconds until the first token
+    prefill_sigma: float = 0.5  # Spread: +-range for uniform, log-space sigma for lognormal
+    tokens_per_second: float = 30.0  # Decode rate per request
+    output_tokens: int = 120  # Mean completion length (+-25%)
+    prompt_tokens: int = 1500  # Reported prompt tokens (video + text)
+    error_rate: float = 0.0  # Fraction answered with 500
+    overload_rate: float = 0.0  # Fraction answered with 429
+    hang_rate: float = 0.0  # Fraction that never answer
+    max_concurrency: int = 0  # Requests processed at once (0: unlimited); the rest wait
+    model_name: str = "stub-model"
+
+
+class StubModel:
+    """Generates fake completions according to a StubConfig"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.slots = asyncio.Semaphore(config.max_concurrency) if config.max_concurrency > 0 else None
+        self.requests = 0
+        self.in_flight = 0
+        self.errors_injected = 0
+
+    def prefill_delay(self) -> float:
+        config = self.config
+        if config.prefill_dist == "uniform":
+            delay = random.uniform(config.prefill_mean - config.prefill_sigma, config.prefill_mean + config.prefill_sigma)
+        elif config.prefill_dist == "lognormal":
+            # mu chosen so the distribution's mean is prefill_mean
+            mu = math.log(max(config.prefill_mean, 1e-6)) - config.prefill_sigma ** 2 / 2
+            delay = random.lognormvariate(mu, config.prefill_sigma)
+        else:
+            delay = config.prefill_mean
+        return max(0.0, delay)
+
+    def completion_length(self) -> int:
+        mean = self.config.output_tokens
+        return max(1, int(random.uniform(0.75 * mean, 1.25 * mean)))
+
+    def usage(self, completion_tokens: int) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.config.prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": self.config.prompt_tokens + completion_tokens
+        }
+
+    async def inject_faults(self) -> None:
+        """Raise or hang for the configured fraction of requests"""
+        roll = random.random()
+        config = self.config
+        if roll < config.hang_rate:
+            self.errors_injected += 1
+            await asyncio.Event().wait()
+        roll -= config.hang_rate
+        if roll < config.overload_rate:
+            self.errors_injected += 1
+            raise HTTPException(status_code=429, detail="Injected overload")
+        roll -= config.overload_rate
+        if roll < config.error_rate:
+            self.errors_injected += 1
+            raise HTTPException(status_code=500, detail="Injected server error")
+
+    async def run(self, completion_tokens: int) -> None:
+        """Wait for a slot, then the prefill and the whole decode"""
+        async with self.slot():
+            await self.inject_faults()
+            await asyncio.sleep(self.prefill_delay() + completion_tokens / self.config.tokens_per_second)
+
+    async def tokens(self, completion_tokens: int) -> AsyncIterator[str]:
+        """Yield words at the decode rate after the prefill delay"""
+        async with self.slot():
+            await self.inject_faults()
+            await asyncio.sleep(self.prefill_delay())
+            interval = 1.0 / self.config.tokens_per_second
+            for i in range(completion_tokens):
+                yield (" " if i else "") + random.choice(WORDS)
+                await asyncio.sleep(interval)
+
+    def text(self, completion_tokens: int) -> str:
+        return " ".join(random.choice(WORDS) for _ in range(completion_tokens))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """One of max_concurrency processing slots (requests beyond it queue here)"""
+        if self.slots is not None:
+            await self.slots.acquire()
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.slots is not None:
+                self.slots.release()
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Stub Model Server")
+    model = StubModel(config)
+    app.state.model = model
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "in_flight": model.in_flight, "requests": model.requests}
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": config.model_name, "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": model.requests,
+            "in_flight": model.in_flight,
+            "errors_injected": model.errors_injected
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        completion_tokens = min(model.completion_length(), payload.get("max_tokens") or 1 << 30)
+        request_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        created = int(time.time())
+        model_name = payload.get("model") or config.model_name
+
+        if not payload.get("stream"):
+            await model.run(completion_tokens)
+            return {
+                "id": request_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model_name,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": model.text(completion_tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": model.usage(completion_tokens)
+            }
+
+        # Faults must surface as an HTTP status, so take the first token before answering
+        tokens = model.tokens(completion_tokens)
+        try:
+            first = await tokens.__anext__()
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+        def chunk(delta: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> str:
+            body = {
+                "id": request_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model_name,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}] if delta else []
+            }
+            if usage is not None:
+                body["usage"] = usage
+            return f"data: {json.dumps(body)}\n\n"
+
+        async def event_stream():
+            yield chunk({"role": "assistant", "content": first})
+            async for text in tokens:
+                yield chunk({"content": text})
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                yield chunk({}, model.usage(completion_tokens))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.post("/infer/video")
+    async def infer_video(url: str = Form(...), prompt: str = Form("")):
+        completion_tokens = model.completion_length()
+        await model.run(completion_tokens)
+        return {
+            "response": model.text(completion_tokens),
+            "usage": model.usage(completion_tokens)
+        }
+
+    @app.post("/infer/video/multi")
+    async def infer_video_multi(request: Request):
+        payload = await request.json()
+        prompts = payload.get("prompts") or []
+        if not prompts:
+            raise HTTPException(status_code=400, detail="No prompts provided")
+        # One batched pass: every answer is ready when the longest one is
+        lengths = [min(model.completion_length(), payload.get("max_tokens") or 1 << 30) for _ in prompts]
+        await model.run(max(lengths))
+        usages = [model.usage(length) for length in lengths]
+        return {
+            "model": config.model_name,
+            "responses": [
+                {"prompt": prompt, "response": model.text(length), "usage": usage}
+                for prompt, length, usage in zip(prompts, lengths, usages)
+            ],
+            "usage": {key: sum(usage[key] for usage in usages) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible model server for backend benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--prefill-dist", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--prefill-mean", type=float, default=1.0, help="Mean seconds to the first token")
+    parser.add_argument("--prefill-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--output-tokens", type=int, default=120)
+    parser.add_argument("--prompt-tokens", type=int, default=1500)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that never answer")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Requests served at once (0: unlimited)")
+    parser.add_argument("--model-name", default="stub-model")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        prefill_dist=args.prefill_dist,
+        prefill_mean=args.prefill_mean,
+        prefill_sigma=args.prefill_sigma,
+        tokens_per_second=max(args.tokens_per_second, 0.001),
+        output_tokens=args.output_tokens,
+        prompt_tokens=args.prompt_tokens,
+        error_rate=args.error_rate,
+        overload_rate=args.overload_rate,
+        hang_rate=args.hang_rate,
+        max_concurrency=args.max_concurrency,
+        model_name=args.model_name
+    )
+    print(f"Stub model server on {args.host}:{args.port}: {config}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
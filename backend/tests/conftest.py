@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend as "app" and the OmniVinci service from the repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR.parent))
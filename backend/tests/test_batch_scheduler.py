@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+import pytest
+
+# The OmniVinci service lives at the repo root and needs the GPU stack (torch, transformers)
+svc = pytest.importorskip("omnivinci_service")
+
+
+class FakeGPU:
+    """Stands in for run_batch: records batches, optionally blocking until released"""
+    
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+    
+    def __call__(self, items):
+        self.batches.append([item.prompt for item in items])
+        self.gate.wait(5)
+        if any(item.prompt == "bad" for item in items):
+            raise RuntimeError("bad video")
+        return [{"caption": item.prompt} for item in items]
+
+
+@pytest.fixture
+def gpu(monkeypatch):
+    fake = FakeGPU()
+    monkeypatch.setattr(svc, "run_batch", fake)
+    monkeypatch.setattr(svc, "DISCONNECT_POLL_SEC", 0.01)
+    yield fake
+    fake.gate.set()
+
+
+def run(scenario, **options):
+    async def main():
+        scheduler = svc.BatchScheduler(**{"max_batch_size": 4, "window_ms": 50, "max_queue": 16, **options})
+        scheduler.start()
+        try:
+            return await scenario(scheduler)
+        finally:
+            scheduler.task.cancel()
+            scheduler.executor.shutdown(wait=False)
+    
+    return asyncio.run(main())
+
+
+async def started(gpu: FakeGPU, count: int) -> None:
+    """Wait until count batches have reached the GPU"""
+    while len(gpu.batches) < count:
+        await asyncio.sleep(0.005)
+
+
+def captions(results):
+    return [result["caption"] for result in results]
+
+
+def test_concurrent_requests_share_a_batch(gpu):
+    async def scenario(scheduler):
+        return await asyncio.gather(*[scheduler.submit("v.mp4", p, 16, 0.0) for p in "abc"])
+    
+    assert captions(run(scenario)) == ["a", "b", "c"]
+    assert gpu.batches == [["a", "b", "c"]]
+
+
+def test_group_that_does_not_fit_starts_the_next_batch(gpu):
+    async def scenario(scheduler):
+        first = asyncio.create_task(scheduler.submit("v.mp4", "a", 16, 0.0))
+        await asyncio.sleep(0)
+        group = asyncio.create_task(scheduler.submit_many("v.mp4", ["b", "c", "d"], 16, 0.0))
+        await asyncio.sleep(0)
+        last = asyncio.create_task(scheduler.submit("v.mp4", "e", 16, 0.0))
+        return await first, await group, await last
+    
+    first, group, last = run(scenario, max_batch_size=3)
+    assert first["caption"] == "a"
+    assert captions(group) == ["b", "c", "d"]
+    assert last["caption"] == "e"
+    # The held group goes before anything that arrived after it
+    assert gpu.batches == [["a"], ["b", "c", "d"], ["e"]]
+
+
+def test_oversized_group_is_not_split(gpu):
+    async def scenario(scheduler):
+        return await scheduler.submit_many("v.mp4", ["a", "b", "c"], 16, 0.0)
+    
+    assert captions(run(scenario, max_batch_size=2)) == ["a", "b", "c"]
+    assert gpu.batches == [["a", "b", "c"]]
+
+
+def test_cancelled_request_is_dropped_before_the_gpu(gpu):
+    gpu.gate.clear()
+    
+    async def scenario(scheduler):
+        first = asyncio.create_task(scheduler.submit("v.mp4", "a", 16, 0.0))
+        await started(gpu, 1)
+        cancelled = asyncio.create_task(scheduler.submit_many("v.mp4", ["b", "c"], 16, 0.0))
+        kept = asyncio.create_task(scheduler.submit("v.mp4", "d", 16, 0.0))
+        await asyncio.sleep(0.01)
+        assert scheduler.waiting == 3
+        
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert scheduler.waiting == 1
+        gpu.gate.set()
+        return await first, await kept, scheduler.stats()
+    
+    first, kept, stats = run(scenario)
+    assert (first["caption"], kept["caption"]) == ("a", "d")
+    assert gpu.batches == [["a"], ["d"]]
+    assert stats["cancelled"] == 2
+    assert stats["queued"] == 0
+
+
+def test_disconnected_client_is_dropped(gpu):
+    gpu.gate.clear()
+    
+    async def disconnected():
+        return True
+    
+    async def scenario(scheduler):
+        first = asyncio.create_task(scheduler.submit("v.mp4", "a", 16, 0.0))
+        await started(gpu, 1)
+        with pytest.raises(svc.ClientDisconnected):
+            await scheduler.submit("v.mp4", "b", 16, 0.0, is_disconnected=disconnected)
+        gpu.gate.set()
+        await first
+        return scheduler.stats()
+    
+    stats = run(scenario)
+    assert gpu.batches == [["a"]]
+    assert (stats["cancelled"], stats["queued"]) == (1, 0)
+
+
+def test_full_queue_rejects(gpu):
+    gpu.gate.clear()
+    
+    async def scenario(scheduler):
+        running = asyncio.create_task(scheduler.submit("v.mp4", "a", 16, 0.0))
+        await started(gpu, 1)
+        queued = asyncio.create_task(scheduler.submit_many("v.mp4", ["b", "c"], 16, 0.0))
+        await asyncio.sleep(0)
+        with pytest.raises(svc.QueueFullError) as excinfo:
+            await scheduler.submit("v.mp4", "d", 16, 0.0)
+        assert excinfo.value.retry_after >= 1
+        gpu.gate.set()
+        await asyncio.gather(running, queued)
+        return scheduler.stats()
+    
+    stats = run(scenario, max_queue=2)
+    assert stats["rejected"] == 1
+
+
+def test_failed_batch_is_retried_per_request(gpu):
+    async def scenario(scheduler):
+        return await asyncio.gather(
+            *[scheduler.submit("v.mp4", p, 16, 0.0) for p in ["a", "bad", "c"]],
+            return_exceptions=True
+        )
+    
+    good, bad, other = run(scenario)
+    assert (good["caption"], other["caption"]) == ("a", "c")
+    assert isinstance(bad, RuntimeError)
+    assert gpu.batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from app.services.concurrency_limiter import AdaptiveLimiter
+from app.services.resilience import ModelOverloadedError, ModelResponseError, ModelTimeoutError
+
+
+def make_limiter(**kwargs) -> AdaptiveLimiter:
+    options = {"initial_limit": 1, "max_queue": 4, "queue_timeout": 5}
+    options.update(kwargs)
+    return AdaptiveLimiter("test", **options)
+
+
+async def hold(limiter: AdaptiveLimiter, release: asyncio.Event, order: list, name: str) -> None:
+    async with limiter.acquire():
+        order.append(name)
+        await release.wait()
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        limiter = make_limiter(max_queue=1)
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.create_task(hold(limiter, release, order, "holder"))
+        waiter = asyncio.create_task(hold(limiter, release, order, "waiter"))
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queued) == (1, 1)
+        
+        with pytest.raises(ModelOverloadedError) as excinfo:
+            async with limiter.acquire():
+                pass
+        assert excinfo.value.headers["Retry-After"] == str(excinfo.value.retry_after)
+        assert limiter.rejected == 1
+        
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert order == ["holder", "waiter"]
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+    
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_raises_overloaded():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(limiter, release, [], "holder"))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(ModelOverloadedError):
+            async with limiter.acquire():
+                pass
+        assert limiter.timed_out == 1
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+        
+        release.set()
+        await holder
+        assert limiter.in_flight == 0
+    
+    asyncio.run(scenario())
+
+
+def test_released_slot_is_handed_to_waiters_in_order():
+    async def scenario():
+        limiter = make_limiter()
+        release = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(hold(limiter, release, order, str(i))) for i in range(4)]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queued) == (1, 3)
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["0", "1", "2", "3"]
+        assert limiter.admitted == 4
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+    
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = make_limiter()
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.create_task(hold(limiter, release, order, "holder"))
+        cancelled = asyncio.create_task(hold(limiter, release, order, "cancelled"))
+        waiter = asyncio.create_task(hold(limiter, release, order, "waiter"))
+        await asyncio.sleep(0)
+        assert limiter.queued == 2
+        
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert limiter.queued == 1
+        
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert order == ["holder", "waiter"]
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+    
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_during_hand_off_keeps_the_count():
+    async def scenario():
+        limiter = make_limiter()
+        release = asyncio.Event()
+        order = []
+        
+        async def holder():
+            async with limiter.acquire():
+                order.append("holder")
+                await release.wait()
+            # The slot was just handed to the next waiter, which hasn't run yet
+            assert limiter.in_flight == 1
+            cancelled.cancel()
+        
+        holder_task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(hold(limiter, release, order, "cancelled"))
+        waiter = asyncio.create_task(hold(limiter, release, order, "waiter"))
+        await asyncio.sleep(0)
+        assert limiter.queued == 2
+        
+        release.set()
+        await asyncio.gather(holder_task, cancelled, waiter, return_exceptions=True)
+        # Depending on the Python version the cancellation or the hand-off wins;
+        # either way the slot is released exactly once
+        assert order[-1] == "waiter"
+        assert order[1:-1] == ([] if cancelled.cancelled() else ["cancelled"])
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+    
+    asyncio.run(scenario())
+
+
+def test_only_overload_signals_shrink_the_limit():
+    limiter = make_limiter(initial_limit=10)
+    limiter.record_error(ModelResponseError(400, "bad request"))
+    limiter.record_error(ValueError("not a backend error"))
+    assert limiter.limit == 10
+    
+    limiter.record_error(ModelResponseError(503, "unavailable"))
+    assert limiter.limit == pytest.approx(7)
+    assert limiter.decreases == 1
+    
+    # Requests sent at the same time failing together only back off once
+    limiter.record_error(ModelTimeoutError("timed out"))
+    limiter.record_error(ModelResponseError(429, "slow down"))
+    assert limiter.decreases == 1
+
+
+def test_slow_requests_do_not_shrink_the_limit():
+    limiter = make_limiter(initial_limit=4, max_limit=4)
+    for latency in [1.0] * 20 + [60.0] * 5:
+        limiter.record_success(latency)
+    assert limiter.limit == 4
+    assert limiter.decreases == 0
+
+
+def test_successes_grow_the_limit_up_to_max():
+    limiter = make_limiter(initial_limit=2, max_limit=3)
+    for _ in range(2):
+        limiter.record_success(0.1)
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.record_success(0.1)
+    assert limiter.limit == 3
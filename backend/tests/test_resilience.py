@@ -0,0 +1,229 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.replica_pool import ReplicaPool
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgePolicy,
+    RetryPolicy,
+    call_with_resilience,
+)
+
+
+def http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://replica/v1/chat/completions")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+def make_pool(*urls: str) -> ReplicaPool:
+    return ReplicaPool("test", [(url, 1.0) for url in urls])
+
+
+def expire(breaker: CircuitBreaker) -> None:
+    breaker.opened_at -= breaker.reset_timeout + 1
+
+
+# CircuitBreaker
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.on_request()
+        breaker.on_failure()
+    assert breaker.state == "closed"
+    assert breaker.allows_request()
+    
+    breaker.on_request()
+    breaker.on_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 1
+    assert not breaker.allows_request()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+    expire(breaker)
+    assert breaker.allows_request()
+    
+    breaker.on_request()
+    assert breaker.state == "half_open"
+    assert breaker.trial_in_flight
+    assert not breaker.allows_request()
+
+
+def test_breaker_half_open_trial_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+    expire(breaker)
+    breaker.on_request()
+    breaker.on_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allows_request()
+
+
+def test_breaker_half_open_trial_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.on_failure()
+    expire(breaker)
+    breaker.on_request()
+    breaker.on_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    assert not breaker.allows_request()
+
+
+def test_breaker_abandoned_trial_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+    expire(breaker)
+    breaker.on_request()
+    breaker.on_abandoned()
+    assert breaker.state == "half_open"
+    assert breaker.allows_request()
+
+
+# Retries
+
+def test_retry_moves_to_another_replica_after_connect_error():
+    pool = make_pool("http://a", "http://b")
+    calls = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused")
+        return "ok"
+    
+    result = asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=3, base_delay=0)))
+    assert result == "ok"
+    assert len(calls) == 2
+    assert calls[0] != calls[1]
+
+
+def test_retry_gives_up_after_max_attempts():
+    pool = make_pool("http://a")
+    calls = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        raise http_error(503)
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=3, base_delay=0)))
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    pool = make_pool("http://a", "http://b")
+    calls = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        raise http_error(400)
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=3, base_delay=0)))
+    assert len(calls) == 1
+    # A rejected request says nothing about the replica
+    assert all(replica.breaker.failures == 0 for replica in pool.replicas)
+
+
+def test_read_timeouts_are_not_retried():
+    assert not RetryPolicy.is_retryable(httpx.ReadTimeout("slow"))
+    assert RetryPolicy.is_retryable(httpx.ConnectTimeout("slow"))
+
+
+def test_open_circuits_fail_fast():
+    pool = make_pool("http://a")
+    replica = pool.replicas[0]
+    replica.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    replica.breaker.on_failure()
+    
+    async def send(replica):
+        raise AssertionError("request sent through an open circuit")
+    
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=3, base_delay=0)))
+
+
+# Hedging
+
+def test_hedge_wins_and_cancels_the_slow_primary():
+    pool = make_pool("http://a", "http://b")
+    pool.latencies.extend([0.01] * 5)
+    hedge = HedgePolicy(enabled=True, percentile=95, min_samples=5)
+    calls = []
+    cancelled = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(replica.url)
+                raise
+        return replica.url
+    
+    result = asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=1), hedge))
+    assert result == calls[1]
+    assert calls[0] != calls[1]
+    assert cancelled == [calls[0]]
+    assert (hedge.hedges_sent, hedge.hedges_won) == (1, 1)
+    # The losing lease was released without counting against its replica
+    assert all(replica.in_flight == 0 for replica in pool.replicas)
+    assert all(replica.breaker.failures == 0 for replica in pool.replicas)
+
+
+def test_fast_primary_sends_no_hedge():
+    pool = make_pool("http://a", "http://b")
+    pool.latencies.extend([1.0] * 5)
+    hedge = HedgePolicy(enabled=True, percentile=95, min_samples=5)
+    calls = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        return "ok"
+    
+    assert asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=1), hedge)) == "ok"
+    assert len(calls) == 1
+    assert hedge.hedges_sent == 0
+
+
+def test_hedge_falls_back_to_primary_when_the_hedge_fails():
+    pool = make_pool("http://a", "http://b")
+    pool.latencies.extend([0.01] * 5)
+    hedge = HedgePolicy(enabled=True, percentile=95, min_samples=5)
+    calls = []
+    
+    async def send(replica):
+        calls.append(replica.url)
+        if len(calls) == 1:
+            await asyncio.sleep(0.1)
+            return "primary"
+        raise httpx.ConnectError("refused")
+    
+    result = asyncio.run(call_with_resilience(pool, send, RetryPolicy(max_attempts=1), hedge))
+    assert result == "primary"
+    assert (hedge.hedges_sent, hedge.hedges_won) == (1, 0)
+
+
+def test_no_hedge_without_enough_samples():
+    hedge = HedgePolicy(enabled=True, percentile=95, min_samples=5)
+    assert hedge.delay([0.1] * 4) is None
+    assert hedge.delay([0.1, 0.2, 0.3, 0.4, 5.0]) == 5.0
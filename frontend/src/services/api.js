@@ -15,6 +15,20 @@ export const videoAPI = {
     return response.data;
   },
 
+  // Get videos changed since a library version (from the X-Library-Version header)
+  // Returns { version, full, changed, removed }; full=true means "changed" is the whole list
+  getVideoChanges: async (since) => {
+    const response = await api.get('/api/videos', { params: { since } });
+    return response.data;
+  },
+
+  // Get one page of videos (cursor pagination, filters and field projection)
+  // e.g. getVideoPage({ limit: 50, sort: 'mtime', order: 'desc', has_caption: false, fields: 'filename,size' })
+  getVideoPage: async (params = {}) => {
+    const response = await api.get('/api/videos/page', { params });
+    return response.data;
+  },
+
   // Get single video info
   getVideoInfo: async (filename) => {
     const response = await api.get(`/api/videos/${filename}`);
@@ -47,6 +61,59 @@ export const videoAPI = {
     return response.data;
   },
 
+  // Caption a long video in fixed-length segments merged by a final summary request
+  generateSegmentedCaption: async (filename, model = 'qwen2vl', prompt = null, segmentSeconds = 60, regenerate = false) => {
+    const params = { model, segment_seconds: segmentSeconds, regenerate };
+    const data = { prompt: prompt || "" };
+    
+    const response = await api.post(
+      `/api/videos/${filename}/caption/segmented`,
+      data,
+      { params }
+    );
+    return response.data;
+  },
+
+  // Generate caption with streamed tokens (Server-Sent Events over POST)
+  // onToken(text) is called for every token; resolves with the saved caption record
+  streamCaption: async (filename, model = 'qwen2vl', prompt = null, regenerate = false, onToken = () => {}) => {
+    const params = new URLSearchParams({ model, regenerate });
+    const response = await fetch(
+      `${API_BASE_URL}/api/videos/${filename}/caption/stream?${params}`,
+      {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ prompt: prompt || "" }),
+      }
+    );
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || `Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const eventName = (rawEvent.match(/^event: (.*)$/m) || [])[1];
+        const data = JSON.parse((rawEvent.match(/^data: (.*)$/m) || [])[1] || '{}');
+        if (eventName === 'token') onToken(data.text);
+        if (eventName === 'done') return data;
+        if (eventName === 'error') throw new Error(data.detail);
+      }
+    }
+    throw new Error('Caption stream ended unexpectedly');
+  },
+
   // Get all captions from all models
   getAllCaptions: async (filename) => {
     const response = await api.get(`/api/videos/${filename}/all-captions`);
@@ -71,12 +138,45 @@ export const videoAPI = {
     return response.data;
   },
 
+  // Build model-ready proxy renditions ahead of time (all models when model is null)
+  createProxies: async (filename, model = null) => {
+    const response = await api.post(`/api/videos/${filename}/proxy`, null, { params: model ? { model } : {} });
+    return response.data;
+  },
+
   // Get audio file URL
   getAudioUrl: (filename) => {
     return `${API_BASE_URL}/api/videos/${filename}/audio`;
   },
 };
 
+// Batch captioning jobs
+export const jobsAPI = {
+  // Submit a job: videos × models, or all uncaptioned videos
+  createJob: async ({ videos = null, models = ['qwen2vl'], allUncaptioned = false, prompt = null, regenerate = false }) => {
+    const response = await api.post('/api/jobs', {
+      videos,
+      models,
+      all_uncaptioned: allUncaptioned,
+      prompt,
+      regenerate,
+    });
+    return response.data;
+  },
+
+  // Get job progress with per-item state
+  getJob: async (jobId) => {
+    const response = await api.get(`/api/jobs/${jobId}`);
+    return response.data;
+  },
+
+  // Cancel a running job
+  cancelJob: async (jobId) => {
+    const response = await api.delete(`/api/jobs/${jobId}`);
+    return response.data;
+  },
+};
+
 // Health check
 export const healthCheck = async () => {
   try {
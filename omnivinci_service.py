@@ -4,16 +4,31 @@ OmniVinci FastAPI Service
 Runs OmniVinci model using Transformers (vLLM doesn't support it yet)
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, AsyncIterator
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+import asyncio
+import hashlib
+import json
+import math
 import torch
 import uvicorn
 import httpx
 import tempfile
 import os
-from transformers import AutoProcessor, AutoModel, AutoConfig
+import threading
+import time
+import uuid
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from transformers import AutoProcessor, AutoModel, AutoConfig, LogitsProcessor, LogitsProcessorList
 
 app = FastAPI(title="OmniVinci Service", version="1.0.0")
 
@@ -26,6 +41,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics (scraped from /metrics)
+REQUEST_SECONDS = Histogram(
+    "omnivinci_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+REQUESTS_IN_FLIGHT = Gauge("omnivinci_requests_in_flight", "HTTP requests currently being handled")
+DOWNLOAD_SECONDS = Histogram(
+    "omnivinci_video_download_seconds",
+    "Time to download an input video (cache misses only)",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+PREPROCESS_SECONDS = Histogram(
+    "omnivinci_preprocess_seconds",
+    "Time to decode a video's frames and audio (feature cache misses only)",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+FEATURE_LOOKUPS = Counter("omnivinci_feature_cache_lookups", "Media feature lookups by result (memory, disk, miss)", ["result"])
+MEDIA_LOOKUPS = Counter("omnivinci_media_lookups", "Input video lookups by result (hit, miss, local)", ["result"])
+GENERATION_SECONDS = Histogram(
+    "omnivinci_generation_seconds",
+    "Preprocessing + model.generate time per batch",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+BATCH_SIZE = Histogram(
+    "omnivinci_batch_size",
+    "Requests generated together in one batched generate call",
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16)
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "omnivinci_queue_wait_seconds",
+    "Time a request waited for its batch to start",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+REJECTED = Counter("omnivinci_requests_rejected", "Requests rejected with 429 because the queue was full")
+CANCELLED = Counter("omnivinci_requests_cancelled", "Queued requests dropped because the caller disconnected")
+TOKENS = Counter("omnivinci_tokens", "Prompt and generated tokens", ["direction"])
+TOKENS_PER_SECOND = Histogram(
+    "omnivinci_tokens_per_second",
+    "Decode rate per request",
+    buckets=(1, 2.5, 5, 10, 20, 40, 80, 160)
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request by route template (except /metrics itself)"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    start_time = time.perf_counter()
+    status = 500
+    REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start_time)
+
+# Dynamic batching: requests arriving within the window are generated together
+BATCH_MAX_SIZE = int(os.getenv("OMNIVINCI_BATCH_MAX_SIZE", "4"))
+BATCH_WINDOW_MS = float(os.getenv("OMNIVINCI_BATCH_WINDOW_MS", "50"))
+# Requests allowed to wait for the GPU; beyond this they get 429 + Retry-After
+QUEUE_MAX = int(os.getenv("OMNIVINCI_QUEUE_MAX", "16"))
+# How often a queued request checks whether its caller is still connected
+DISCONNECT_POLL_SEC = float(os.getenv("OMNIVINCI_DISCONNECT_POLL_SEC", "1"))
+# Prompts accepted by /infer/video/multi (all of them go into one batch)
+MULTI_MAX_PROMPTS = int(os.getenv("OMNIVINCI_MULTI_MAX_PROMPTS", "8"))
+
+# Downloaded videos are cached on disk (LRU within the budget)
+MEDIA_CACHE_DIR = os.getenv("OMNIVINCI_MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "omnivinci_media"))
+MEDIA_CACHE_MB = int(os.getenv("OMNIVINCI_MEDIA_CACHE_MB", "10240"))
+DOWNLOAD_MAX_MB = int(os.getenv("OMNIVINCI_DOWNLOAD_MAX_MB", "2048"))
+DOWNLOAD_CONNECT_TIMEOUT_SEC = float(os.getenv("OMNIVINCI_DOWNLOAD_CONNECT_TIMEOUT_SEC", "10"))
+# Maximum gap between chunks (there is no limit on the whole download)
+DOWNLOAD_READ_TIMEOUT_SEC = float(os.getenv("OMNIVINCI_DOWNLOAD_READ_TIMEOUT_SEC", "60"))
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# Video server URL prefixes readable as local directories ("http://localhost:8080=/data/videos,...")
+LOCAL_VIDEO_ROOTS = os.getenv("OMNIVINCI_LOCAL_VIDEO_ROOTS", "")
+
+# Decoded media per (video, frame/audio settings): in memory, plus memory-mapped files if a directory is set
+PREPROCESS_CACHE_MB = int(os.getenv("OMNIVINCI_PREPROCESS_CACHE_MB", "4096"))
+PREPROCESS_CACHE_DIR = os.getenv("OMNIVINCI_PREPROCESS_CACHE_DIR", "")
+PREPROCESS_DISK_MB = int(os.getenv("OMNIVINCI_PREPROCESS_DISK_MB", "20480"))
+
 # Global model and processor
 model = None
 processor = None
@@ -48,11 +152,23 @@ class ChatResponse(BaseModel):
     choices: List[Dict[str, Any]]
     usage: Dict[str, int]
 
+class MultiPromptRequest(BaseModel):
+    url: str
+    prompts: List[str]
+    max_tokens: Optional[int] = 512
+    temperature: Optional[float] = 0.7
+
+class MultiPromptResponse(BaseModel):
+    model: str
+    responses: List[Dict[str, Any]]  # {"prompt", "response", "usage"} per prompt, in order
+    usage: Dict[str, int]
+
 @app.on_event("startup")
 async def load_model():
     """Load OmniVinci model on startup"""
     global model, processor
     
+    media_cache.start()
     print(f"Loading model: {model_name}")
     
     try:
@@ -66,6 +182,8 @@ async def load_model():
         )
         
         processor = AutoProcessor.from_pretrained(model_name, trust_remote_code=True)
+        # Batched prompts are padded on the left so every row generates from its last token
+        processor.tokenizer.padding_side = "left"
         
         # Configure for video processing
         model.config.load_audio_in_video = True
@@ -76,7 +194,8 @@ async def load_model():
         processor.config.audio_chunk_length = "max_3600"
         
         print(f"Model loaded successfully on {model.device}")
-        
+        scheduler.start()
+    
     except Exception as e:
         print(f"Error loading model: {e}")
         raise
@@ -87,9 +206,15 @@ async def health():
     return {
         "status": "healthy" if model is not None else "unhealthy",
         "model_loaded": model is not None,
-        "model_name": model_name
+        "model_name": model_name,
+        "queue": scheduler.stats()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/v1/models")
 async def list_models():
     """List available models (OpenAI-compatible)"""
@@ -105,98 +230,1038 @@ async def list_models():
         ]
     }
 
+class MediaDownloadError(Exception):
+    """The video could not be fetched; status_code is the HTTP status to report"""
+    
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+@dataclass
+class MediaEntry:
+    """A video in the download cache"""
+    key: str
+    path: str
+    size: int
+    sha256: str
+    pins: int = 0  # Requests currently using the file (never evicted while > 0)
+
+@dataclass
+class MediaFile:
+    """A video ready for the processor"""
+    path: str
+    sha256: str
+    size: int
+    source: str  # "local", "cache" or "download"
+
+def parse_local_roots(value: str) -> List[tuple]:
+    """Parse "http://host:8080=/data/videos, ..." into (url_prefix, directory) pairs"""
+    roots = []
+    for entry in value.split(","):
+        prefix, _, directory = entry.strip().partition("=")
+        if prefix and directory:
+            roots.append((prefix.rstrip("/") + "/", directory))
+    return roots
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MediaCache:
+    """
+    Disk-budgeted LRU cache of downloaded videos
+    
+    Videos are streamed to disk in chunks (memory use is one chunk, not the
+    whole file) with their SHA-256 computed on the fly. Entries are keyed by
+    URL + ETag (or Content-Length + Last-Modified), so a regenerate of an
+    unchanged video only costs the response headers, and a changed video
+    gets a new entry. Least recently used files are deleted once the cache
+    exceeds MEDIA_CACHE_MB, except files a request is still using.
+    
+    URLs under a configured local root (file:// or OMNIVINCI_LOCAL_VIDEO_ROOTS)
+    are read in place without copying.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str = MEDIA_CACHE_DIR,
+        budget_bytes: int = MEDIA_CACHE_MB * 1024 * 1024,
+        local_roots: Optional[List[tuple]] = None
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.budget_bytes = budget_bytes
+        self.local_roots = parse_local_roots(LOCAL_VIDEO_ROOTS) if local_roots is None else local_roots
+        self.entries: "OrderedDict[str, MediaEntry]" = OrderedDict()
+        self.bytes_held = 0
+        self.client: Optional[httpx.AsyncClient] = None
+        self._downloads: Dict[str, asyncio.Future] = {}
+        # Requests waiting on each in-progress download (pinned for them when it lands)
+        self._download_waiters: Dict[str, int] = {}
+        # Content hashes of local files by (path, size, mtime)
+        self._local_hashes: Dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.local = 0
+    
+    def start(self) -> None:
+        """Create the HTTP client and re-index files left by a previous run"""
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(DOWNLOAD_READ_TIMEOUT_SEC, connect=DOWNLOAD_CONNECT_TIMEOUT_SEC),
+            follow_redirects=True
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        sidecars = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for sidecar in sidecars:
+            try:
+                with open(sidecar, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if not os.path.exists(meta["path"]):
+                    sidecar.unlink()
+                    continue
+                self.entries[meta["key"]] = MediaEntry(meta["key"], meta["path"], meta["size"], meta["sha256"])
+                self.bytes_held += meta["size"]
+            except Exception as e:
+                print(f"Skipping media cache entry {sidecar}: {e}")
+        # Leftovers of interrupted downloads
+        for partial in self.cache_dir.glob("*.part"):
+            partial.unlink(missing_ok=True)
+        self._evict()
+    
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    def local_path(self, url: str) -> Optional[str]:
+        """Path of a video the service can read directly, or None"""
+        if url.startswith("file://"):
+            path = unquote(urlparse(url).path)
+            return path if os.path.isfile(path) else None
+        for prefix, directory in self.local_roots:
+            if url.startswith(prefix):
+                path = os.path.join(directory, unquote(url[len(prefix):].split("?", 1)[0]))
+                if os.path.isfile(path):
+                    return path
+        return None
+    
+    @asynccontextmanager
+    async def open(self, url: str) -> AsyncIterator[MediaFile]:
+        """
+        Get a local file for a video URL, pinned in the cache until the block exits
+        
+        Raises:
+            MediaDownloadError: If the download failed or exceeded DOWNLOAD_MAX_MB
+        """
+        path = self.local_path(url)
+        if path is None and url.startswith("file://"):
+            raise MediaDownloadError(404, f"Video not found: {url}")
+        if path is not None:
+            self.local += 1
+            MEDIA_LOOKUPS.labels("local").inc()
+            stat = os.stat(path)
+            hash_key = (path, stat.st_size, stat.st_mtime_ns)
+            sha256 = self._local_hashes.get(hash_key)
+            if sha256 is None:
+                sha256 = await asyncio.to_thread(hash_file, path)
+                self._local_hashes[hash_key] = sha256
+            yield MediaFile(path, sha256, stat.st_size, "local")
+            return
+        
+        entry, source = await self._fetch(url)
+        try:
+            yield MediaFile(entry.path, entry.sha256, entry.size, source)
+        finally:
+            entry.pins -= 1
+            self._evict()
+    
+    async def _fetch(self, url: str) -> tuple:
+        """
+        (entry, source) for a video URL, with the entry already pinned
+        
+        The pin is taken before any further await (closing the response
+        included), so another request's eviction can't delete the file
+        before the caller gets to use it.
+        """
+        pinned: Optional[MediaEntry] = None
+        try:
+            try:
+                async with self.client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    headers = response.headers
+                    validator = headers.get("etag")
+                    if validator is None and (headers.get("content-length") or headers.get("last-modified")):
+                        validator = f"{headers.get('content-length')}|{headers.get('last-modified')}"
+                    # Without any validator the video can't be recognised again: never a hit
+                    validator = validator or uuid.uuid4().hex
+                    key = hashlib.sha256(f"{url}|{validator}".encode()).hexdigest()[:32]
+                    
+                    entry = self.entries.get(key)
+                    if entry is not None and os.path.exists(entry.path):
+                        # Unchanged video: the body is never read
+                        self.entries.move_to_end(key)
+                        entry.pins += 1
+                        pinned = entry
+                        self.hits += 1
+                        MEDIA_LOOKUPS.labels("hit").inc()
+                        return entry, "cache"
+                    
+                    pending = self._downloads.get(key)
+                    if pending is not None:
+                        # Someone is already downloading this version; share their result
+                        self.hits += 1
+                        MEDIA_LOOKUPS.labels("hit").inc()
+                        self._download_waiters[key] += 1
+                        try:
+                            pinned = await asyncio.shield(pending)
+                        except asyncio.CancelledError:
+                            if pending.cancelled():
+                                raise MediaDownloadError(503, "Concurrent download of this video was interrupted")
+                            if not pending.done():
+                                self._download_waiters[key] -= 1
+                            elif pending.exception() is None:
+                                # Already pinned for us by the downloader
+                                pending.result().pins -= 1
+                            raise
+                        return pinned, "cache"
+                    
+                    self.misses += 1
+                    MEDIA_LOOKUPS.labels("miss").inc()
+                    future = asyncio.get_running_loop().create_future()
+                    self._downloads[key] = future
+                    self._download_waiters[key] = 0
+                    try:
+                        pinned = await self._download(key, url, response)
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        future.set_exception(e)
+                        future.exception()  # Retrieved here if nobody else was waiting
+                        raise
+                    else:
+                        # Pin for the requests sharing this download before any of them wakes up
+                        pinned.pins += self._download_waiters[key]
+                        future.set_result(pinned)
+                    finally:
+                        del self._downloads[key]
+                        del self._download_waiters[key]
+                    return pinned, "download"
+            except httpx.HTTPStatusError as e:
+                raise MediaDownloadError(502, f"Video download failed: HTTP {e.response.status_code} from {url}")
+            except httpx.HTTPError as e:
+                raise MediaDownloadError(502, f"Video download failed: {type(e).__name__}: {e}")
+        except BaseException:
+            # e.g. cancelled or failed while closing the response: the caller never gets the pin
+            if pinned is not None:
+                pinned.pins -= 1
+            raise
+    
+    async def _download(self, key: str, url: str, response: httpx.Response) -> MediaEntry:
+        """Stream the body to disk, hashing as it goes"""
+        suffix = Path(urlparse(url).path).suffix or ".mp4"
+        path = self.cache_dir / f"{key}{suffix}"
+        partial = self.cache_dir / f"{key}.part"
+        max_bytes = DOWNLOAD_MAX_MB * 1024 * 1024
+        digest = hashlib.sha256()
+        size = 0
+        
+        start_time = time.perf_counter()
+        try:
+            with open(partial, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise MediaDownloadError(413, f"Video exceeds {DOWNLOAD_MAX_MB} MB")
+                    digest.update(chunk)
+                    f.write(chunk)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        DOWNLOAD_SECONDS.observe(time.perf_counter() - start_time)
+        
+        entry = MediaEntry(key, str(path), size, digest.hexdigest())
+        # Pinned for the downloading request, so it can't evict itself on insert
+        entry.pins = 1
+        with open(self.cache_dir / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump({"key": key, "url": url, "path": entry.path, "size": size, "sha256": entry.sha256}, f)
+        self.entries[key] = entry
+        self.bytes_held += size
+        self._evict(keep=key)
+        return entry
+    
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used, unpinned files (other than keep) until the cache fits its budget"""
+        for key in list(self.entries):
+            if self.bytes_held <= self.budget_bytes:
+                break
+            entry = self.entries[key]
+            if entry.pins > 0 or key == keep:
+                continue
+            del self.entries[key]
+            self.bytes_held -= entry.size
+            for path in (Path(entry.path), self.cache_dir / f"{key}.json"):
+                path.unlink(missing_ok=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes_held": self.bytes_held,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "local": self.local,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "downloads_in_progress": len(self._downloads)
+        }
+
+media_cache = MediaCache()
+MEDIA_CACHE_BYTES = Gauge("omnivinci_media_cache_bytes", "Bytes of downloaded videos held on disk")
+MEDIA_CACHE_BYTES.set_function(lambda: media_cache.bytes_held)
+
+def tensor_bytes(value: Any) -> int:
+    """Total size of the tensors in a nested dict/list structure"""
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, dict):
+        return sum(tensor_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(v) for v in value)
+    return 0
+
+class FeatureCache:
+    """
+    LRU cache of processor media outputs (decoded frames and audio features)
+    
+    Keyed by video SHA-256 and the processor's frame/audio settings, so asking
+    a new question about a recently seen video skips decoding and feature
+    extraction. Entries live in memory up to PREPROCESS_CACHE_MB; with
+    PREPROCESS_CACHE_DIR set they are also written to disk (in the
+    background, up to PREPROCESS_DISK_MB) and memory-mapped back on a
+    memory miss, which also survives restarts.
+    
+    Only used from the GPU worker thread, apart from the disk writer.
+    """
+    
+    def __init__(
+        self,
+        memory_bytes: int = PREPROCESS_CACHE_MB * 1024 * 1024,
+        cache_dir: str = PREPROCESS_CACHE_DIR,
+        disk_bytes: int = PREPROCESS_DISK_MB * 1024 * 1024
+    ):
+        self.memory_budget = memory_bytes
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (features, size)
+        self.memory_bytes = 0
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.disk_budget = disk_bytes
+        self.disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size
+        self.disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="omnivinci-feature-writer")
+        self.enabled = memory_bytes > 0 or self.cache_dir is not None
+        # Turned off if prompts can't be re-tokenized without the processor (see check_tokenization)
+        self.reusable = True
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for path in sorted(self.cache_dir.glob("*.pt"), key=lambda p: p.stat().st_mtime):
+                size = path.stat().st_size
+                self.disk[path.stem] = size
+                self.disk_bytes += size
+            for partial in self.cache_dir.glob("*.pt.part"):
+                partial.unlink(missing_ok=True)
+    
+    @staticmethod
+    def key(video_sha256: str) -> str:
+        """Cache key of a video under the processor's current frame and audio settings"""
+        config = processor.config
+        settings = (
+            getattr(config, "num_video_frames", None),
+            getattr(config, "load_audio_in_video", None),
+            getattr(config, "audio_chunk_length", None)
+        )
+        return hashlib.sha256(f"{video_sha256}|{settings}".encode()).hexdigest()[:32]
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """{"media", "media_config"} for a key, or None"""
+        if not self.enabled:
+            return None
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            FEATURE_LOOKUPS.labels("memory").inc()
+            return cached[0]
+        
+        if self.cache_dir is not None and key in self.disk:
+            path = self.cache_dir / f"{key}.pt"
+            try:
+                # Files in the cache directory are only ever written by this service
+                features = torch.load(path, mmap=True, weights_only=False)
+            except Exception as e:
+                print(f"Dropping unreadable feature cache file {path}: {e}")
+                self._drop_disk(key)
+            else:
+                with self._disk_lock:
+                    self.disk.move_to_end(key)
+                os.utime(path)
+                self.disk_hits += 1
+                FEATURE_LOOKUPS.labels("disk").inc()
+                self._put_memory(key, features)
+                return features
+        
+        self.misses += 1
+        FEATURE_LOOKUPS.labels("miss").inc()
+        return None
+    
+    def put(self, key: str, features: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self._put_memory(key, features)
+        if self.cache_dir is not None and key not in self.disk:
+            self.writer.submit(self._write, key, features)
+    
+    def _put_memory(self, key: str, features: Dict[str, Any]) -> None:
+        size = tensor_bytes(features)
+        if size > self.memory_budget:
+            return
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        self.memory[key] = (features, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_budget:
+            _, (_, evicted_size) = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted_size
+    
+    def _write(self, key: str, features: Dict[str, Any]) -> None:
+        path = self.cache_dir / f"{key}.pt"
+        partial = self.cache_dir / f"{key}.pt.part"
+        try:
+            torch.save(features, partial)
+            os.replace(partial, path)
+        except Exception as e:
+            print(f"Could not write feature cache file {path}: {e}")
+            partial.unlink(missing_ok=True)
+            return
+        with self._disk_lock:
+            size = path.stat().st_size
+            self.disk[key] = size
+            self.disk_bytes += size
+            while self.disk_bytes > self.disk_budget and len(self.disk) > 1:
+                evicted, evicted_size = self.disk.popitem(last=False)
+                self.disk_bytes -= evicted_size
+                (self.cache_dir / f"{evicted}.pt").unlink(missing_ok=True)
+    
+    def _drop_disk(self, key: str) -> None:
+        with self._disk_lock:
+            size = self.disk.pop(key, None)
+            if size is not None:
+                self.disk_bytes -= size
+        (self.cache_dir / f"{key}.pt").unlink(missing_ok=True)
+    
+    def check_tokenization(self, text: str, input_ids: torch.Tensor) -> None:
+        """
+        Stop reusing media if the tokenizer alone doesn't reproduce the processor's input_ids
+        
+        Reused media (cache hits, repeated videos in a batch) tokenize the prompt without the processor, which relies on
+        media being single placeholder tokens that the model expands itself.
+        """
+        if not self.reusable:
+            return
+        tokenized = processor.tokenizer(text, return_tensors="pt").input_ids[0]
+        if not torch.equal(tokenized, input_ids.cpu()):
+            print("Media reuse disabled: tokenizer output differs from the processor's input_ids")
+            self.reusable = False
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "reusable": self.reusable,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget_bytes": self.memory_budget,
+            "disk_entries": len(self.disk),
+            "disk_bytes": self.disk_bytes,
+            "disk_budget_bytes": self.disk_budget if self.cache_dir is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+feature_cache = FeatureCache()
+FEATURE_CACHE_BYTES = Gauge("omnivinci_feature_cache_bytes", "Bytes of cached media features", ["tier"])
+FEATURE_CACHE_BYTES.labels("memory").set_function(lambda: feature_cache.memory_bytes)
+FEATURE_CACHE_BYTES.labels("disk").set_function(lambda: feature_cache.disk_bytes)
+
+@dataclass
+class GenerationRequest:
+    """One conversation waiting for (or in) a batch"""
+    video_path: str
+    prompt: str
+    max_tokens: int
+    temperature: float
+    future: asyncio.Future
+    video_sha256: Optional[str] = None  # Enables the feature cache
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    started: bool = False  # Taken into a batch (can no longer be cancelled)
+
+class QueueFullError(Exception):
+    """The admission queue is full; retry_after is a rough wait in seconds"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class ClientDisconnected(Exception):
+    """The caller went away before its request reached the GPU"""
+
+class PerRequestSampling(LogitsProcessor):
+    """
+    Per-row temperature and max_tokens inside one batched generate
+    
+    generate() takes a single temperature and length for the whole batch, so
+    batches are sampled at temperature 1 with max_new_tokens set to the
+    largest request. This processor scales each row's logits by its own
+    temperature (0 means greedy) and forces EOS once a row has produced its
+    own max_tokens, so shorter requests stop without waiting for the rest.
+    """
+    
+    def __init__(self, temperatures: List[float], max_new_tokens: List[int], eos_token_id: int, prompt_length: int = 0):
+        self.temperatures = torch.tensor(temperatures, dtype=torch.float32).unsqueeze(1)
+        self.max_new_tokens = torch.tensor(max_new_tokens)
+        self.eos_token_id = eos_token_id
+        # Generation from inputs_embeds (how OmniVinci splices in media) passes only the new tokens
+        self.prompt_length = prompt_length
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        scores = scores.float()
+        temperatures = self.temperatures.to(scores.device)
+        greedy = (temperatures <= 0).squeeze(1)
+        scores = scores / temperatures.clamp(min=1e-5)
+        if greedy.any():
+            best = scores[greedy].argmax(dim=-1, keepdim=True)
+            scores[greedy] = torch.full_like(scores[greedy], float("-inf")).scatter(-1, best, 0.0)
+        
+        done = self.max_new_tokens.to(scores.device) <= input_ids.shape[-1] - self.prompt_length
+        if done.any():
+            scores[done] = float("-inf")
+            scores[done, self.eos_token_id] = 0.0
+        return scores
+
+def build_conversation(video_path: str, prompt: str) -> List[Dict[str, Any]]:
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "video", "video": video_path},
+            {"type": "text", "text": prompt}
+        ]
+    }]
+
+def completion_length(ids: torch.Tensor) -> int:
+    """Generated tokens of one row before EOS (what follows is padding)"""
+    ids = ids.tolist()
+    eos_token_id = processor.tokenizer.eos_token_id
+    return ids.index(eos_token_id) if eos_token_id in ids else len(ids)
+
+@dataclass
+class PreparedInput:
+    """One conversation tokenized, with its media ready for generate"""
+    input_ids: torch.Tensor  # 1-D, unpadded
+    media: Any
+    media_config: Any
+
+def prepare_input(item: GenerationRequest, batch_features: Dict[str, Dict[str, Any]]) -> PreparedInput:
+    """
+    Template and tokenize one conversation, decoding its media unless cached
+    
+    Args:
+        batch_features: Media already prepared for this batch by feature cache key,
+            so prompts about the same video are decoded once even without cache memory
+    """
+    text = processor.apply_chat_template(build_conversation(item.video_path, item.prompt), tokenize=False, add_generation_prompt=True)
+    key = FeatureCache.key(item.video_sha256) if item.video_sha256 and feature_cache.reusable else None
+    features = batch_features.get(key) if key else None
+    if features is None and key:
+        features = feature_cache.get(key)
+    if features is not None:
+        batch_features[key] = features
+        input_ids = processor.tokenizer(text, return_tensors="pt").input_ids[0]
+        return PreparedInput(input_ids, features["media"], features["media_config"])
+    
+    with PREPROCESS_SECONDS.time():
+        inputs = processor([text])
+    prepared = PreparedInput(
+        input_ids=inputs.input_ids[0],
+        media=getattr(inputs, 'media', None),
+        media_config=getattr(inputs, 'media_config', None)
+    )
+    if key:
+        feature_cache.check_tokenization(text, prepared.input_ids)
+        if feature_cache.reusable:
+            batch_features[key] = {"media": prepared.media, "media_config": prepared.media_config}
+            feature_cache.put(key, batch_features[key])
+    return prepared
+
+def collate(prepared: List[PreparedInput]) -> Dict[str, Any]:
+    """
+    Left-pad prepared conversations into one batch
+    
+    Media lists are concatenated in row order, matching the order of the
+    media placeholders in the batch. All rows share the processor settings,
+    so the first row's media_config applies to the batch.
+    """
+    length = max(p.input_ids.shape[-1] for p in prepared)
+    pad_token_id = processor.tokenizer.pad_token_id
+    if pad_token_id is None:
+        pad_token_id = processor.tokenizer.eos_token_id
+    input_ids = torch.full((len(prepared), length), pad_token_id, dtype=prepared[0].input_ids.dtype)
+    attention_mask = torch.zeros((len(prepared), length), dtype=torch.long)
+    media: Optional[Dict[str, List[Any]]] = None
+    for i, p in enumerate(prepared):
+        n = p.input_ids.shape[-1]
+        input_ids[i, length - n:] = p.input_ids
+        attention_mask[i, length - n:] = 1
+        if p.media is not None:
+            media = media if media is not None else {}
+            for modality, values in p.media.items():
+                media.setdefault(modality, []).extend(values)
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "media": media,
+        "media_config": next((p.media_config for p in prepared if p.media_config is not None), None)
+    }
+
+def run_batch(items: List[GenerationRequest]) -> List[Dict[str, Any]]:
+    """
+    Preprocess and generate one padded batch (blocking, runs on the GPU)
+    
+    Returns:
+        One {"caption", "prompt_tokens", "completion_tokens"} dict per request, in order
+    """
+    start_time = time.perf_counter()
+    batch_features: Dict[str, Dict[str, Any]] = {}
+    inputs = collate([prepare_input(item, batch_features) for item in items])
+    attention_mask = inputs["attention_mask"]
+    
+    sampling = PerRequestSampling(
+        temperatures=[item.temperature for item in items],
+        max_new_tokens=[item.max_tokens for item in items],
+        eos_token_id=processor.tokenizer.eos_token_id
+    )
+    
+    with torch.no_grad():
+        output_ids = model.generate(
+            input_ids=inputs["input_ids"],
+            attention_mask=attention_mask,
+            media=inputs["media"],
+            media_config=inputs["media_config"],
+            max_new_tokens=max(item.max_tokens for item in items),
+            do_sample=True,
+            temperature=1.0,
+            logits_processor=LogitsProcessorList([sampling])
+        )
+    
+    captions = processor.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+    batch_seconds = time.perf_counter() - start_time
+    GENERATION_SECONDS.observe(batch_seconds)
+    
+    results = []
+    for i, caption in enumerate(captions):
+        prompt_tokens = int(attention_mask[i].sum())
+        completion_tokens = completion_length(output_ids[i])
+        TOKENS.labels("prompt").inc(prompt_tokens)
+        TOKENS.labels("completion").inc(completion_tokens)
+        if batch_seconds > 0:
+            TOKENS_PER_SECOND.observe(completion_tokens / batch_seconds)
+        results.append({
+            "caption": caption,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens
+        })
+    return results
+
+class BatchScheduler:
+    """
+    Collects concurrent generation requests into batched generate calls
+    
+    A batch starts with the oldest waiting request and takes whatever else
+    arrives within BATCH_WINDOW_MS, up to BATCH_MAX_SIZE. While a batch is
+    generating, new requests queue up and form the next batch, so under
+    load batches fill up without waiting for the window.
+    
+    Batches run on a dedicated worker thread, so the event loop (health
+    checks, downloads, queue stats) stays responsive during generation. At
+    most QUEUE_MAX requests wait; further ones are rejected with
+    QueueFullError. A waiting request whose caller disconnects is dropped
+    before it reaches the GPU.
+    
+    Prompts submitted together (submit_many) are queued as one group and
+    always land in the same batch, even if that exceeds BATCH_MAX_SIZE.
+    """
+    
+    def __init__(
+        self,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_queue: int = QUEUE_MAX
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.queue: "asyncio.Queue[List[GenerationRequest]]" = asyncio.Queue()
+        # A group that didn't fit in the previous batch starts the next one
+        self._held: Optional[List[GenerationRequest]] = None
+        # One GPU worker: batches run one after another off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="omnivinci-gpu")
+        self.task: Optional[asyncio.Task] = None
+        self.waiting = 0
+        self.running = 0
+        self.batch_seconds: Optional[float] = None  # EWMA of batch duration
+        self.batches = 0
+        self.requests = 0
+        self.rejected = 0
+        self.cancelled = 0
+    
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+    
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely be admitted: the batches ahead of it"""
+        batches_ahead = math.ceil((self.waiting + 1) / self.max_batch_size)
+        return max(1, math.ceil(batches_ahead * (self.batch_seconds or 10.0)))
+    
+    async def submit(
+        self,
+        video_path: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        video_sha256: Optional[str] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Dict[str, Any]:
+        """Queue one conversation and wait for its own decoded output (see submit_many)"""
+        results = await self.submit_many(video_path, [prompt], max_tokens, temperature, video_sha256, is_disconnected)
+        return results[0]
+    
+    async def submit_many(
+        self,
+        video_path: str,
+        prompts: List[str],
+        max_tokens: int,
+        temperature: float,
+        video_sha256: Optional[str] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Queue several prompts about one video as a group and wait for all outputs
+        
+        Args:
+            video_sha256: Content hash of the video, used to reuse its decoded media
+            is_disconnected: Checked while waiting; the requests are dropped if it returns True
+        
+        Returns:
+            One result per prompt, in order
+        
+        Raises:
+            QueueFullError: If QUEUE_MAX requests are already waiting
+            ClientDisconnected: If the caller went away before the requests started
+        """
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            REJECTED.inc()
+            raise QueueFullError(self.retry_after())
+        
+        loop = asyncio.get_running_loop()
+        group = [
+            GenerationRequest(
+                video_path=video_path,
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                future=loop.create_future(),
+                video_sha256=video_sha256
+            )
+            for prompt in prompts
+        ]
+        self.waiting += len(group)
+        self.queue.put_nowait(group)
+        futures = {item.future for item in group}
+        try:
+            while True:
+                _, pending = await asyncio.wait(futures, timeout=DISCONNECT_POLL_SEC)
+                if not pending:
+                    return [item.future.result() for item in group]
+                started = any(item.started for item in group)
+                if not started and is_disconnected is not None and await is_disconnected():
+                    for item in group:
+                        self._cancel(item)
+                    raise ClientDisconnected()
+        except asyncio.CancelledError:
+            for item in group:
+                self._cancel(item)
+            raise
+    
+    def _cancel(self, item: GenerationRequest) -> None:
+        """Drop a request that has not started (it is skipped when its batch is formed)"""
+        if item.started or item.future.done():
+            return
+        item.future.cancel()
+        self.waiting -= 1
+        self.cancelled += 1
+        CANCELLED.inc()
+    
+    async def _collect(self) -> List[GenerationRequest]:
+        if self._held is not None:
+            batch, self._held = self._held, None
+        else:
+            batch = list(await self.queue.get())
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            try:
+                group = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    group = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if len(batch) + len(group) > self.max_batch_size:
+                self._held = group
+                break
+            batch.extend(group)
+        # Callers that went away don't need a slot in the batch
+        batch = [item for item in batch if not item.future.done()]
+        for item in batch:
+            item.started = True
+            self.waiting -= 1
+        return batch
+    
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            
+            now = time.perf_counter()
+            for item in batch:
+                QUEUE_WAIT_SECONDS.observe(now - item.enqueued_at)
+            BATCH_SIZE.observe(len(batch))
+            self.batches += 1
+            self.requests += len(batch)
+            self.running = len(batch)
+            
+            try:
+                try:
+                    results = await self._execute(batch)
+                except Exception as e:
+                    if len(batch) == 1:
+                        self._fail(batch[0], e)
+                        continue
+                    # One bad video must not fail the others: retry the batch one request at a time
+                    print(f"Batch of {len(batch)} failed ({e}), retrying individually")
+                    for item in batch:
+                        try:
+                            self._resolve(item, (await self._execute([item]))[0])
+                        except Exception as item_error:
+                            self._fail(item, item_error)
+                    continue
+                
+                for item, result in zip(batch, results):
+                    self._resolve(item, result)
+            finally:
+                self.running = 0
+    
+    async def _execute(self, batch: List[GenerationRequest]) -> List[Dict[str, Any]]:
+        """Run one batch on the GPU worker thread"""
+        start_time = time.perf_counter()
+        results = await asyncio.get_running_loop().run_in_executor(self.executor, run_batch, batch)
+        elapsed = time.perf_counter() - start_time
+        self.batch_seconds = elapsed if self.batch_seconds is None else 0.8 * self.batch_seconds + 0.2 * elapsed
+        return results
+    
+    @staticmethod
+    def _resolve(item: GenerationRequest, result: Dict[str, Any]) -> None:
+        if not item.future.done():
+            item.future.set_result(result)
+    
+    @staticmethod
+    def _fail(item: GenerationRequest, error: Exception) -> None:
+        if not item.future.done():
+            item.future.set_exception(error)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.waiting,
+            "running": self.running,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "batch_seconds": round(self.batch_seconds, 3) if self.batch_seconds is not None else None,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
+
+scheduler = BatchScheduler()
+QUEUE_DEPTH = Gauge("omnivinci_queue_depth", "Requests waiting for the GPU")
+QUEUE_DEPTH.set_function(lambda: scheduler.waiting)
+
 @app.post("/v1/chat/completions", response_model=ChatResponse)
-async def chat_completion(request: ChatRequest):
+async def chat_completion(request: ChatRequest, raw_request: Request):
     """Generate caption for video (OpenAI-compatible API)"""
     
     if model is None or processor is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    # Extract content from first message
+    message = request.messages[0]
+    text_content = ""
+    video_url = None
+    
+    for item in message.content:
+        if item.get("type") == "text":
+            text_content = item.get("text", "")
+        elif item.get("type") == "video_url":
+            video_url = item.get("video_url", {}).get("url")
+    
+    if not video_url:
+        raise HTTPException(status_code=400, detail="No video_url provided")
+    
+    result = (await generate_for_url(
+        video_url,
+        [text_content],
+        max_tokens=request.max_tokens or 512,
+        temperature=request.temperature if request.temperature is not None else 0.7,
+        raw_request=raw_request
+    ))[0]
+    caption = result["caption"]
+    
+    # Return OpenAI-compatible response
+    return ChatResponse(
+        id="chat-" + str(hash(caption))[:16],
+        object="chat.completion",
+        model=model_name,
+        choices=[
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": caption
+                },
+                "finish_reason": "stop"
+            }
+        ],
+        usage=usage_of(result)
+    )
+
+@app.post("/infer/video/multi", response_model=MultiPromptResponse)
+async def infer_video_multi(request: MultiPromptRequest, raw_request: Request):
+    """
+    Answer several prompts about one video in a single batched pass
+    
+    The video is fetched and its frames and audio decoded once; every prompt
+    goes into the same generate call.
+    """
+    if model is None or processor is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    prompts = [prompt for prompt in request.prompts if prompt and prompt.strip()]
+    if not prompts:
+        raise HTTPException(status_code=400, detail="No prompts provided")
+    if len(prompts) > MULTI_MAX_PROMPTS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTI_MAX_PROMPTS} prompts per request")
+    
+    results = await generate_for_url(
+        request.url,
+        prompts,
+        max_tokens=request.max_tokens or 512,
+        temperature=request.temperature if request.temperature is not None else 0.7,
+        raw_request=raw_request
+    )
+    usages = [usage_of(result) for result in results]
+    return MultiPromptResponse(
+        model=model_name,
+        responses=[
+            {"prompt": prompt, "response": result["caption"], "usage": usage}
+            for prompt, result, usage in zip(prompts, results, usages)
+        ],
+        usage={key: sum(usage[key] for usage in usages) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    )
+
+async def generate_for_url(
+    video_url: str,
+    prompts: List[str],
+    max_tokens: int,
+    temperature: float,
+    raw_request: Request
+) -> List[Dict[str, Any]]:
+    """
+    Fetch a video and generate one output per prompt, all in the same batch
+    
+    Raises:
+        HTTPException: With the status to report for download, queue or generation failures
+    """
     try:
-        # Extract content from first message
-        message = request.messages[0]
-        text_content = ""
-        video_url = None
-        
-        for item in message.content:
-            if item.get("type") == "text":
-                text_content = item.get("text", "")
-            elif item.get("type") == "video_url":
-                video_url = item.get("video_url", {}).get("url")
-        
-        if not video_url:
-            raise HTTPException(status_code=400, detail="No video_url provided")
-        
-        # Download video from URL
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(video_url)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp:
-                tmp.write(response.content)
-                video_path = tmp.name
-        
-        try:
-            # Prepare conversation for OmniVinci
-            conversation = [{
-                "role": "user",
-                "content": [
-                    {"type": "video", "video": video_path},
-                    {"type": "text", "text": text_content}
-                ]
-            }]
-            
-            # Process with OmniVinci
-            text = processor.apply_chat_template(conversation, tokenize=False, add_generation_prompt=True)
-            inputs = processor([text])
-            
-            # Generate
-            with torch.no_grad():
-                output_ids = model.generate(
-                    input_ids=inputs.input_ids,
-                    media=getattr(inputs, 'media', None),
-                    media_config=getattr(inputs, 'media_config', None),
-                    max_new_tokens=request.max_tokens,
-                    temperature=request.temperature
-                )
-            
-            # Decode output
-            caption = processor.tokenizer.batch_decode(output_ids, skip_special_tokens=True)[0]
-            
-            # Clean up temp file
-            os.unlink(video_path)
-            
-            # Return OpenAI-compatible response
-            return ChatResponse(
-                id="chat-" + str(hash(caption))[:16],
-                object="chat.completion",
-                model=model_name,
-                choices=[
-                    {
-                        "index": 0,
-                        "message": {
-                            "role": "assistant",
-                            "content": caption
-                        },
-                        "finish_reason": "stop"
-                    }
-                ],
-                usage={
-                    "prompt_tokens": 0,
-                    "completion_tokens": len(caption.split()),
-                    "total_tokens": len(caption.split())
-                }
+        # Local file, cached download, or streamed to the cache now (pinned until generated)
+        async with media_cache.open(video_url) as media:
+            # Generated together with whatever other requests arrive in the batching window
+            return await scheduler.submit_many(
+                media.path,
+                prompts,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                video_sha256=media.sha256,
+                is_disconnected=raw_request.is_disconnected
             )
-            
-        finally:
-            # Clean up temp file if it still exists
-            if os.path.exists(video_path):
-                os.unlink(video_path)
+    
+    except MediaDownloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    except ClientDisconnected:
+        # Nobody is listening; 499 only shows up in the request metrics
+        raise HTTPException(status_code=499, detail="Client disconnected")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
+def usage_of(result: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        "prompt_tokens": result["prompt_tokens"],
+        "completion_tokens": result["completion_tokens"],
+        "total_tokens": result["prompt_tokens"] + result["completion_tokens"]
+    }
+
+@app.get("/v1/cache")
+async def cache_stats():
+    """Downloaded video and media feature cache sizes and hit ratios"""
+    return {"media": media_cache.stats(), "features": feature_cache.stats()}
+
+@app.on_event("shutdown")
+async def close_media_cache():
+    await media_cache.aclose()
+
+@app.get("/v1/batching")
+async def batching_stats():
+    """Queue depth, rejections and batch sizes of the scheduler"""
+    return scheduler.stats()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
 